@@ -0,0 +1,150 @@
+"""
+Invoice file storage
+
+Invoice PDFs are streamed into the "invoices" blob store and the xx_Invoice
+row keeps only file_sha256 / file_size. Invoices saved before that still carry
+the file as base64 text in base64_file until migrate_invoice_files() moves it
+out of the database. Base64 is only produced when the file is sent to Oracle.
+"""
+import base64
+import io
+import re
+
+from budget_transfer.global_function.blob_store import CHUNK_SIZE, BlobStore, ranged_file_response
+
+from .models import xx_Invoice
+
+
+def _referenced_invoice_files(keys):
+    return set(
+        xx_Invoice.objects.filter(file_sha256__in=keys).values_list("file_sha256", flat=True)
+    )
+
+
+invoice_store = BlobStore("invoices", references=_referenced_invoice_files)
+
+_DATA_URL_PREFIX = re.compile(r"^data:[^,]*;base64,")
+
+
+def _iter_base64_decoded(content):
+    """Decode base64 text in CHUNK_SIZE slices (a multiple of 4 characters)."""
+    content = _DATA_URL_PREFIX.sub("", re.sub(r"\s+", "", content or ""))
+    for start in range(0, len(content), CHUNK_SIZE):
+        yield base64.b64decode(content[start:start + CHUNK_SIZE], validate=True)
+
+
+def store_invoice_upload(uploaded_file):
+    """
+    Stream an uploaded invoice file to the blob store.
+
+    Returns:
+        (sha256, size)
+    """
+    return invoice_store.save_upload(uploaded_file)
+
+
+def store_invoice_base64(content):
+    """
+    Store a base64 encoded invoice file (legacy clients still post base64_file).
+
+    Returns:
+        (sha256, size)
+
+    Raises:
+        ValueError: content is not valid base64
+    """
+    return invoice_store.save_chunks(_iter_base64_decoded(content))
+
+
+def invoice_file_exists(sha256):
+    try:
+        return invoice_store.exists(sha256)
+    except ValueError:
+        return False
+
+
+def _legacy_base64(invoice):
+    return (
+        xx_Invoice.objects.filter(pk=invoice.pk)
+        .values_list("base64_file", flat=True)
+        .first()
+        or ""
+    )
+
+
+def invoice_file_base64(invoice):
+    """Base64 text of the invoice file, as the Oracle invoice API expects it"""
+    if invoice.file_sha256:
+        with invoice_store.open(invoice.file_sha256) as fileobj:
+            return base64.b64encode(fileobj.read()).decode("utf-8")
+    return _legacy_base64(invoice)
+
+
+def invoice_download_response(request, invoice):
+    """Streaming (Range-aware) download of an invoice file from whichever storage holds it"""
+    if invoice.file_sha256:
+        return ranged_file_response(
+            request,
+            invoice_store.open(invoice.file_sha256),
+            invoice_store.size(invoice.file_sha256),
+            invoice.file_name or f"{invoice.Invoice_Number}.pdf",
+            etag=invoice.file_sha256,
+        )
+
+    # Not migrated yet: the content is still base64 text in the database
+    data = b"".join(_iter_base64_decoded(_legacy_base64(invoice)))
+    return ranged_file_response(
+        request, io.BytesIO(data), len(data), invoice.file_name or f"{invoice.Invoice_Number}.pdf"
+    )
+
+
+def release_invoice_file(sha256):
+    """Delete a stored file once no invoice references it (see BlobStore.release)."""
+    return invoice_store.release(sha256)
+
+
+def migrate_invoice_files(batch_size=100, dry_run=False):
+    """
+    Move base64_file contents into the blob store, one invoice at a time so
+    only one file is held in memory.
+
+    Returns:
+        dict: {'migrated', 'bytes', 'failed', 'remaining'}
+    """
+    pending = xx_Invoice.objects.filter(file_sha256__isnull=True).exclude(base64_file="")
+    result = {"migrated": 0, "bytes": 0, "failed": 0, "remaining": pending.count()}
+    if dry_run:
+        return result
+
+    last_id = 0
+    while True:
+        ids = list(
+            pending.filter(Invoice_ID__gt=last_id)
+            .order_by("Invoice_ID")
+            .values_list("Invoice_ID", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        for invoice_id in ids:
+            content = (
+                xx_Invoice.objects.filter(pk=invoice_id)
+                .values_list("base64_file", flat=True)
+                .first()
+            )
+            if not content:
+                continue
+            try:
+                sha256, size = store_invoice_base64(content)
+            except ValueError as e:
+                print(f"⚠️ Invoice {invoice_id}: base64_file is not valid base64 ({e}), left in place")
+                result["failed"] += 1
+                continue
+            xx_Invoice.objects.filter(pk=invoice_id).update(
+                file_sha256=sha256, file_size=size, base64_file=""
+            )
+            result["migrated"] += 1
+            result["bytes"] += size
+        last_id = ids[-1]
+
+    result["remaining"] = pending.count()
+    return result
@@ -0,0 +1,51 @@
+"""
+Django management command to move base64 invoice files out of the database
+"""
+from django.core.management.base import BaseCommand, CommandError
+from Invoice.files import migrate_invoice_files
+
+
+class Command(BaseCommand):
+    help = 'Move xx_Invoice.base64_file contents into the invoice blob store'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Invoices to look up per query (default: 100)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the invoices whose file is still stored in the database'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        try:
+            result = migrate_invoice_files(batch_size=options['batch_size'], dry_run=dry_run)
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'❌ Unexpected error: {str(e)}')
+            )
+            raise CommandError(f'Command failed: {str(e)}')
+
+        if dry_run:
+            self.stdout.write(f"📊 {result['remaining']} invoice files still stored in the database (dry run, nothing moved)")
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Moved {result['migrated']} invoice files ({result['bytes']} bytes) to the blob store"
+            )
+        )
+        if result['failed']:
+            self.stdout.write(
+                self.style.WARNING(f"⚠️  {result['failed']} invoices have a base64_file that could not be decoded")
+            )
+        if result['remaining']:
+            self.stdout.write(
+                self.style.WARNING(f"⚠️  {result['remaining']} invoice files are still stored in the database")
+            )
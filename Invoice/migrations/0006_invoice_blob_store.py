@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Invoice', '0005_remove_xx_invoice_code_combination_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='xx_invoice',
+            name='file_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='xx_invoice',
+            name='file_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='xx_invoice',
+            name='base64_file',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
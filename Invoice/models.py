@@ -7,14 +7,22 @@ import json
 
 
 class xx_Invoice(models.Model):
-    """Model to track invoices"""
+    """
+    Model to track invoices
+
+    The invoice file lives in the invoice blob store under file_sha256;
+    base64_file only holds files of invoices saved before that (see
+    migrate_invoice_files) and is never loaded by the list/detail APIs.
+    """
 
     Invoice_ID = models.AutoField(primary_key=True)
     Invoice_Number = models.CharField(max_length=100, unique=True)
     Invoice_Data = models.JSONField()
     uploaded_by = models.ForeignKey(xx_User, on_delete=models.CASCADE)
-    base64_file = models.TextField(default="")
+    base64_file = models.TextField(default="", blank=True)
     file_name= models.CharField(max_length=255, null=True, blank=True)
+    file_sha256 = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    file_size = models.BigIntegerField(null=True, blank=True)
     status = models.CharField(max_length=50, default="Pending")  # e.g., Pending, Processed, Error
     class Meta:
         db_table = "XX_INVOICE_XX"
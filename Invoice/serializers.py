@@ -6,7 +6,7 @@ from rest_framework import serializers
 class InvoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = xx_Invoice
-        fields = ['Invoice_ID', 'Invoice_Number', 'Invoice_Data', 'uploaded_by', 'base64_file', 'file_name','status']
+        fields = ['Invoice_ID', 'Invoice_Number', 'Invoice_Data', 'uploaded_by', 'file_name', 'file_sha256', 'file_size', 'status']
 
 
     def create(self, validated_data):
@@ -3,7 +3,8 @@ from django.urls import path
 from .views import (
      Invoice_extraction,
      Invoice_Crud,
-     Invoice_submit
+     Invoice_submit,
+     Invoice_File
 )
 
 
@@ -13,5 +14,6 @@ urlpatterns = [
     path("Invoice_Crud/", Invoice_Crud.as_view(), name="invoice-crud"),
     path("Invoice_extraction/", Invoice_extraction.as_view(), name="invoice-extraction"),
     path("Submit/", Invoice_submit.as_view(), name="invoice-extraction-detail"),
+    path("Invoice_File/", Invoice_File.as_view(), name="invoice-file"),
 
 ]
@@ -3,12 +3,23 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
+from django.db import transaction
+from django.urls import reverse
+from django.utils.http import urlencode
 import json
 import re
-import base64
 
 from .models import xx_Invoice as Invoice
 from .serializers import InvoiceSerializer
+from .files import (
+    invoice_download_response,
+    invoice_file_base64,
+    invoice_file_exists,
+    invoice_store,
+    release_invoice_file,
+    store_invoice_base64,
+    store_invoice_upload,
+)
 from .AI.Gemini_model import extract_invoice_with_gemini
 from .AI.Own_model import extract_invoice_with_deepseek
 from .utility import send_request
@@ -132,17 +143,11 @@ class Invoice_extraction(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
         
-        # Convert PDF to base64
+        # Store the PDF; the client saves the invoice with the returned file_sha256
         try:
             #read file name
             file_name = file.name
-            # Reset file pointer to beginning
-            file.seek(0)
-            # Read file content
-            pdf_content = file.read()
-
-            # Encode to base64
-            base64_encoded = base64.b64encode(pdf_content).decode('utf-8')
+            file_sha256, file_size = store_invoice_upload(file)
             
             # Get invoice number from parsed data
             Invoice_Number = parsed_data.get("InvoiceNumber", "UNKNOWN")
@@ -150,7 +155,7 @@ class Invoice_extraction(APIView):
         except Exception as e:
             return Response(
                 {
-                    "message": f"Failed to encode PDF to base64: {str(e)}",
+                    "message": f"Failed to store invoice file: {str(e)}",
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
@@ -160,7 +165,8 @@ class Invoice_extraction(APIView):
                 "message": "Invoice extracted successfully.",
                 "model_used": model_choice,
                 "invoice_number": Invoice_Number,
-                "pdf_base64": base64_encoded,
+                "file_sha256": file_sha256,
+                "file_size": file_size,
                 "file_name": file_name,
                 "data": parsed_data,  # Now returns clean parsed JSON
             },
@@ -186,7 +192,7 @@ class Invoice_submit(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            Invoice_Object = Invoice.objects.filter(Invoice_Number=Invoice_Number).first()
+            Invoice_Object = Invoice.objects.defer("base64_file").filter(Invoice_Number=Invoice_Number).first()
             
             
             if Invoice_Object:
@@ -198,7 +204,7 @@ class Invoice_submit(APIView):
 
                 
 
-                oracle_response = send_request(base64_content=Invoice_Object.base64_file, filename=Invoice_Object.file_name, json_data=Invoice_data, category="From Supplier")
+                oracle_response = send_request(base64_content=invoice_file_base64(Invoice_Object), filename=Invoice_Object.file_name, json_data=Invoice_data, category="From Supplier")
                 
                 # Check if oracle_response indicates an error
                 if oracle_response and isinstance(oracle_response, dict):
@@ -279,7 +285,35 @@ class Invoice_Crud(APIView):
         
         Invoice_details=request.data.get("Invoice_Data")
         Invoice_file_name = request.data.get("file_name")
+        Invoice_file_sha256 = request.data.get("file_sha256")
         Invoice_base64_file = request.data.get("base64_file")
+        Invoice_file_size = None
+
+        if Invoice_file_sha256:
+            # File stored by Invoice_extraction
+            if not invoice_file_exists(Invoice_file_sha256):
+                return Response(
+                    {
+                        "message": "Invoice file not found.",
+                        "errors": {"file_sha256": "No stored file has this hash. Upload it through Invoice_extraction."},
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        elif Invoice_base64_file:
+            # Older clients still send the file as base64
+            try:
+                Invoice_file_sha256, Invoice_file_size = store_invoice_base64(Invoice_base64_file)
+            except ValueError:
+                return Response(
+                    {
+                        "message": "Invalid invoice file.",
+                        "errors": {"base64_file": "This field must be base64 encoded."},
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        if Invoice_file_sha256 and Invoice_file_size is None:
+            Invoice_file_size = invoice_store.size(Invoice_file_sha256)
 
         serializer = InvoiceSerializer(
         data={
@@ -288,7 +322,8 @@ class Invoice_Crud(APIView):
             "Invoice_Number": request.data.get("Invoice_Number"),
             "uploaded_by": request.user.id,
             "file_name": Invoice_file_name,
-            "base64_file": Invoice_base64_file,
+            "file_sha256": Invoice_file_sha256,
+            "file_size": Invoice_file_size,
         }
         )
 
@@ -308,10 +343,11 @@ class Invoice_Crud(APIView):
         """List all invoices with pagination"""
         Invoice_Number = request.query_params.get("Invoice_Number", None)
 
+        # Never load the legacy base64 column; files are downloaded from Invoice_File
         if Invoice_Number:
-            invoices = Invoice.objects.filter(Invoice_Number=Invoice_Number)
+            invoices = Invoice.objects.defer("base64_file").filter(Invoice_Number=Invoice_Number).order_by("Invoice_ID")
         else:
-            invoices = Invoice.objects.all()
+            invoices = Invoice.objects.defer("base64_file").order_by("Invoice_ID")
             
         paginator = InvoicePagination()
         paginated_invoices = paginator.paginate_queryset(invoices, request)
@@ -362,9 +398,11 @@ class Invoice_Crud(APIView):
                     'Invoice_ID': invoice.Invoice_ID,
                     'Invoice_Number': invoice.Invoice_Number,
                     'InvoiceDate': Invoice_Object.get('Invoice_Data'),
-                    'uploaded_by': invoice.uploaded_by.id if invoice.uploaded_by else None,
-                    'base64_file': invoice.base64_file,
+                    'uploaded_by': invoice.uploaded_by_id,
                     'file_name': invoice.file_name,
+                    'file_size': invoice.file_size,
+                    'file_sha256': invoice.file_sha256,
+                    'download_url': reverse("invoice-file") + "?" + urlencode({"Invoice_Number": invoice.Invoice_Number}),
                     'status': invoice.status
                 }
                 data.append(extracted_data)
@@ -378,14 +416,16 @@ class Invoice_Crud(APIView):
         try:
             Invoice_Number = request.query_params.get("Invoice_Number", None)
 
-            invoice = Invoice.objects.get(Invoice_Number=Invoice_Number)
+            invoice = Invoice.objects.defer("base64_file").get(Invoice_Number=Invoice_Number)
         except Invoice.DoesNotExist:
             return Response(
                 {"message": "Invoice not found."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+        file_sha256 = invoice.file_sha256
         invoice.delete()
+        transaction.on_commit(lambda: release_invoice_file(file_sha256))
         return Response(
             {"message": "Invoice deleted successfully."},
             status=status.HTTP_204_NO_CONTENT,
@@ -403,16 +443,19 @@ class Invoice_Crud(APIView):
                 )
             
             # Find the existing invoice
-            invoice = Invoice.objects.get(Invoice_Number=Invoice_Number)
+            invoice = Invoice.objects.defer("base64_file").get(Invoice_Number=Invoice_Number)
             
             # Delete the old invoice
             invoice.delete()
             
-            # Create new invoice with the provided data
+            # Create new invoice with the provided data, keeping the stored file
             new_data = {
                 "Invoice_Number": Invoice_Number,
                 "Invoice_Object": request.data.get("Invoice_Object"),
-                "uploaded_by": request.user.id
+                "uploaded_by": request.user.id,
+                "file_name": invoice.file_name,
+                "file_sha256": invoice.file_sha256,
+                "file_size": invoice.file_size,
             }
             
             serializer = InvoiceSerializer(data=new_data)
@@ -439,3 +482,36 @@ class Invoice_Crud(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+
+class Invoice_File(APIView):
+    """Download the file of an invoice"""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Stream the invoice file (supports Range requests)"""
+        Invoice_Number = request.query_params.get("Invoice_Number")
+        if not Invoice_Number:
+            return Response(
+                {"message": "Invoice_Number is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        invoice = (
+            Invoice.objects.defer("base64_file", "Invoice_Data")
+            .filter(Invoice_Number=Invoice_Number)
+            .first()
+        )
+        if not invoice:
+            return Response(
+                {"message": "Invoice not found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        try:
+            return invoice_download_response(request, invoice)
+        except (FileNotFoundError, ValueError):
+            return Response(
+                {"message": "Invoice file is no longer available."},
+                status=status.HTTP_410_GONE,
+            )
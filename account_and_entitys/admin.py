@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import XX_Account, XX_Entity, XX_PivotFund, XX_Project, XX_BalanceReport
+from .models import XX_Account, XX_Entity, XX_PivotFund, XX_Project, XX_BalanceReport, XX_BalanceReportSnapshot, XX_UploadJob
 
 
 @admin.register(XX_Account)
@@ -95,6 +95,43 @@ class BalanceReportAdmin(admin.ModelAdmin):
     )
 
 
+
+@admin.register(XX_BalanceReportSnapshot)
+class BalanceReportSnapshotAdmin(admin.ModelAdmin):
+    """Admin interface for Balance Report snapshots"""
+    list_display = (
+        "id",
+        "control_budget_name",
+        "period_name",
+        "status",
+        "is_active",
+        "row_count",
+        "fetched_at",
+        "activated_at",
+    )
+    list_filter = ("control_budget_name", "period_name", "status", "is_active")
+    ordering = ("-fetched_at",)
+    readonly_fields = ("fetched_at", "activated_at", "row_count")
+
+
+@admin.register(XX_UploadJob)
+class UploadJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "kind",
+        "file_name",
+        "user",
+        "status",
+        "rows_processed",
+        "rows_total",
+        "error_count",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("kind", "status")
+    ordering = ("-created_at",)
+    readonly_fields = ("created_at", "started_at", "finished_at")
+
 # @admin.register(MainCurrency)
 # class MainCurrencyAdmin(admin.ModelAdmin):
 #     list_display = ('id', 'name', 'icon')
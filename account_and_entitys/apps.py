@@ -3,3 +3,6 @@ from django.apps import AppConfig
 class AccountAndEntitysConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'account_and_entitys'
+
+    def ready(self):
+        import account_and_entitys.signals
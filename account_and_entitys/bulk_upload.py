@@ -0,0 +1,293 @@
+"""
+Bulk upsert engine for the master-data Excel uploads
+
+Rows are streamed from the workbook (openpyxl read_only) and collected in
+batches. Each batch costs one query to fetch the rows that already exist for
+its keys, one bulk_create and one bulk_update, instead of update_or_create()
+per row. When a bulk write fails, the batch is replayed row by row so the
+error is reported against the row that caused it.
+
+Bulk writes bypass model signals, so the hierarchy index of XX_Project,
+XX_Account and XX_Entity is invalidated explicitly once the upload is done.
+
+Outside an atomic block every batch commits on its own, which is how upload
+jobs (see tasks.run_upload_job) report progress per batch.
+"""
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import Q
+
+from budget_transfer.global_function.oracle_limits import ORACLE_IN_BATCH_SIZE
+
+from .hierarchy import HIERARCHY_CODE_FIELDS, invalidate_hierarchy_index
+
+# What to do with a row whose key already exists
+ON_EXISTING_UPDATE = "update"  # update_or_create()
+ON_EXISTING_SKIP = "skip"  # get_or_create(): count it as a duplicate
+ON_EXISTING_ERROR = "error"  # create only: report the row
+
+
+class UploadFormatError(Exception):
+    """The workbook does not have the expected layout (e.g. missing columns)."""
+
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details or {}
+
+
+def is_empty_row(row):
+    return not row or all(
+        cell is None or (isinstance(cell, str) and cell.strip() == "") for cell in row
+    )
+
+
+def _is_xls(uploaded_file, file_name=None):
+    name = file_name or getattr(uploaded_file, "name", "") or ""
+    return str(name).lower().endswith(".xls")
+
+
+def _xls_sheet(uploaded_file):
+    """First sheet of a legacy .xls workbook (xlrd reads these whole; they hold at most 65k rows)"""
+    import xlrd
+
+    uploaded_file.seek(0)
+    return xlrd.open_workbook(file_contents=uploaded_file.read()).sheet_by_index(0)
+
+
+def _xls_value(value):
+    # xlrd returns every number as a float
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if value == "":
+        return None
+    return value
+
+
+def iter_sheet_rows(uploaded_file, file_name=None):
+    """
+    Stream the non-empty rows of the active sheet.
+
+    Args:
+        uploaded_file: .xlsx (or legacy .xls) file object
+        file_name (str): Original file name when uploaded_file has none (stored uploads)
+
+    Yields:
+        (row_number, values): 1-based row number in the sheet and the cell values
+    """
+    if _is_xls(uploaded_file, file_name):
+        sheet = _xls_sheet(uploaded_file)
+        for idx in range(sheet.nrows):
+            row = tuple(_xls_value(value) for value in sheet.row_values(idx))
+            if is_empty_row(row):
+                continue
+            yield idx + 1, row
+        return
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(filename=uploaded_file, read_only=True, data_only=True)
+    try:
+        for idx, row in enumerate(wb.active.iter_rows(values_only=True), start=1):
+            if is_empty_row(row):
+                continue
+            yield idx, row
+    finally:
+        wb.close()
+
+
+def sheet_row_count(uploaded_file, file_name=None):
+    """Number of rows of the active sheet as recorded in the workbook (None if unknown)."""
+    if _is_xls(uploaded_file, file_name):
+        return _xls_sheet(uploaded_file).nrows
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(filename=uploaded_file, read_only=True, data_only=True)
+    try:
+        return wb.active.max_row
+    finally:
+        wb.close()
+
+
+class BulkUpsert:
+    """
+    Batched create/update of one model keyed by one or more fields.
+
+    Usage:
+        upsert = BulkUpsert(XX_Account, ("account",), ("parent", "alias_default"))
+        for ...:
+            upsert.add({"account": ..., "parent": ..., "alias_default": ...},
+                       {"account_code": ...})
+        upsert.finish()
+        upsert.created, upsert.updated, upsert.duplicates, upsert.errors
+
+    The context dict of a row is copied into its error entry, so every view
+    keeps its own error format ({"row": ..., "project_code": ..., "error": ...}).
+    """
+
+    def __init__(
+        self,
+        model,
+        key_fields,
+        update_fields=(),
+        on_existing=ON_EXISTING_UPDATE,
+        batch_size=ORACLE_IN_BATCH_SIZE,
+        existing_error=None,
+        on_flush=None,
+    ):
+        """
+        Args:
+            model: Model class to write
+            key_fields (tuple): Fields identifying a row
+            update_fields (tuple): Fields overwritten on existing rows
+            on_existing (str): ON_EXISTING_UPDATE, ON_EXISTING_SKIP or ON_EXISTING_ERROR
+            batch_size (int): Rows per prefetch query and bulk write
+            existing_error (dict): Error entry for an existing key in ON_EXISTING_ERROR mode
+            on_flush (callable): Called after every batch is written
+        """
+        self.model = model
+        self.key_fields = tuple(key_fields)
+        self.update_fields = tuple(update_fields)
+        self.on_existing = on_existing
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self.existing_error = existing_error or {
+            "error": f"{model.__name__} with this {', '.join(self.key_fields)} already exists."
+        }
+
+        self.created = 0
+        self.updated = 0
+        self.duplicates = 0
+        self.errors = []
+        self._pending = OrderedDict()
+
+    def _error(self, context, error):
+        entry = dict(context)
+        if isinstance(error, dict):
+            entry.update(error)
+        else:
+            entry["error"] = str(error)
+        self.errors.append(entry)
+
+    def add(self, values, context=None):
+        """
+        Queue one row.
+
+        Args:
+            values (dict): Field values, including the key fields
+            context (dict): Row identification copied into its error entry
+        """
+        context = context or {}
+        key = tuple(values[field] for field in self.key_fields)
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            # Same key earlier in this batch: what the per-row version did on its second call
+            if self.on_existing == ON_EXISTING_UPDATE:
+                pending[0].update(values)
+                self.updated += 1
+            elif self.on_existing == ON_EXISTING_SKIP:
+                self.duplicates += 1
+            else:
+                self._error(context, self.existing_error)
+            return
+
+        self._pending[key] = [dict(values), context]
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def _fetch_existing(self, keys):
+        """Existing rows for keys in one query: {key: [obj, ...]}"""
+        condition = Q()
+        for position, field in enumerate(self.key_fields):
+            condition &= Q(**{f"{field}__in": {key[position] for key in keys}})
+
+        existing = {}
+        fields = {"pk", *self.key_fields, *self.update_fields}
+        for obj in self.model.objects.filter(condition).only(*fields):
+            key = tuple(getattr(obj, field) for field in self.key_fields)
+            if key in keys:
+                existing.setdefault(key, []).append(obj)
+        return existing
+
+    def flush(self):
+        """Write the queued rows."""
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, OrderedDict()
+        existing = self._fetch_existing(rows.keys())
+
+        to_create = []
+        to_update = []
+        for key, (values, context) in rows.items():
+            matches = existing.get(key, [])
+            if not matches:
+                to_create.append((self.model(**values), context))
+            elif self.on_existing == ON_EXISTING_SKIP:
+                self.duplicates += 1
+            elif self.on_existing == ON_EXISTING_ERROR:
+                self._error(context, self.existing_error)
+            elif len(matches) > 1:
+                self._error(
+                    context,
+                    f"get() returned more than one {self.model.__name__} -- it returned {len(matches)}!",
+                )
+            else:
+                obj = matches[0]
+                changed = False
+                for field in self.update_fields:
+                    if field in values and getattr(obj, field) != values[field]:
+                        setattr(obj, field, values[field])
+                        changed = True
+                if changed:
+                    to_update.append((obj, context))
+                else:
+                    self.updated += 1
+
+        self._write(to_create, to_update)
+        if self.on_flush:
+            self.on_flush()
+
+    def _write(self, to_create, to_update):
+        try:
+            with transaction.atomic():
+                if to_create:
+                    self.model.objects.bulk_create(
+                        [obj for obj, _ in to_create], batch_size=self.batch_size
+                    )
+                if to_update:
+                    self.model.objects.bulk_update(
+                        [obj for obj, _ in to_update],
+                        self.update_fields,
+                        batch_size=self.batch_size,
+                    )
+            self.created += len(to_create)
+            self.updated += len(to_update)
+            return
+        except Exception as e:
+            print(f"⚠️ Bulk write of {self.model.__name__} failed ({e}), retrying row by row")
+
+        # Replay the batch one row at a time to find the rows that fail
+        for obj, context in to_create:
+            obj.pk = None
+            try:
+                with transaction.atomic():
+                    obj.save(force_insert=True)
+                self.created += 1
+            except Exception as row_err:
+                self._error(context, row_err)
+        for obj, context in to_update:
+            try:
+                with transaction.atomic():
+                    obj.save(update_fields=self.update_fields)
+                self.updated += 1
+            except Exception as row_err:
+                self._error(context, row_err)
+
+    def finish(self):
+        """Write what is left and refresh dependent caches."""
+        self.flush()
+        if self.model._meta.model_name in HIERARCHY_CODE_FIELDS and (self.created or self.updated):
+            invalidate_hierarchy_index(self.model)
+        return self
@@ -0,0 +1,151 @@
+"""
+In-memory parent/child index for the XX_Project, XX_Account and XX_Entity trees.
+
+Each tree is loaded with a single values_list() scan and kept per process until
+one of its rows is saved or deleted (see account_and_entitys.signals). Lookups
+for descendants, leaves and ancestor chains then cost O(subtree) in memory
+instead of one query per node.
+
+The version of each tree lives in XX_HierarchyVersion, so a change committed
+by any worker is noticed by all of them on their next lookup.
+"""
+import threading
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+# Model name -> field holding the node code
+HIERARCHY_CODE_FIELDS = {
+    "xx_project": "project",
+    "xx_account": "account",
+    "xx_entity": "entity",
+}
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+class HierarchyIndex:
+    """Parent/child maps for one code tree"""
+
+    def __init__(self, rows):
+        """
+        Args:
+            rows (iterable): (id, code, parent) tuples
+        """
+        self.children = {}
+        self.parents = {}
+        self.ids_by_code = {}
+        self.code_by_id = {}
+
+        for row_id, code, parent in rows:
+            code = str(code) if code is not None else None
+            parent = str(parent) if parent not in (None, "") else None
+            self.ids_by_code.setdefault(code, []).append(row_id)
+            self.code_by_id[row_id] = code
+            self.parents.setdefault(code, parent)
+            if parent is not None:
+                siblings = self.children.setdefault(parent, [])
+                if code not in siblings:
+                    siblings.append(code)
+
+    @classmethod
+    def from_model(cls, model):
+        code_field = HIERARCHY_CODE_FIELDS[model._meta.model_name]
+        return cls(model.objects.values_list("id", code_field, "parent"))
+
+    def has(self, code):
+        return str(code) in self.ids_by_code
+
+    def is_leaf(self, code):
+        return str(code) not in self.children
+
+    def descendants(self, code):
+        """All descendant codes of code in depth-first order, with cycle protection."""
+        code = str(code)
+        visited = {code}
+        result = []
+        stack = list(reversed(self.children.get(code, [])))
+        while stack:
+            node = stack.pop()
+            if node in visited:
+                continue
+            visited.add(node)
+            result.append(node)
+            stack.extend(reversed(self.children.get(node, [])))
+        return result
+
+    def leaves(self, code):
+        """Descendant codes of code that are not parents themselves."""
+        return [node for node in self.descendants(code) if self.is_leaf(node)]
+
+    def ancestors(self, code):
+        """Parent chain of code, nearest parent first, with cycle protection."""
+        code = str(code)
+        visited = {code}
+        result = []
+        parent = self.parents.get(code)
+        while parent is not None and parent not in visited:
+            visited.add(parent)
+            result.append(parent)
+            parent = self.parents.get(parent)
+        return result
+
+    def ids_for_codes(self, codes):
+        ids = []
+        for code in codes:
+            ids.extend(self.ids_by_code.get(str(code), []))
+        return ids
+
+    def codes_for_ids(self, ids):
+        return [self.code_by_id[row_id] for row_id in ids if row_id in self.code_by_id]
+
+
+def hierarchy_version(model):
+    """Committed change counter of the model's tree (0 before its first change)"""
+    from .models import XX_HierarchyVersion
+
+    version = (
+        XX_HierarchyVersion.objects.filter(tree=model._meta.label_lower)
+        .values_list("version", flat=True)
+        .first()
+    )
+    return version or 0
+
+
+def get_hierarchy_index(model, version=None):
+    """
+    Return the cached HierarchyIndex for model, building it on first use.
+
+    Args:
+        version (int): hierarchy_version(model) when the caller already read it
+    """
+    if version is None:
+        version = hierarchy_version(model)
+    entry = _indexes.get(model)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    with _lock:
+        entry = _indexes.get(model)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        index = HierarchyIndex.from_model(model)
+        _indexes[model] = (version, index)
+        return index
+
+
+def invalidate_hierarchy_index(model):
+    """Drop the cached index for model and bump its tree version for every process."""
+    from .models import XX_HierarchyVersion
+
+    _indexes.pop(model, None)
+    tree = model._meta.label_lower
+    if XX_HierarchyVersion.objects.filter(tree=tree).update(version=F("version") + 1):
+        return
+    try:
+        with transaction.atomic():
+            XX_HierarchyVersion.objects.create(tree=tree, version=1)
+    except IntegrityError:
+        # Created concurrently
+        XX_HierarchyVersion.objects.filter(tree=tree).update(version=F("version") + 1)
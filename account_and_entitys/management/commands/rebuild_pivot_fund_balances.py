@@ -0,0 +1,48 @@
+"""
+Django management command to rebuild pivot fund balances from their movement journal
+"""
+from django.core.management.base import BaseCommand, CommandError
+from public_funtion.update_pivot_fund import rebuild_pivot_fund_balances
+
+
+class Command(BaseCommand):
+    help = 'Recompute XX_PivotFund encumbrance/actual from XX_PivotFundMovement'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list the pivot funds whose balance differs from the journal'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        try:
+            result = rebuild_pivot_fund_balances(dry_run=dry_run)
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'❌ Unexpected error: {str(e)}')
+            )
+            raise CommandError(f'Command failed: {str(e)}')
+
+        for difference in result['differences']:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️  Pivot fund {difference['pivot_fund_id']}: "
+                    f"encumbrance {difference['encumbrance']} -> {difference['expected_encumbrance']}, "
+                    f"actual {difference['actual']} -> {difference['expected_actual']}"
+                )
+            )
+
+        if dry_run:
+            self.stdout.write(
+                f"📊 {len(result['differences'])} of {result['checked']} journaled pivot funds differ (dry run, nothing changed)"
+            )
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Checked {result['checked']} journaled pivot funds, corrected {result['corrected']}"
+            )
+        )
@@ -6,7 +6,7 @@ from account_and_entitys.utils import refresh_balance_report_data
 
 
 class Command(BaseCommand):
-    help = 'Download balance report from Oracle and load into XX_BalanceReport table'
+    help = 'Download balance report from Oracle into a new XX_BalanceReport snapshot and activate it'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -15,6 +15,12 @@ class Command(BaseCommand):
             default='MIC_HQ_MONTHLY',
             help='Control budget name for the report (default: MIC_HQ_MONTHLY)'
         )
+        parser.add_argument(
+            '--period-name',
+            type=str,
+            default='sep-25',
+            help='Period name for the report (default: sep-25)'
+        )
         parser.add_argument(
             '--verbose',
             action='store_true',
@@ -23,15 +29,16 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         budget_name = options['budget_name']
+        period_name = options['period_name']
         verbose = options['verbose']
         
         if verbose:
             self.stdout.write(
-                self.style.SUCCESS(f'Starting balance report refresh for: {budget_name}')
+                self.style.SUCCESS(f'Starting balance report refresh for: {budget_name} ({period_name})')
             )
         
         try:
-            result = refresh_balance_report_data(budget_name)
+            result = refresh_balance_report_data(budget_name, period_name)
             
             if result['success']:
                 self.stdout.write(
@@ -41,7 +48,10 @@ class Command(BaseCommand):
                 if verbose and 'details' in result:
                     details = result['details']
                     self.stdout.write(f"📊 Created: {details.get('created_count', 0)} records")
-                    self.stdout.write(f"🗑️  Deleted: {details.get('deleted_count', 0)} old records")
+                    self.stdout.write(f"🔄 Updated: {details.get('updated_count', 0)} records")
+                    self.stdout.write(f"🗑️  Deleted: {details.get('deleted_count', 0)} old snapshot records")
+                    if result.get('snapshot'):
+                        self.stdout.write(f"📸 Snapshot: {result['snapshot']['snapshot_id']} (active: {result['snapshot']['is_active']})")
                     if details.get('error_count', 0) > 0:
                         self.stdout.write(
                             self.style.WARNING(f"⚠️  Errors: {details['error_count']} rows skipped")
@@ -0,0 +1,43 @@
+"""
+Django management command to resume unfinished upload jobs
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from account_and_entitys.tasks import (
+    fail_stale_upload_jobs,
+    resumable_upload_job_ids,
+    resume_upload_jobs,
+    run_upload_job,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Fail upload jobs left running without progress (e.g. after a restart) and resume '
+        'the queued ones. Jobs are re-queued on Celery when a broker is configured, '
+        'otherwise they are imported in this process.'
+    )
+
+    def handle(self, *args, **options):
+        try:
+            if getattr(settings, 'CELERY_BROKER_URL', None):
+                result = resume_upload_jobs()
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'✅ Failed {result["failed"]} stale upload jobs, re-queued {result["queued"]}'
+                    )
+                )
+                return
+
+            failed = fail_stale_upload_jobs()
+            job_ids = resumable_upload_job_ids()
+            self.stdout.write(f'🔄 Failed {failed} stale upload jobs, running {len(job_ids)} queued')
+            for job_id in job_ids:
+                payload = run_upload_job(job_id)
+                self.stdout.write(f'📊 Upload job {job_id}: {payload["status"]}')
+            self.stdout.write(self.style.SUCCESS('✅ All upload jobs finished'))
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'❌ Unexpected error: {str(e)}')
+            )
+            raise CommandError(f'Command failed: {str(e)}')
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def snapshot_existing_rows(apps, schema_editor):
+    """Wrap the rows of the last refresh in active snapshots, one per budget and period."""
+    BalanceReport = apps.get_model("account_and_entitys", "XX_BalanceReport")
+    Snapshot = apps.get_model("account_and_entitys", "XX_BalanceReportSnapshot")
+    groups = (
+        BalanceReport.objects.filter(control_budget_name__isnull=False)
+        .values("control_budget_name", "as_of_period")
+        .annotate(row_count=Count("id"), fetched_at=Max("created_at"))
+        .order_by()
+    )
+    for group in groups:
+        snapshot = Snapshot.objects.create(
+            control_budget_name=group["control_budget_name"],
+            period_name=group["as_of_period"] or "",
+            fetched_at=group["fetched_at"] or django.utils.timezone.now(),
+            status="ready",
+            is_active=True,
+            row_count=group["row_count"],
+            activated_at=django.utils.timezone.now(),
+        )
+        BalanceReport.objects.filter(
+            control_budget_name=group["control_budget_name"],
+            as_of_period=group["as_of_period"],
+        ).update(snapshot=snapshot)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account_and_entitys', '0009_alter_account_mapping_table_xx_entity_mapping_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XX_BalanceReportSnapshot',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('control_budget_name', models.CharField(max_length=100)),
+                ('period_name', models.CharField(max_length=20)),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('status', models.CharField(choices=[('loading', 'Loading'), ('ready', 'Ready'), ('failed', 'Failed')], default='loading', max_length=20)),
+                ('is_active', models.BooleanField(default=False)),
+                ('row_count', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('activated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Balance Report Snapshot',
+                'verbose_name_plural': 'Balance Report Snapshots',
+                'db_table': 'XX_BALANCE_REPORT_SNAPSHOT_XX',
+                'indexes': [models.Index(fields=['control_budget_name', 'period_name', 'is_active'], name='balance_snapshot_key_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='xx_balancereport',
+            name='snapshot',
+            field=models.ForeignKey(blank=True, help_text='Report download this row belongs to', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='account_and_entitys.xx_balancereportsnapshot'),
+        ),
+        migrations.RunPython(snapshot_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account_and_entitys', '0010_balance_report_snapshots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XX_UploadJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('projects', 'Projects'), ('accounts', 'Accounts'), ('entities', 'Entities'), ('account_mappings', 'Account mappings'), ('project_envelopes', 'Project envelopes'), ('budget_data', 'Budget data'), ('account_entity_limits', 'Account/entity limits'), ('transaction_transfers', 'Transaction transfers')], max_length=30)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_sha256', models.CharField(blank=True, max_length=64, null=True)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('rows_total', models.IntegerField(blank=True, null=True)),
+                ('rows_processed', models.IntegerField(default=0)),
+                ('error_count', models.IntegerField(default=0)),
+                ('summary', models.JSONField(blank=True, null=True)),
+                ('report_sha256', models.CharField(blank=True, max_length=64, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'XX_UPLOAD_JOB_XX',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'status'], name='upload_job_user_status_idx')],
+            },
+        ),
+    ]
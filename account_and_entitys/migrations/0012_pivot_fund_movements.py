@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account_and_entitys', '0011_upload_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XX_PivotFundMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('decide', models.CharField(choices=[('opening', 'Opening balance'), ('pending', 'Sent for approval'), ('approved', 'Approved'), ('rejected', 'Rejected')], max_length=10)),
+                ('transaction_id', models.IntegerField(blank=True, null=True)),
+                ('transfer_id', models.IntegerField(blank=True, null=True)),
+                ('encumbrance_delta', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('actual_delta', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('encumbrance_after', models.DecimalField(decimal_places=2, max_digits=30)),
+                ('actual_after', models.DecimalField(decimal_places=2, max_digits=30)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('pivot_fund', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='account_and_entitys.xx_pivotfund')),
+            ],
+            options={
+                'db_table': 'XX_PIVOTFUND_MOVEMENT_XX',
+                'indexes': [models.Index(fields=['pivot_fund', 'id'], name='pivot_move_fund_idx'), models.Index(fields=['transaction_id'], name='pivot_move_txn_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account_and_entitys', '0012_pivot_fund_movements'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XX_HierarchyVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tree', models.CharField(max_length=100, unique=True)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'XX_HIERARCHY_VERSION_XX',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account_and_entitys', '0013_hierarchy_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='xx_pivotfundmovement',
+            name='decide',
+            field=models.CharField(choices=[('opening', 'Opening balance'), ('pending', 'Sent for approval'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('adjustment', 'Manual adjustment')], max_length=10),
+        ),
+    ]
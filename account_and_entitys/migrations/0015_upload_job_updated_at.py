@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account_and_entitys', '0014_pivot_fund_adjustment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='xx_uploadjob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
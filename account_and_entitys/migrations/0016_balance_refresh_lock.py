@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account_and_entitys', '0015_upload_job_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XX_BalanceReportRefreshLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('control_budget_name', models.CharField(max_length=100)),
+                ('period_name', models.CharField(max_length=20)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'XX_BALANCE_REFRESH_LOCK_XX',
+                'constraints': [models.UniqueConstraint(fields=('control_budget_name', 'period_name'), name='unique_balance_refresh_lock')],
+            },
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
+from django.utils import timezone
 
 from approvals.models import ApprovalWorkflowInstance
 from transaction.models import xx_TransactionTransfer
+from .hierarchy import get_hierarchy_index
 
 # Removed encrypted fields import - using standard Django fields now
 
@@ -117,61 +119,23 @@ class EnvelopeManager:
         except Project_Envelope.DoesNotExist:
             return 0
 
-    @staticmethod
-    def __get_project_parent_code(project_code):
-        try:
-            parent_project = XX_Project.objects.get(project=project_code)
-            return parent_project.parent
-        except XX_Project.DoesNotExist:
-            return None
-
     @staticmethod
     def get_all_children(all_projects, curr_code, visited=None):
-        """Recursively get all descendants of a project code with cycle protection."""
-        if visited is None:
-            visited = set()
-        if curr_code in visited:
-            return []
-        visited.add(curr_code)
+        """Get all descendants of a project code from the cached hierarchy index.
 
-        direct_children = list(
-            all_projects.filter(parent=curr_code).values_list("project", flat=True)
-        )
-
-        descendants = []
-        for child in direct_children:
-            if child in visited:
-                continue
-            descendants.append(child)
-            descendants.extend(
-                EnvelopeManager.get_all_children(all_projects, child, visited)
-            )
-        return descendants
+        all_projects and visited are kept for backwards compatibility; the index
+        always covers the whole XX_Project table and is cycle-safe.
+        """
+        return get_hierarchy_index(XX_Project).descendants(curr_code)
 
     @staticmethod
     def get_all_children_for_accounts(all_accounts, curr_code, visited=None):
-        """Recursively get all descendants of an account code with cycle protection."""
-        if visited is None:
-            visited = set()
-        if curr_code in visited:
-            return []
-        visited.add(curr_code)
-
-        direct_children = list(
-            all_accounts.filter(parent=curr_code).values_list("account", flat=True)
-        )
+        """Get all descendants of an account code from the cached hierarchy index.
 
-        descendants = []
-        for child in direct_children:
-            if child in visited:
-                continue
-            descendants.append(child)
-            descendants.extend(
-                EnvelopeManager.get_all_children_for_accounts(
-                    all_accounts, child, visited
-                )
-            )
-        return descendants
+        all_accounts and visited are kept for backwards compatibility; the index
+        always covers the whole XX_Account table and is cycle-safe.
+        """
+        return get_hierarchy_index(XX_Account).descendants(curr_code)
 
     @staticmethod
     def __get_all_level_zero_children_code(project_code):
@@ -185,65 +149,33 @@ class EnvelopeManager:
         Returns:
             list: List of project codes that are leaf nodes under the given project_code
         """
-        try:
-            # First verify the parent project exists
-            XX_Project.objects.get(project=project_code)
-
-            # Get all projects
-            all_projects = XX_Project.objects.all()
-
-            # Get all parent codes to identify which projects are not parents
-            parent_codes = set(
-                all_projects.exclude(parent__isnull=True)
-                .values_list("parent", flat=True)
-                .distinct()
-            )
-
-            # Get all descendants of the given project_code
-            all_descendants = EnvelopeManager.get_all_children(
-                all_projects, project_code
-            )
-
-            # Filter to only include descendants that are not parents themselves
-            leaf_nodes = [code for code in all_descendants if code not in parent_codes]
-
-            return leaf_nodes
-
-        except XX_Project.DoesNotExist:
+        index = get_hierarchy_index(XX_Project)
+        if not index.has(project_code):
             return []
+        return index.leaves(project_code)
 
     @staticmethod
     def __get_all_children_codes(project_code):
-        try:
-            XX_Project.objects.only("project").get(project=project_code)
-
-            pairs = XX_Project.objects.values_list("project", "parent")
-            children_map = {}
-            for proj, parent in pairs:
-                children_map.setdefault(parent, []).append(proj)
-
-            result = []
-            stack = list(children_map.get(project_code, []))
-            while stack:
-                node = stack.pop()
-                result.append(node)
-                stack.extend(children_map.get(node, []))
-            return result
-        except XX_Project.DoesNotExist:
+        index = get_hierarchy_index(XX_Project)
+        if not index.has(project_code):
             return []
+        return index.descendants(project_code)
 
     @staticmethod
     def Get_First_Parent_Envelope(project_code):
-        while project_code:
-            try:
-                if EnvelopeManager.Has_Envelope(project_code):
-                    return project_code, EnvelopeManager.Get_Envelope(project_code)
-                else:
-                    project_code = EnvelopeManager.__get_project_parent_code(
-                        project_code
-                    )
-            except XX_Project.DoesNotExist:
-                project_code = None
+        if not project_code:
+            return None, None
+        chain = [str(project_code)] + get_hierarchy_index(XX_Project).ancestors(
+            project_code
+        )
+        envelopes = {}
+        for project, envelope in Project_Envelope.objects.filter(
+            project__in=chain
+        ).values_list("project", "envelope"):
+            envelopes.setdefault(project, envelope)
+        for code in chain:
+            if code in envelopes:
+                return code, envelopes[code]
         return None, None
 
     @staticmethod
@@ -263,13 +195,18 @@ class EnvelopeManager:
                     XX_Account.objects.all(), account
                 )
             )
-        for account in all_accounts:
-            if Account_Mapping.objects.filter(target_account=account).exists():
-                mapped_accounts = Account_Mapping.objects.filter(
-                    target_account=account
-                ).values_list("source_account", flat=True)
-                all_accounts.extend(list(mapped_accounts))
-        return list(set(all_accounts))
+        # Follow mappings level by level (one query per level, not per account)
+        seen = set(all_accounts)
+        pending = set(all_accounts)
+        while pending:
+            mapped_accounts = set(
+                Account_Mapping.objects.filter(target_account__in=pending).values_list(
+                    "source_account", flat=True
+                )
+            )
+            pending = mapped_accounts - seen
+            seen |= pending
+        return list(seen)
 
     @staticmethod
     def Calculate_Transactions_total(base_transactions):
@@ -369,6 +306,50 @@ class EnvelopeManager:
             print(f"Error calculating total amount for project {project_code}: {e}")
             return None, None
 
+    @staticmethod
+    def __apply_period_filters(transactions, year=None, month=None, caller=""):
+        """Filter transfers on transaction__fy / transaction__transaction_date.
+
+        year: fiscal year (int or numeric string); invalid values are ignored
+        month: int 1-12 or 3-letter abbreviation like 'Jan'; invalid values are ignored
+        """
+        import calendar
+
+        # Apply year filter if provided
+        if year is not None and year != "":
+            try:
+                year_int = int(year)
+                transactions = transactions.filter(transaction__fy=year_int)
+            except Exception:
+                # invalid year value; ignore filter but log
+                print(f"{caller}: invalid year value '{year}', skipping year filter")
+
+        # Apply month filter if provided; accept month as int or 3-letter name
+        if month is not None and month != "":
+            month_abbr = None
+            try:
+                if isinstance(month, str):
+                    m = month.strip()
+                    if len(m) == 3:
+                        month_abbr = m[:3]
+                    else:
+                        month_int = int(m)
+                        if 1 <= month_int <= 12:
+                            month_abbr = calendar.month_abbr[month_int]
+                else:
+                    month_int = int(month)
+                    if 1 <= month_int <= 12:
+                        month_abbr = calendar.month_abbr[month_int]
+            except Exception:
+                print(f"{caller}: invalid month value '{month}', skipping month filter")
+
+            if month_abbr:
+                transactions = transactions.filter(
+                    transaction__transaction_date=month_abbr
+                )
+
+        return transactions
+
     @staticmethod
     def Get_Active_Projects(project_codes=None, year=None, month=None):
         """Return a list of distinct project codes used by transactions.
@@ -378,68 +359,22 @@ class EnvelopeManager:
                          from this list that have transactions will be returned.
             year: optional fiscal year (int or numeric string) — filters on transaction__fy
             month: optional month (int 1-12 or 3-letter abbreviation like 'Jan') — filters on transaction__transaction_date
-            IsApproved: if True only include transactions whose parent budget transfer's workflow instance status is APPROVED,
-                        otherwise include those in IN_PROGRESS.
 
         Returns:
             list of project_code strings (empty list on error)
         """
         try:
-            import calendar
-
             # Import here to avoid circular import at module import time
             from transaction.models import xx_TransactionTransfer
 
-            # desired_status = (
-            #     ApprovalWorkflowInstance.STATUS_APPROVED
-            #     if IsApproved
-            #     else ApprovalWorkflowInstance.STATUS_IN_PROGRESS
-            # )
-
-            # transactions = xx_TransactionTransfer.objects.filter(
-            #     transaction__workflow_instance__status=desired_status
-            # )
             transactions = xx_TransactionTransfer.objects.all()
             # Filter by provided project codes if any
             if project_codes:
                 transactions = transactions.filter(project_code__in=project_codes)
 
-            # Apply year filter if provided
-            if year is not None and year != "":
-                try:
-                    year_int = int(year)
-                    transactions = transactions.filter(transaction__fy=year_int)
-                except Exception:
-                    # invalid year value; ignore filter but log
-                    print(
-                        f"Get_Active_Projects: invalid year value '{year}', skipping year filter"
-                    )
-
-            # Apply month filter if provided; accept month as int or 3-letter name
-            if month is not None and month != "":
-                month_abbr = None
-                try:
-                    if isinstance(month, str):
-                        m = month.strip()
-                        if len(m) == 3:
-                            month_abbr = m[:3]
-                        else:
-                            month_int = int(m)
-                            if 1 <= month_int <= 12:
-                                month_abbr = calendar.month_abbr[month_int]
-                    else:
-                        month_int = int(month)
-                        if 1 <= month_int <= 12:
-                            month_abbr = calendar.month_abbr[month_int]
-                except Exception:
-                    print(
-                        f"Get_Active_Projects: invalid month value '{month}', skipping month filter"
-                    )
-
-                if month_abbr:
-                    transactions = transactions.filter(
-                        transaction__transaction_date=month_abbr
-                    )
+            transactions = EnvelopeManager.__apply_period_filters(
+                transactions, year=year, month=month, caller="Get_Active_Projects"
+            )
 
             # Return plain list of distinct project codes
             project_qs = transactions.values_list("project_code", flat=True).distinct()
@@ -450,6 +385,86 @@ class EnvelopeManager:
             print(f"Error in Get_Active_Projects: {e}")
             return []
 
+    @staticmethod
+    def Get_Total_Amounts_for_Projects(project_codes, year=None, month=None):
+        """Approved and in-progress from/to totals for every active project in project_codes.
+
+        Runs one grouped aggregate over xx_TransactionTransfer instead of one set of
+        queries per project. Every project with at least one transfer in the period is
+        returned (with zero totals when none of its transfers hit the envelope accounts),
+        matching Get_Active_Projects + Get_Total_Amount_for_Project.
+
+        Returns:
+            dict: {project_code: {"approved": {...}, "submitted": {...}}} where each
+                  inner dict has total_from (negated), total_to and total
+        """
+        from django.db.models import Sum, Value, Q
+        from django.db.models.functions import Coalesce
+
+        # Import here to avoid circular import at module import time
+        from transaction.models import xx_TransactionTransfer
+
+        if not project_codes:
+            return {}
+
+        accounts = [
+            "TC11100T",  # Men Power
+            "TC11200T",  # Non Men Power
+            "TC13000T",  # Copex
+        ]
+        numeric_accounts = EnvelopeManager.__filter_numeric_accounts(
+            EnvelopeManager.Get_All_Children_Accounts_with_Mapping(accounts)
+        )
+
+        transactions = EnvelopeManager.__apply_period_filters(
+            xx_TransactionTransfer.objects.filter(project_code__in=project_codes),
+            year=year,
+            month=month,
+            caller="Get_Total_Amounts_for_Projects",
+        )
+
+        in_accounts = Q(account_code__in=numeric_accounts)
+        approved = in_accounts & Q(
+            transaction__workflow_instance__status=ApprovalWorkflowInstance.STATUS_APPROVED
+        )
+        submitted = in_accounts & Q(
+            transaction__workflow_instance__status=ApprovalWorkflowInstance.STATUS_IN_PROGRESS
+        )
+        zero = Value(0, output_field=models.DecimalField())
+
+        rows = (
+            transactions.values("project_code")
+            .annotate(
+                approved_from=Coalesce(Sum("from_center", filter=approved), zero),
+                approved_to=Coalesce(Sum("to_center", filter=approved), zero),
+                submitted_from=Coalesce(Sum("from_center", filter=submitted), zero),
+                submitted_to=Coalesce(Sum("to_center", filter=submitted), zero),
+            )
+            .order_by()
+        )
+
+        totals = {}
+        for row in rows:
+            approved_totals = {
+                "total_from": row["approved_from"] * -1,
+                "total_to": row["approved_to"],
+            }
+            approved_totals["total"] = (
+                approved_totals["total_from"] + approved_totals["total_to"]
+            )
+            submitted_totals = {
+                "total_from": row["submitted_from"] * -1,
+                "total_to": row["submitted_to"],
+            }
+            submitted_totals["total"] = (
+                submitted_totals["total_from"] + submitted_totals["total_to"]
+            )
+            totals[row["project_code"]] = {
+                "approved": approved_totals,
+                "submitted": submitted_totals,
+            }
+        return totals
+
     @staticmethod
     def Get_Current_Envelope_For_Project(project_code, year=None, month=None):
         try:
@@ -461,30 +476,11 @@ class EnvelopeManager:
             Children_projects = EnvelopeManager.__get_all_level_zero_children_code(
                 parent_project
             )
-            active_projects = EnvelopeManager.Get_Active_Projects(
-                project_codes=Children_projects, year=year, month=month
-            )
 
-            # Initialize dictionary to store results for all projects
-            projects_totals = {}
-
-            # Get totals for each active project
-            for proj in active_projects:
-                approved, submitted = EnvelopeManager.Get_Total_Amount_for_Project(
-                    proj, year=year, month=month
-                )
-                projects_totals[proj] = {
-                    "approved": (
-                        approved
-                        if approved
-                        else {"total": 0, "total_from": 0, "total_to": 0}
-                    ),
-                    "submitted": (
-                        submitted
-                        if submitted
-                        else {"total": 0, "total_from": 0, "total_to": 0}
-                    ),
-                }
+            # Totals for every active child project in a single grouped query
+            projects_totals = EnvelopeManager.Get_Total_Amounts_for_Projects(
+                Children_projects, year=year, month=month
+            )
 
             current_envelope = envelope
             estimated_envelope = envelope
@@ -749,6 +745,49 @@ class XX_PivotFund(models.Model):
         db_table = "XX_PIVOTFUND_XX"
 
 
+class XX_PivotFundMovement(models.Model):
+    """
+    Append-only journal of XX_PivotFund balance changes.
+
+    Every change made through public_funtion.update_pivot_fund is recorded with
+    its deltas and the balances it left; direct edits of the balances are
+    recorded as "adjustment" movements (see account_and_entitys.signals). The first movement of a fund is an
+    "opening" entry carrying the balances it had before, so the sum of a fund's
+    deltas always equals its balance and rebuild_pivot_fund_balances() can
+    recompute it.
+    """
+
+    DECIDE_CHOICES = [
+        ("opening", "Opening balance"),
+        ("pending", "Sent for approval"),
+        ("approved", "Approved"),
+        ("rejected", "Rejected"),
+        ("adjustment", "Manual adjustment"),
+    ]
+
+    pivot_fund = models.ForeignKey(
+        XX_PivotFund, on_delete=models.CASCADE, related_name="movements"
+    )
+    decide = models.CharField(max_length=10, choices=DECIDE_CHOICES)
+    transaction_id = models.IntegerField(null=True, blank=True)
+    transfer_id = models.IntegerField(null=True, blank=True)
+    encumbrance_delta = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    actual_delta = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    encumbrance_after = models.DecimalField(max_digits=30, decimal_places=2)
+    actual_after = models.DecimalField(max_digits=30, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "XX_PIVOTFUND_MOVEMENT_XX"
+        indexes = [
+            models.Index(fields=["pivot_fund", "id"], name="pivot_move_fund_idx"),
+            models.Index(fields=["transaction_id"], name="pivot_move_txn_idx"),
+        ]
+
+    def __str__(self):
+        return f"Pivot fund {self.pivot_fund_id} {self.decide}: {self.encumbrance_delta}/{self.actual_delta}"
+
+
 class XX_TransactionAudit(models.Model):
     """Model representing ADJD transaction audit records"""
 
@@ -798,10 +837,58 @@ class XX_ACCOUNT_ENTITY_LIMIT(models.Model):
         unique_together = ("account_id", "entity_id")
 
 
+class XX_BalanceReportSnapshot(models.Model):
+    """
+    One download of the Oracle balance report for a control budget and period.
+
+    Rows of a snapshot are never changed after it is loaded. A refresh loads a
+    new snapshot and then flips is_active from the previous one, so readers only
+    ever see a complete report.
+    """
+
+    STATUS_CHOICES = [
+        ("loading", "Loading"),
+        ("ready", "Ready"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    control_budget_name = models.CharField(max_length=100)
+    period_name = models.CharField(max_length=20)
+    fetched_at = models.DateTimeField(default=timezone.now)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="loading")
+    is_active = models.BooleanField(default=False)
+    row_count = models.IntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    activated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Balance Report Snapshot {self.id}: {self.control_budget_name} {self.period_name} ({self.status})"
+
+    class Meta:
+        db_table = "XX_BALANCE_REPORT_SNAPSHOT_XX"
+        verbose_name = "Balance Report Snapshot"
+        verbose_name_plural = "Balance Report Snapshots"
+        indexes = [
+            models.Index(
+                fields=["control_budget_name", "period_name", "is_active"],
+                name="balance_snapshot_key_idx",
+            ),
+        ]
+
+
 class XX_BalanceReport(models.Model):
     """Model representing balance report data from report.xlsx"""
 
     id = models.AutoField(primary_key=True)
+    snapshot = models.ForeignKey(
+        XX_BalanceReportSnapshot,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="rows",
+        help_text="Report download this row belongs to",
+    )
     control_budget_name = models.CharField(
         max_length=100, null=True, blank=True, help_text="Control Budget Name"
     )
@@ -906,3 +993,111 @@ class XX_Entity_mapping(models.Model):
     class Meta:
         db_table = "XX_ENTITY_MAPPING__elies_XX"
         unique_together = ("source_entity", "target_entity")
+
+
+class XX_BalanceReportRefreshLock(models.Model):
+    """
+    Lock of the background refresh of one control budget and period.
+
+    Taken with a conditional UPDATE by account_and_entitys.tasks.request_balance_report_refresh
+    and released by the refresh, so web processes and Celery workers agree on
+    whether a refresh is running. locked_until bounds a lock whose worker died.
+    """
+
+    control_budget_name = models.CharField(max_length=100)
+    period_name = models.CharField(max_length=20)
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "XX_BALANCE_REFRESH_LOCK_XX"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["control_budget_name", "period_name"],
+                name="unique_balance_refresh_lock",
+            )
+        ]
+
+    def __str__(self):
+        return f"Balance refresh lock {self.control_budget_name} {self.period_name}"
+
+
+class XX_UploadJob(models.Model):
+    """
+    Excel upload processed in the background.
+
+    The workbook is kept in the "uploads" blob store under file_sha256 while a
+    worker imports it batch by batch (each batch commits on its own) and saves
+    its progress. When the job ends, summary holds the counts and the first
+    rejected rows, and the full list of rejected rows is a CSV report in the
+    blob store under report_sha256. A running job whose updated_at stops moving
+    lost its worker and is failed by resume_upload_jobs.
+    """
+
+    KIND_CHOICES = [
+        ("projects", "Projects"),
+        ("accounts", "Accounts"),
+        ("entities", "Entities"),
+        ("account_mappings", "Account mappings"),
+        ("project_envelopes", "Project envelopes"),
+        ("budget_data", "Budget data"),
+        ("account_entity_limits", "Account/entity limits"),
+        ("transaction_transfers", "Transaction transfers"),
+    ]
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    user = models.ForeignKey(
+        "user_management.xx_User",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="upload_jobs",
+    )
+    file_name = models.CharField(max_length=255)
+    file_sha256 = models.CharField(max_length=64, null=True, blank=True)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    rows_total = models.IntegerField(null=True, blank=True)
+    rows_processed = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    summary = models.JSONField(null=True, blank=True)
+    report_sha256 = models.CharField(max_length=64, null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "XX_UPLOAD_JOB_XX"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "status"], name="upload_job_user_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"Upload job {self.id} ({self.kind}/{self.status})"
+
+
+class XX_HierarchyVersion(models.Model):
+    """
+    Change counter of one code tree (XX_Project, XX_Account, XX_Entity).
+
+    Bumped by account_and_entitys.hierarchy.invalidate_hierarchy_index in the
+    transaction that changes the tree, so every process can tell whether its
+    in-memory index (and the entity scopes built from it) is current.
+    """
+
+    tree = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "XX_HIERARCHY_VERSION_XX"
+
+    def __str__(self):
+        return f"{self.tree} v{self.version}"
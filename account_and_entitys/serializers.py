@@ -33,6 +33,13 @@ class AccountEntityLimitSerializer(serializers.ModelSerializer):
         model = XX_ACCOUNT_ENTITY_LIMIT
         fields = '__all__'
 
+
+class AccountEntityLimitUploadSerializer(AccountEntityLimitSerializer):
+    """Row validation for Excel uploads; (account_id, entity_id) uniqueness is checked per batch"""
+
+    class Meta(AccountEntityLimitSerializer.Meta):
+        validators = []
+
 class BalanceReportSerializer(serializers.ModelSerializer):
     """Serializer for Balance Report model"""
     
@@ -0,0 +1,44 @@
+"""
+Django signals for the account/entity/project master data
+Keeps the in-memory hierarchy index in sync with the tree tables and journals
+direct edits of pivot fund balances
+"""
+
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from public_funtion.update_pivot_fund import record_pivot_fund_adjustment
+
+from .hierarchy import invalidate_hierarchy_index
+from .models import XX_Account, XX_Entity, XX_PivotFund, XX_Project
+
+
+@receiver(post_save, sender=XX_Project)
+@receiver(post_delete, sender=XX_Project)
+@receiver(post_save, sender=XX_Account)
+@receiver(post_delete, sender=XX_Account)
+@receiver(post_save, sender=XX_Entity)
+@receiver(post_delete, sender=XX_Entity)
+def invalidate_hierarchy_on_change(sender, **kwargs):
+    """Drop the cached tree of the changed model"""
+    invalidate_hierarchy_index(sender)
+
+
+@receiver(pre_save, sender=XX_PivotFund)
+def remember_pivot_fund_balances(sender, instance, raw=False, **kwargs):
+    """Keep the stored balances so post_save can journal what the save changed"""
+    if raw or instance.pk is None:
+        instance._balances_before = None
+        return
+    instance._balances_before = (
+        sender.objects.filter(pk=instance.pk).values_list("encumbrance", "actual").first()
+    )
+
+
+@receiver(post_save, sender=XX_PivotFund)
+def journal_pivot_fund_adjustment(sender, instance, created, raw=False, **kwargs):
+    """Record a direct balance change as an adjustment movement"""
+    before = getattr(instance, "_balances_before", None)
+    if raw or created or before is None:
+        return
+    record_pivot_fund_adjustment(instance, *before)
@@ -0,0 +1,443 @@
+# account_and_entitys/tasks.py
+"""
+Background work of the account_and_entitys app
+
+Balance report refresh: readers never download the Oracle balance report
+themselves. They read the active snapshot and ask for a refresh here, either
+explicitly (refresh=async) or because the snapshot is stale. One refresh runs
+per budget/period at a time (a Celery task when a broker is configured,
+otherwise a local thread), guarded by an XX_BalanceReportRefreshLock row that
+every process sees, and the beat schedule refreshes stale active snapshots
+periodically.
+
+Upload jobs: a large Excel upload is stored in the "uploads" blob store and
+answered right away with an XX_UploadJob. run_upload_job() then imports it
+batch by batch, saving rows_processed and pushing progress to the owner's
+NotificationConsumer group after every batch. Rejected rows end up in a CSV
+report next to the upload. Batches commit on their own, so a job whose worker
+died half way is failed rather than imported again: resume_upload_jobs()
+re-queues queued jobs and fails running ones without progress for
+UPLOAD_JOB_STALE_SECONDS, which also releases their workbook.
+"""
+import csv
+import io
+import json
+import logging
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from celery import shared_task
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from budget_transfer.global_function.blob_store import BlobStore
+from budget_transfer.global_function.dispatch import dispatch
+
+from .bulk_upload import UploadFormatError, iter_sheet_rows, sheet_row_count
+from .models import XX_BalanceReportRefreshLock, XX_BalanceReportSnapshot, XX_UploadJob
+from .utils import balance_report_max_age, refresh_balance_report_data
+
+logger = logging.getLogger("budget_transfer_signals")
+
+
+def _referenced_uploads(keys):
+    """Workbooks of unfinished jobs (finished jobs clear file_sha256) and error reports"""
+    referenced = set()
+    for file_sha256, report_sha256 in XX_UploadJob.objects.filter(
+        Q(file_sha256__in=keys) | Q(report_sha256__in=keys)
+    ).values_list("file_sha256", "report_sha256"):
+        referenced.update((file_sha256, report_sha256))
+    return referenced
+
+
+upload_store = BlobStore("uploads", references=_referenced_uploads)
+
+# Importer of each upload kind: callable(rows, on_flush=None, **job.params) -> summary dict
+UPLOAD_IMPORTERS = {
+    "projects": "account_and_entitys.upload_importers.import_projects",
+    "accounts": "account_and_entitys.upload_importers.import_accounts",
+    "entities": "account_and_entitys.upload_importers.import_entities",
+    "account_mappings": "account_and_entitys.upload_importers.import_account_mappings",
+    "project_envelopes": "account_and_entitys.upload_importers.import_project_envelopes",
+    "budget_data": "account_and_entitys.upload_importers.import_budget_data",
+    "account_entity_limits": "account_and_entitys.upload_importers.import_account_entity_limits",
+    "transaction_transfers": "transaction.uploads.import_transaction_transfers",
+}
+
+# Rejected rows kept in the job summary; the full list is in the error report
+UPLOAD_SUMMARY_ERRORS = 50
+
+def _lock_seconds():
+    return getattr(settings, "BALANCE_REPORT_REFRESH_LOCK_SECONDS", 600)
+
+
+def _refresh_lock(control_budget_name, period_name):
+    return XX_BalanceReportRefreshLock.objects.filter(
+        control_budget_name=control_budget_name, period_name=str(period_name).lower()
+    )
+
+
+def _acquire_refresh_lock(control_budget_name, period_name):
+    """Take the refresh lock of a budget/period unless a refresh holds it."""
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=_lock_seconds())
+    lock = _refresh_lock(control_budget_name, period_name)
+    if lock.filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now)).update(
+        locked_until=locked_until
+    ):
+        return True
+    if lock.exists():
+        return False
+    try:
+        with transaction.atomic():
+            XX_BalanceReportRefreshLock.objects.create(
+                control_budget_name=control_budget_name,
+                period_name=str(period_name).lower(),
+                locked_until=locked_until,
+            )
+        return True
+    except IntegrityError:
+        # Taken concurrently
+        return False
+
+
+def is_balance_refresh_running(control_budget_name, period_name):
+    return _refresh_lock(control_budget_name, period_name).filter(
+        locked_until__gte=timezone.now()
+    ).exists()
+
+
+def request_balance_report_refresh(control_budget_name="MIC_HQ_MONTHLY", period_name="sep-25"):
+    """
+    Queue a background refresh of a budget/period unless one is already running.
+
+    Returns:
+        bool: True if a refresh was queued by this call
+    """
+    if not _acquire_refresh_lock(control_budget_name, period_name):
+        return False
+
+    dispatch(refresh_balance_report_task, [control_budget_name, period_name])
+    return True
+
+
+@shared_task
+def refresh_balance_report_task(control_budget_name, period_name):
+    """Download the report into a new snapshot and activate it."""
+    try:
+        result = refresh_balance_report_data(control_budget_name, period_name)
+        if result["success"]:
+            logger.info(f"Balance report {control_budget_name}/{period_name} refreshed: {result['message']}")
+        else:
+            logger.error(f"Balance report {control_budget_name}/{period_name} refresh failed: {result['message']}")
+        return {"success": result["success"], "message": result["message"]}
+    finally:
+        _refresh_lock(control_budget_name, period_name).update(locked_until=None)
+
+
+@shared_task
+def refresh_stale_balance_reports():
+    """
+    Queue a refresh for every active snapshot older than BALANCE_REPORT_MAX_AGE_SECONDS.
+
+    Returns:
+        int: Number of refreshes queued
+    """
+    cutoff = timezone.now() - timedelta(seconds=balance_report_max_age())
+    stale = XX_BalanceReportSnapshot.objects.filter(is_active=True, fetched_at__lt=cutoff).values_list(
+        "control_budget_name", "period_name"
+    )
+    queued = 0
+    for control_budget_name, period_name in stale:
+        if request_balance_report_refresh(control_budget_name, period_name):
+            queued += 1
+    return queued
+
+
+def _upload_stale_seconds():
+    return getattr(settings, "UPLOAD_JOB_STALE_SECONDS", 1800)
+
+
+def upload_async_requested(request):
+    """
+    Whether an upload view should answer with a job instead of importing in the request
+    (?async=true or an "async" form field; EXCEL_UPLOAD_ASYNC_DEFAULT otherwise).
+    """
+    value = request.query_params.get("async", request.data.get("async"))
+    if value is None or value == "":
+        return getattr(settings, "EXCEL_UPLOAD_ASYNC_DEFAULT", False)
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def upload_job_payload(job):
+    """Serializable view of an upload job for API responses and websocket messages"""
+    progress = None
+    if job.rows_total:
+        progress = min(100, round(job.rows_processed * 100 / job.rows_total))
+    elif job.status == "succeeded":
+        progress = 100
+
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "file_name": job.file_name,
+        "rows_total": job.rows_total,
+        "rows_processed": job.rows_processed,
+        "progress": progress,
+        "error_count": job.error_count,
+        "summary": job.summary,
+        "error": job.error,
+        "status_url": reverse("upload-job-status", args=[job.id]),
+        "error_report_url": (
+            reverse("upload-job-error-report", args=[job.id]) if job.report_sha256 else None
+        ),
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def _notify_upload(job, message, notification_type="info"):
+    """Push upload progress to the owner's NotificationConsumer group."""
+    if not job.user_id:
+        return
+    try:
+        if job.status in ("succeeded", "failed"):
+            # Final outcome is also stored as a regular notification
+            from user_management.utils import send_notification
+
+            send_notification(job.user, message, notification_type)
+            return
+
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(
+            f"user_{job.user_id}",
+            {
+                "type": "send_notification",
+                "message": {
+                    "type": "upload_job",
+                    "message": message,
+                    **upload_job_payload(job),
+                },
+            },
+        )
+    except Exception as e:
+        logger.error(f"Could not notify user for upload job {job.id}: {e}")
+
+
+def _save_upload_job(job, message=None, notification_type="info", **fields):
+    for field, value in fields.items():
+        setattr(job, field, value)
+    job.save()
+    if message:
+        _notify_upload(job, message, notification_type)
+
+
+def start_upload_job(kind, uploaded_file, user=None, params=None):
+    """
+    Store an uploaded workbook and queue its import once the current transaction commits.
+
+    Args:
+        kind (str): One of UPLOAD_IMPORTERS
+        uploaded_file: Django UploadedFile
+        user: Owner notified of the progress
+        params (dict): Extra keyword arguments of the importer (JSON serializable)
+
+    Returns:
+        XX_UploadJob: The queued job
+    """
+    if kind not in UPLOAD_IMPORTERS:
+        raise ValueError(f"Unknown upload kind: {kind}")
+
+    sha256, _ = upload_store.save_upload(uploaded_file)
+    job = XX_UploadJob.objects.create(
+        kind=kind,
+        user=user if user is not None and user.is_authenticated else None,
+        file_name=uploaded_file.name,
+        file_sha256=sha256,
+        params=params or {},
+    )
+    transaction.on_commit(lambda: enqueue_upload_job(job.id))
+    return job
+
+
+def enqueue_upload_job(job_id):
+    """
+    Queue run_upload_job for job_id: on Celery when a broker is configured,
+    otherwise on a local thread.
+    """
+    dispatch(run_upload_job, [job_id])
+
+
+def _error_report(errors):
+    """CSV of rejected rows: row | error | details (the rest of the entry as JSON)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["row", "error", "details"])
+    for entry in errors:
+        details = {k: v for k, v in entry.items() if k not in ("row", "error", "errors")}
+        error = entry.get("error", entry.get("errors"))
+        writer.writerow(
+            [
+                entry.get("row", ""),
+                error if isinstance(error, str) else json.dumps(error, default=str),
+                json.dumps(details, default=str) if details else "",
+            ]
+        )
+    return buffer.getvalue().encode("utf-8")
+
+
+def _release_upload(job):
+    """Delete the stored workbook unless another unfinished job uses the same file."""
+    sha256 = job.file_sha256
+    if not sha256:
+        return
+    XX_UploadJob.objects.filter(pk=job.pk).update(file_sha256=None)
+    job.file_sha256 = None
+    upload_store.release(sha256)
+
+
+@shared_task
+def run_upload_job(job_id):
+    """
+    Import a queued upload. Every batch commits on its own and updates the progress.
+
+    Returns:
+        dict: upload_job_payload() of the finished job
+    """
+    # Claim the job so a duplicate delivery does not import the file twice
+    now = timezone.now()
+    claimed = XX_UploadJob.objects.filter(pk=job_id, status="queued").update(
+        status="running", started_at=now, updated_at=now
+    )
+    job = XX_UploadJob.objects.select_related("user").get(pk=job_id)
+    if not claimed:
+        logger.info(f"Upload job {job_id} is {job.status}, nothing to do")
+        return upload_job_payload(job)
+
+    label = f"{job.get_kind_display()} upload {job.file_name}"
+    try:
+        importer = import_string(UPLOAD_IMPORTERS[job.kind])
+        with upload_store.open(job.file_sha256) as fileobj:
+            _save_upload_job(
+                job,
+                f"{label} started",
+                rows_total=sheet_row_count(fileobj, job.file_name),
+            )
+
+            processed = [0]
+
+            def rows():
+                for row in iter_sheet_rows(fileobj, job.file_name):
+                    processed[0] += 1
+                    yield row
+
+            def on_flush():
+                _save_upload_job(
+                    job,
+                    f"{label}: {processed[0]} rows processed",
+                    rows_processed=processed[0],
+                )
+
+            result = importer(rows(), on_flush=on_flush, **job.params)
+
+        errors = result.pop("errors", [])
+        if isinstance(result.get("created"), list):
+            result.pop("created")  # serialized rows: created_count is kept
+        report_sha256 = upload_store.save_bytes(_error_report(errors))[0] if errors else None
+        result["errors"] = errors[:UPLOAD_SUMMARY_ERRORS]
+
+        _save_upload_job(
+            job,
+            f"{label} finished: {len(errors)} rows rejected"
+            if errors
+            else f"{label} finished",
+            "warning" if errors else "success",
+            status="succeeded",
+            rows_processed=processed[0],
+            error_count=len(errors),
+            summary=result,
+            report_sha256=report_sha256,
+            finished_at=timezone.now(),
+        )
+    except UploadFormatError as e:
+        logger.error(f"Upload job {job.id} rejected: {e}")
+        _save_upload_job(
+            job,
+            f"{label} failed: {e}",
+            "error",
+            status="failed",
+            error=str(e),
+            summary=e.details,
+            finished_at=timezone.now(),
+        )
+    except Exception as e:
+        logger.error(f"Upload job {job.id} failed: {e}")
+        _save_upload_job(
+            job,
+            f"{label} failed: {e}",
+            "error",
+            status="failed",
+            error=str(e),
+            finished_at=timezone.now(),
+        )
+    finally:
+        _release_upload(job)
+
+    return upload_job_payload(job)
+
+
+def resumable_upload_job_ids():
+    return list(XX_UploadJob.objects.filter(status="queued").values_list("id", flat=True))
+
+
+def fail_stale_upload_jobs():
+    """
+    Fail the running jobs without a progress save for UPLOAD_JOB_STALE_SECONDS
+    (their worker died) and release their workbooks.
+
+    Returns:
+        int: Number of jobs failed
+    """
+    cutoff = timezone.now() - timedelta(seconds=_upload_stale_seconds())
+    failed = 0
+    for job_id in XX_UploadJob.objects.filter(
+        status="running", updated_at__lt=cutoff
+    ).values_list("id", flat=True):
+        # Conditional, so a job that saved progress meanwhile keeps running
+        if not XX_UploadJob.objects.filter(
+            pk=job_id, status="running", updated_at__lt=cutoff
+        ).update(
+            status="failed",
+            error="The upload stopped without progress; upload the file again",
+            finished_at=timezone.now(),
+        ):
+            continue
+        job = XX_UploadJob.objects.select_related("user").get(pk=job_id)
+        logger.error(f"Upload job {job.id} failed: no progress since {job.updated_at}")
+        _release_upload(job)
+        _notify_upload(job, f"{job.get_kind_display()} upload {job.file_name} failed: {job.error}", "error")
+        failed += 1
+    return failed
+
+
+@shared_task
+def resume_upload_jobs():
+    """
+    Fail stale running upload jobs and re-queue the queued ones (e.g. after a
+    restart lost their local thread).
+
+    Returns:
+        dict: Number of jobs failed and queued
+    """
+    failed = fail_stale_upload_jobs()
+    job_ids = resumable_upload_job_ids()
+    for job_id in job_ids:
+        enqueue_upload_job(job_id)
+    return {"failed": failed, "queued": len(job_ids)}
@@ -0,0 +1,345 @@
+"""
+Row processing of the master-data Excel uploads
+
+Each importer takes the (row_number, values) pairs of iter_sheet_rows() and
+returns the summary its upload view responds with. The views call them inside
+one transaction; upload jobs call them without one, so every batch commits on
+its own and on_flush() can report progress.
+"""
+import math
+import re
+from decimal import Decimal, InvalidOperation
+
+from .bulk_upload import BulkUpsert, ON_EXISTING_ERROR, ON_EXISTING_SKIP
+from .models import (
+    XX_Account,
+    XX_Entity,
+    XX_Project,
+    XX_ACCOUNT_ENTITY_LIMIT,
+    Account_Mapping,
+    Budget_data,
+    Project_Envelope,
+)
+
+
+def _cell(row, position):
+    return row[position] if len(row) > position else None
+
+
+def _import_tree(model, code_field, context_field, rows, on_flush=None):
+    """ProjectCode | ParentCode | AliasDefault rows upserted by code"""
+    upsert = BulkUpsert(
+        model, (code_field,), ("parent", "alias_default"), on_flush=on_flush
+    )
+    skipped = 0
+
+    # Assume header may be present; detect header by non-numeric first row
+    first = True
+    for _, row in rows:
+        # Normalize columns: code, parent_code, alias_default
+        code = str(row[0]).strip() if row[0] is not None else None
+        parent_code = (
+            str(row[1]).strip() if len(row) > 1 and row[1] is not None else None
+        )
+        alias_default = (
+            str(row[2]).strip() if len(row) > 2 and row[2] is not None else None
+        )
+
+        # If the first row looks like a header (non-numeric code) we skip it
+        if first:
+            first = False
+            if code and not any(ch.isdigit() for ch in code):
+                continue
+
+        if not code:
+            skipped += 1
+            continue
+
+        upsert.add(
+            {code_field: code, "parent": parent_code, "alias_default": alias_default},
+            {context_field: code},
+        )
+    upsert.finish()
+
+    return {
+        "created": upsert.created,
+        "updated": upsert.updated,
+        "skipped": skipped,
+        "errors": upsert.errors,
+    }
+
+
+def import_projects(rows, on_flush=None):
+    return _import_tree(XX_Project, "project", "project_code", rows, on_flush)
+
+
+def import_accounts(rows, on_flush=None):
+    return _import_tree(XX_Account, "account", "account_code", rows, on_flush)
+
+
+def import_entities(rows, on_flush=None):
+    return _import_tree(XX_Entity, "entity", "entity_code", rows, on_flush)
+
+
+def import_account_mappings(rows, on_flush=None):
+    """Source | Target rows; existing pairs are counted as duplicates"""
+    upsert = BulkUpsert(
+        Account_Mapping,
+        ("source_account", "target_account"),
+        on_existing=ON_EXISTING_SKIP,
+        on_flush=on_flush,
+    )
+    skipped = 0
+
+    def normalize(value):
+        if value is None:
+            return None
+        if isinstance(value, float):
+            if math.isnan(value):
+                return None
+            if value.is_integer():
+                return str(int(value))
+        return str(value).strip()
+
+    first_row = True
+    for idx, row in rows:
+        source_account = normalize(_cell(row, 0))
+        target_account = normalize(_cell(row, 1))
+
+        if first_row:
+            first_row = False
+            lower_source = (source_account or "").lower()
+            lower_target = (target_account or "").lower()
+            if lower_source in {"source", "source_account"} or lower_target in {
+                "target",
+                "target_account",
+            }:
+                continue
+
+        if not source_account or not target_account:
+            skipped += 1
+            continue
+
+        upsert.add(
+            {"source_account": source_account, "target_account": target_account},
+            {
+                "row": idx,
+                "source_account": source_account,
+                "target_account": target_account,
+            },
+        )
+    upsert.finish()
+
+    return {
+        "created": upsert.created,
+        "duplicates": upsert.duplicates,
+        "skipped": skipped,
+        "errors": upsert.errors,
+    }
+
+
+def import_project_envelopes(rows, on_flush=None):
+    """ProjectCodeWithAlias | EnvelopeNumber rows upserted by project code"""
+    upsert = BulkUpsert(Project_Envelope, ("project",), ("envelope",), on_flush=on_flush)
+    skipped = 0
+
+    def extract_project_code(raw_value):
+        """Return the leading numeric project code from the provided cell."""
+        if raw_value is None:
+            return None
+        if isinstance(raw_value, int):
+            return str(raw_value)
+        if isinstance(raw_value, float):
+            if math.isnan(raw_value):
+                return None
+            if raw_value.is_integer():
+                return str(int(raw_value))
+            return str(raw_value)
+        value_str = str(raw_value).strip()
+        match = re.match(r"^\s*(\d+)", value_str)
+        return match.group(1) if match else None
+
+    for idx, row in rows:
+        project_code = extract_project_code(_cell(row, 0))
+        envelope_raw = _cell(row, 1)
+
+        if not project_code:
+            skipped += 1
+            continue
+
+        if envelope_raw is None or (
+            isinstance(envelope_raw, str) and envelope_raw.strip() == ""
+        ):
+            skipped += 1
+            continue
+
+        try:
+            if isinstance(envelope_raw, str):
+                cleaned = re.sub(r"[^0-9.\-]", "", envelope_raw.replace(",", ""))
+                envelope_val = Decimal(cleaned) if cleaned != "" else None
+            else:
+                envelope_val = Decimal(envelope_raw)
+        except (InvalidOperation, TypeError):
+            upsert.errors.append(
+                {
+                    "row": idx,
+                    "project_code": project_code,
+                    "error": f"Invalid envelope value: {envelope_raw}",
+                }
+            )
+            continue
+
+        if envelope_val is None:
+            skipped += 1
+            continue
+
+        upsert.add(
+            {"project": project_code, "envelope": envelope_val},
+            {"row": idx, "project_code": project_code},
+        )
+    upsert.finish()
+
+    return {
+        "created": upsert.created,
+        "updated": upsert.updated,
+        "skipped": skipped,
+        "errors": upsert.errors,
+    }
+
+
+def import_budget_data(rows, on_flush=None):
+    """Project | Account | FY24 | FY25 rows upserted by (project, account)"""
+    upsert = BulkUpsert(
+        Budget_data,
+        ("project", "account"),
+        ("FY24_budget", "FY25_budget"),
+        on_flush=on_flush,
+    )
+    skipped = 0
+
+    def extract_project_code(raw_value):
+        """Return the project code from the provided cell."""
+        if raw_value is None:
+            return None
+        if isinstance(raw_value, int):
+            return str(raw_value)
+        if isinstance(raw_value, float):
+            if math.isnan(raw_value):
+                return None
+            if raw_value.is_integer():
+                return str(int(raw_value))
+            return str(raw_value)
+        return str(raw_value).strip() or None
+
+    def normalize_account(raw_value):
+        if raw_value is None:
+            return None
+        if isinstance(raw_value, float):
+            if math.isnan(raw_value):
+                return None
+            if raw_value.is_integer():
+                return str(int(raw_value))
+            return str(raw_value)
+        value_str = str(raw_value).strip()
+        return value_str or None
+
+    def parse_budget(raw_value, label):
+        if raw_value is None:
+            return Decimal("0")
+        if isinstance(raw_value, int):
+            return Decimal(raw_value)
+        if isinstance(raw_value, float):
+            if math.isnan(raw_value):
+                return Decimal("0")
+            return Decimal(str(raw_value))
+        value_str = str(raw_value).strip()
+        if not value_str:
+            return Decimal("0")
+        cleaned = re.sub(r"[^0-9.\-]", "", value_str)
+        if cleaned in {"", "-", ".", "-.", ".-"}:
+            return Decimal("0")
+        try:
+            return Decimal(cleaned)
+        except InvalidOperation as exc:
+            raise ValueError(f"Invalid {label} value: {raw_value}") from exc
+
+    for idx, row in rows:
+        project_code = extract_project_code(_cell(row, 0))
+        account_code = normalize_account(_cell(row, 1))
+
+        if not project_code or not account_code:
+            skipped += 1
+            continue
+
+        try:
+            fy24_budget = parse_budget(_cell(row, 2), "FY24 budget")
+            fy25_budget = parse_budget(_cell(row, 3), "FY25 budget")
+        except ValueError as budget_err:
+            upsert.errors.append(
+                {
+                    "row": idx,
+                    "project": project_code,
+                    "account": account_code,
+                    "error": str(budget_err),
+                }
+            )
+            continue
+
+        upsert.add(
+            {
+                "project": project_code,
+                "account": account_code,
+                "FY24_budget": fy24_budget,
+                "FY25_budget": fy25_budget,
+            },
+            {"row": idx, "project": project_code, "account": account_code},
+        )
+    upsert.finish()
+
+    return {
+        "created": upsert.created,
+        "updated": upsert.updated,
+        "skipped": skipped,
+        "errors": upsert.errors,
+    }
+
+
+def import_account_entity_limits(rows, on_flush=None):
+    """Rows of a sheet whose header holds AccountEntityLimitSerializer field names; create only"""
+    from .serializers import AccountEntityLimitUploadSerializer
+
+    upsert = BulkUpsert(
+        XX_ACCOUNT_ENTITY_LIMIT,
+        ("account_id", "entity_id"),
+        on_existing=ON_EXISTING_ERROR,
+        existing_error={
+            "errors": {
+                "non_field_errors": [
+                    "The fields account_id, entity_id must make a unique set."
+                ]
+            }
+        },
+        on_flush=on_flush,
+    )
+
+    columns = None
+    for idx, row in rows:
+        # First row holds the column names (lowercase, stripped)
+        if columns is None:
+            columns = [str(c).strip().lower() if c is not None else "" for c in row]
+            continue
+
+        record = {
+            column: (None if value in ("", "NULL", "null") else value)
+            for column, value in zip(columns, row)
+            if column
+        }
+        # Uniqueness is checked per batch by the upsert, not per row
+        serializer = AccountEntityLimitUploadSerializer(data=record)
+        if not serializer.is_valid():
+            upsert.errors.append({"row": idx, "errors": serializer.errors, "data": record})
+            continue
+        upsert.add(serializer.validated_data, {"row": idx, "data": record})
+    upsert.finish()
+
+    return {"created_count": upsert.created, "errors": upsert.errors}
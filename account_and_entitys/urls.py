@@ -44,6 +44,8 @@ from .views import (
     UploadAccountMappingView,
     UploadBudgetDataView,
     UploadMappingExcelView,
+    UploadJobStatusView,
+    UploadJobErrorReportView,
     # AccountMappingListView,
     EntityMappingListView,
     # AccountMappingDetailView,
@@ -209,6 +211,17 @@ urlpatterns = [
         UploadAccountMappingView.as_view(),
         name="upload-account-mapping",
     ),
+    # Background upload jobs (?async=true on the upload endpoints)
+    path(
+        "upload-jobs/<int:pk>/",
+        UploadJobStatusView.as_view(),
+        name="upload-job-status",
+    ),
+    path(
+        "upload-jobs/<int:pk>/error-report/",
+        UploadJobErrorReportView.as_view(),
+        name="upload-job-error-report",
+    ),
     # Mapping URLs
     path(
         "project-wise-dashboard/",
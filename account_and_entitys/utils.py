@@ -1,22 +1,38 @@
 """
 Utility functions for account_and_entitys app
 """
-import requests
-import base64
-import xml.etree.ElementTree as ET
+import os
 from xml.sax.saxutils import escape
 import pandas as pd
 from decimal import Decimal, InvalidOperation
-from django.db import transaction
-from .models import XX_BalanceReport
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import XX_BalanceReport, XX_BalanceReportSnapshot
 import json
 import io
+from concurrent.futures import ThreadPoolExecutor
+from django.core.cache import cache
+from budget_transfer.global_function.artifacts import scoped_workspace
+from budget_transfer.global_function.oracle_client import oracle_soap_post, stream_report_bytes
 
 from .models import XX_Entity_mapping
 
 
 
 ######################################################### Oracle Fsuion Balance Report Integration #########################################################
+BI_PUBLISHER_URL = "https://hcbg-dev4.fa.ocs.oraclecloud.com:443/xmlpserver/services/ExternalReportWSSService"
+
+
+def _bi_publisher_endpoint():
+    """BI Publisher report service URL and credentials (overridable in settings)"""
+    url = getattr(settings, "ORACLE_BI_REPORT_URL", None) or BI_PUBLISHER_URL
+    username = getattr(settings, "ORACLE_BI_USERNAME", None) or "AFarghaly"
+    password = getattr(settings, "ORACLE_BI_PASSWORD", None) or "Mubadala345"
+    return url, (username, password)
+
+
 def safe_decimal_convert(value):
     """Safely convert value to Decimal, handling various input types"""
     if pd.isna(value) or value is None or value == '':
@@ -49,9 +65,7 @@ def download_oracle_report(control_budget_name="MIC_HQ_MONTHLY", period_name="se
         bool: True if download successful, False otherwise
     """
     try:
-        url = "https://hcbg-dev4.fa.ocs.oraclecloud.com:443/xmlpserver/services/ExternalReportWSSService"
-        username = "AFarghaly"
-        password = "Mubadala345"
+        url, auth = _bi_publisher_endpoint()
 
         escaped_param = escape(control_budget_name)
         escaped_param2 = escape(period_name)
@@ -90,26 +104,23 @@ def download_oracle_report(control_budget_name="MIC_HQ_MONTHLY", period_name="se
            "Content-Type": "application/soap+xml;charset=UTF-8"
         }
 
-        response = requests.post(url, data=soap_body.encode('utf-8'), headers=headers, auth=(username, password))
+        response = oracle_soap_post(url, soap_body, headers=headers, auth=auth, operation="runReport", stream=True)
 
         if response.status_code == 200:
-           ns = {
-              "soap12": "http://www.w3.org/2003/05/soap-envelope",
-              "pub": "http://xmlns.oracle.com/oxp/service/PublicReportService"
-           }
-           root = ET.fromstring(response.text)
-           report_bytes_element = root.find(".//pub:reportBytes", ns)
-           
-           if report_bytes_element is not None and report_bytes_element.text:
-              excel_data = base64.b64decode(report_bytes_element.text)
-              with open(save_path, "wb") as f:
-                    f.write(excel_data)
+           # Decode reportBytes straight into the file instead of holding the
+           # whole base64 payload in memory
+           with open(save_path, "wb") as f:
+              written = stream_report_bytes(response, f)
+
+           if written:
               print(f"✅ Report saved as {save_path}")
               return True
            else:
+              os.remove(save_path)
               print("❌ No <reportBytes> found in response")
               return False
         else:
+           response.close()
            print(f"❌ HTTP Error {response.status_code}")
            return False
            
@@ -148,9 +159,7 @@ def get_oracle_report_data(control_budget_name="MIC_HQ_MONTHLY", period_name="se
     }
     
     try:
-        url = "https://hcbg-dev4.fa.ocs.oraclecloud.com:443/xmlpserver/services/ExternalReportWSSService"
-        username = "AFarghaly"
-        password = "Mubadala345"
+        url, auth = _bi_publisher_endpoint()
 
         escaped_param = escape(control_budget_name)
         escaped_param2 = escape(period_name)
@@ -231,19 +240,14 @@ def get_oracle_report_data(control_budget_name="MIC_HQ_MONTHLY", period_name="se
         }
 
         print(f"🔍 Fetching Oracle report data for segments: {segment1}, {segment2}, {segment3}")
-        response = requests.post(url, data=soap_body.encode('utf-8'), headers=headers, auth=(username, password))
+        response = oracle_soap_post(url, soap_body, headers=headers, auth=auth, operation="runReport", stream=True)
 
         if response.status_code == 200:
-           ns = {
-              "soap12": "http://www.w3.org/2003/05/soap-envelope",
-              "pub": "http://xmlns.oracle.com/oxp/service/PublicReportService"
-           }
-           root = ET.fromstring(response.text)
-           report_bytes_element = root.find(".//pub:reportBytes", ns)
+           # Decode the Excel data (binary, don't decode as UTF-8) while reading the response
+           report_buffer = io.BytesIO()
            
-           if report_bytes_element is not None and report_bytes_element.text:
-              # Decode the Excel data (binary, don't decode as UTF-8)
-              excel_data = base64.b64decode(report_bytes_element.text)
+           if stream_report_bytes(response, report_buffer):
+              excel_data = report_buffer.getvalue()
               
               # Parse Excel data into DataFrame using BytesIO
               excel_reader = pd.read_excel(io.BytesIO(excel_data), engine='openpyxl')
@@ -313,6 +317,7 @@ def get_oracle_report_data(control_budget_name="MIC_HQ_MONTHLY", period_name="se
               print("❌ No <reportBytes> found in response")
               return result
         else:
+           response.close()
            result['message'] = f"HTTP Error {response.status_code}"
            print(f"❌ HTTP Error {response.status_code}")
            return result
@@ -323,185 +328,542 @@ def get_oracle_report_data(control_budget_name="MIC_HQ_MONTHLY", period_name="se
         return result
 
 
-def load_excel_to_balance_report_table(excel_file_path="report.xlsx", clear_existing=True):
+# Funds-availability lookups are cached per (control budget, period, segment triple)
+ORACLE_FUNDS_CACHE_TTL = 300  # seconds
+ORACLE_FUNDS_MAX_WORKERS = 8
+
+
+def _oracle_funds_cache_key(control_budget_name, period_name, segment1, segment2, segment3):
+    return "oracle_funds:{}:{}:{}:{}:{}".format(
+        control_budget_name, period_name, segment1, segment2, segment3
+    )
+
+
+def get_oracle_report_data_batch(combinations, control_budget_name="MIC_HQ_MONTHLY", period_name="sep-25",
+                                 max_workers=ORACLE_FUNDS_MAX_WORKERS, cache_ttl=ORACLE_FUNDS_CACHE_TTL):
+    """
+    Get funds-availability records for many segment combinations at once
+
+    Combinations already in the cache are served from it; the rest are fetched
+    from Oracle with a bounded number of concurrent requests and cached.
+
+    Args:
+        combinations (iterable): (segment1, segment2, segment3) tuples
+        control_budget_name (str): Budget name parameter for the report
+        period_name (str): Period name parameter
+        max_workers (int): Maximum number of concurrent Oracle requests
+        cache_ttl (int): Seconds to keep a successful lookup in the cache
+
+    Returns:
+        dict: Maps each (segment1, segment2, segment3) tuple to its first
+              record (dict) or None when Oracle returned no data
+    """
+    unique_combinations = list(dict.fromkeys(
+        (segment1, segment2, segment3) for segment1, segment2, segment3 in combinations
+    ))
+    if not unique_combinations:
+        return {}
+
+    keys = {
+        combination: _oracle_funds_cache_key(control_budget_name, period_name, *combination)
+        for combination in unique_combinations
+    }
+    cached = cache.get_many(list(keys.values()))
+
+    results = {}
+    missing = []
+    for combination, key in keys.items():
+        if key in cached:
+            results[combination] = cached[key]
+        else:
+            missing.append(combination)
+
+    if missing:
+        print(f"🔍 Fetching {len(missing)} of {len(unique_combinations)} segment combinations from Oracle")
+
+        def fetch(combination):
+            segment1, segment2, segment3 = combination
+            return combination, get_oracle_report_data(
+                control_budget_name=control_budget_name,
+                period_name=period_name,
+                segment1=segment1,
+                segment2=segment2,
+                segment3=segment3,
+            )
+
+        to_cache = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as executor:
+            for combination, response in executor.map(fetch, missing):
+                data = response.get('data')
+                record = data[0] if data else None
+                results[combination] = record
+                # Only cache real answers so a failed call is retried next time
+                if response.get('success'):
+                    to_cache[keys[combination]] = record
+        if to_cache:
+            cache.set_many(to_cache, cache_ttl)
+
+    return results
+
+
+# Excel column -> XX_BalanceReport field
+BALANCE_REPORT_TEXT_COLUMNS = {
+    'CONTROL_BUDGET_NAME': 'control_budget_name',
+    'LEDGER_NAME': 'ledger_name',
+    'AS_OF_PERIOD': 'as_of_period',
+    'SEGMENT1': 'segment1',
+    'SEGMENT2': 'segment2',
+    'SEGMENT3': 'segment3',
+}
+BALANCE_REPORT_AMOUNT_COLUMNS = {
+    'ENCUMBRANCE_PTD': 'encumbrance_ytd',
+    'OTHER_PTD': 'other_ytd',
+    'ACTUAL_PTD': 'actual_ytd',
+    'FUNDS_AVAILABLE_ASOF': 'funds_available_asof',
+    'BUDGET_PTD': 'budget_ytd',
+}
+# Rows are matched on this key when a report is reloaded
+BALANCE_REPORT_KEY_FIELDS = ('control_budget_name', 'as_of_period', 'segment1', 'segment2', 'segment3')
+BALANCE_REPORT_BATCH_SIZE = 1000
+
+
+def _text_column(series):
+    """Stripped strings, None for empty cells (same values the row-by-row loader stored)."""
+    return series.astype(object).map(lambda value: str(value).strip() if pd.notna(value) else None)
+
+
+def _decimal_column(series):
+    """
+    Column-wise Decimal conversion.
+
+    Returns:
+        (Series of Decimal/None, boolean Series marking cells that were not numbers)
+    """
+    raw = series.astype(object)
+    blank = raw.isna() | raw.map(lambda value: isinstance(value, str) and value.strip().lower() in ('', 'null', 'nan'))
+    numbers = pd.to_numeric(raw.where(~blank), errors='coerce')
+    invalid = numbers.isna() & ~blank
+    # repr() of the float keeps the same digits the old float -> str -> Decimal path produced
+    decimals = numbers.map(lambda value: Decimal(repr(float(value))) if pd.notna(value) else None).astype(object)
+    return decimals, invalid
+
+
+def _balance_row_changed(current, record):
+    """Compare a stored row with a loaded record at the stored precision (2 decimals)."""
+    for field, value in record.items():
+        stored = current.get(field)
+        if field in BALANCE_REPORT_AMOUNT_COLUMNS.values():
+            if (stored is None) != (value is None):
+                return True
+            if value is not None and Decimal(stored).quantize(Decimal('0.01')) != value.quantize(Decimal('0.01')):
+                return True
+        elif stored != value:
+            return True
+    return False
+
+
+def _update_balance_rows(rows, fields):
+    """
+    Update rows by id with one parameterised UPDATE executed in batches.
+
+    bulk_update() builds a CASE expression per field and row, which dominates
+    the load time for tens of thousands of changed rows.
+    """
+    if not rows:
+        return
+    qn = connection.ops.quote_name
+    meta = XX_BalanceReport._meta
+    model_fields = [meta.get_field(field) for field in fields]
+    sql = "UPDATE {} SET {} WHERE {} = %s".format(
+        qn(meta.db_table),
+        ", ".join(f"{qn(field.column)} = %s" for field in model_fields),
+        qn(meta.pk.column),
+    )
+    params = [
+        [field.get_db_prep_save(getattr(row, field.attname), connection) for field in model_fields] + [row.pk]
+        for row in rows
+    ]
+    with connection.cursor() as cursor:
+        for start in range(0, len(params), BALANCE_REPORT_BATCH_SIZE):
+            cursor.executemany(sql, params[start:start + BALANCE_REPORT_BATCH_SIZE])
+
+
+def _read_balance_report_frame(excel_file_path):
+    df = pd.read_excel(excel_file_path, header=0)
+
+    # Check if the first row contains column headers
+    if len(df) and df.iloc[0, 0] == 'CONTROL_BUDGET_NAME':
+        # First data row contains the headers, use it as column names
+        new_header = df.iloc[0]
+        df = df[1:]
+        df.columns = new_header
+        df.reset_index(drop=True, inplace=True)
+
+    df.columns = df.columns.astype(str).str.strip()
+    return df
+
+
+def load_excel_to_balance_report_table(excel_file_path="report.xlsx", clear_existing=True, snapshot=None):
     """
     Load Excel data into XX_BalanceReport table
-    
+
+    Rows are converted column by column and upserted in batches on
+    (control_budget_name, as_of_period, segment1, segment2, segment3). With
+    clear_existing, rows that are not in the new report are removed in the same
+    transaction, so readers never see an empty or half-loaded table.
+
     Args:
-        excel_file_path (str): Path to the Excel file
-        clear_existing (bool): Whether to clear existing data before loading
-        
+        excel_file_path (str): Path to the Excel file (or a file-like object)
+        clear_existing (bool): Remove rows that are not in the loaded report
+        snapshot (XX_BalanceReportSnapshot): Snapshot the rows belong to; only
+            rows of that snapshot are matched and cleared
+
     Returns:
-        dict: Result with success status, created count, and error details
+        dict: Result with success status, created/updated/deleted counts and per-row errors
     """
     result = {
         'success': False,
         'created_count': 0,
+        'updated_count': 0,
+        'unchanged_count': 0,
         'error_count': 0,
         'deleted_count': 0,
+        'duplicate_count': 0,
         'errors': [],
+        'warnings': [],
         'message': ''
     }
-    
+
     try:
         print("📊 Starting to load Excel data into database...")
-        
+
+        df = _read_balance_report_frame(excel_file_path)
+        print(f"📖 Read {len(df)} rows from Excel file")
+
+        expected_columns = list(BALANCE_REPORT_TEXT_COLUMNS) + list(BALANCE_REPORT_AMOUNT_COLUMNS)
+        missing_columns = [col for col in expected_columns if col not in df.columns]
+        if missing_columns:
+            result['message'] = f"Missing columns: {missing_columns}"
+            return result
+
+        # Excel row numbers (1-based data rows, as reported before)
+        row_numbers = pd.Series(df.index + 1, index=df.index)
+
+        values = pd.DataFrame(index=df.index)
+        for column, field in BALANCE_REPORT_TEXT_COLUMNS.items():
+            values[field] = _text_column(df[column])
+
+        # Skip empty rows and total/summary rows
+        keep = values['control_budget_name'].notna() & ~values['control_budget_name'].isin(['', 'Total', 'TOTAL'])
+        values = values[keep]
+
+        text_limits = {
+            field: XX_BalanceReport._meta.get_field(field).max_length
+            for field in BALANCE_REPORT_TEXT_COLUMNS.values()
+        }
+        row_errors = pd.Series([[] for _ in range(len(values))], index=values.index, dtype=object)
+        for field, limit in text_limits.items():
+            too_long = values[field].map(lambda value: value is not None and len(value) > limit)
+            for index in values.index[too_long]:
+                row_errors[index].append(f"{field} longer than {limit} characters")
+
+        amount_field = XX_BalanceReport._meta.get_field('budget_ytd')
+        amount_limit = Decimal(10) ** (amount_field.max_digits - amount_field.decimal_places)
+        for column, field in BALANCE_REPORT_AMOUNT_COLUMNS.items():
+            decimals, invalid = _decimal_column(df.loc[values.index, column])
+            values[field] = decimals
+            for index in values.index[invalid]:
+                # Kept as empty, like the row-by-row loader did
+                result['warnings'].append({
+                    'row': int(row_numbers[index]),
+                    'warning': f"Could not convert {column} value '{df.at[index, column]}' to Decimal, stored as empty",
+                })
+            out_of_range = decimals.map(lambda value: value is not None and abs(value) >= amount_limit)
+            for index in values.index[out_of_range]:
+                row_errors[index].append(f"{field} out of range")
+
+        failed = row_errors.map(bool)
+        for index in values.index[failed]:
+            result['errors'].append({
+                'row': int(row_numbers[index]),
+                'error': "; ".join(row_errors[index]),
+                'data': {key: (str(value) if value is not None else None) for key, value in df.loc[index].to_dict().items()},
+            })
+        values = values[~failed]
+
+        # One row per key; the last occurrence in the report wins
+        duplicated = values.duplicated(subset=list(BALANCE_REPORT_KEY_FIELDS), keep='last')
+        result['duplicate_count'] = int(duplicated.sum())
+        values = values[~duplicated]
+
+        records = values.to_dict('records')
+        fields = list(BALANCE_REPORT_TEXT_COLUMNS.values()) + list(BALANCE_REPORT_AMOUNT_COLUMNS.values())
+        loaded_at = timezone.now()
+
+        scope = XX_BalanceReport.objects.filter(snapshot=snapshot)
+
         with transaction.atomic():
-            # Clear all existing data from the table if requested
-            if clear_existing:
-                deleted_count = XX_BalanceReport.objects.all().delete()[0]
-                result['deleted_count'] = deleted_count
-                print(f"🗑️  Deleted {deleted_count} existing records from XX_BalanceReport table")
-            
-            # Read Excel file with proper header handling
-            df = pd.read_excel(excel_file_path, header=0)
-            
-            # Check if the first row contains column headers
-            if df.iloc[0, 0] == 'CONTROL_BUDGET_NAME':
-                # First data row contains the headers, use it as column names
-                new_header = df.iloc[0]  # Grab the first row for the header
-                df = df[1:]  # Take the data less the header row
-                df.columns = new_header  # Set the header row as the df header
-                df.reset_index(drop=True, inplace=True)
-            
-            print(f"📖 Read {len(df)} rows from Excel file")
-            
-            # Clean column names
-            df.columns = df.columns.str.strip()
-            
-            # Expected columns
-            expected_columns = [
-                'CONTROL_BUDGET_NAME', 'LEDGER_NAME', 'AS_OF_PERIOD', 'SEGMENT1', 
-                'SEGMENT2', 'SEGMENT3', 'ENCUMBRANCE_PTD', 'OTHER_PTD', 'ACTUAL_PTD', 
-                'FUNDS_AVAILABLE_ASOF', 'BUDGET_PTD'
-            ]
-            
-            # Check if required columns exist
-            missing_columns = [col for col in expected_columns if col not in df.columns]
-            if missing_columns:
-                result['message'] = f"Missing columns: {missing_columns}"
-                return result
-            
-            created_count = 0
-            error_count = 0
-            errors = []
-            
-            # Process each row
-            for index, row in df.iterrows():
-                try:
-                    # Skip empty rows or summary rows
-                    if pd.isna(row['CONTROL_BUDGET_NAME']) or str(row['CONTROL_BUDGET_NAME']).strip() == '':
-                        continue
-                    
-                    # Skip rows that might be totals or summaries
-                    if str(row['CONTROL_BUDGET_NAME']).strip() in ['Total', 'TOTAL', '']:
-                        continue
-                    
-                    # Create model instance
-                    balance_report = XX_BalanceReport(
-                        control_budget_name=str(row['CONTROL_BUDGET_NAME']).strip() if pd.notna(row['CONTROL_BUDGET_NAME']) else None,
-                        ledger_name=str(row['LEDGER_NAME']).strip() if pd.notna(row['LEDGER_NAME']) else None,
-                        as_of_period=str(row['AS_OF_PERIOD']).strip() if pd.notna(row['AS_OF_PERIOD']) else None,
-                        segment1=str(row['SEGMENT1']).strip() if pd.notna(row['SEGMENT1']) else None,
-                        segment2=str(row['SEGMENT2']).strip() if pd.notna(row['SEGMENT2']) else None,
-                        segment3=str(row['SEGMENT3']).strip() if pd.notna(row['SEGMENT3']) else None,
-                        encumbrance_ytd=safe_decimal_convert(row['ENCUMBRANCE_PTD']),
-                        other_ytd=safe_decimal_convert(row['OTHER_PTD']),
-                        actual_ytd=safe_decimal_convert(row['ACTUAL_PTD']),
-                        funds_available_asof=safe_decimal_convert(row['FUNDS_AVAILABLE_ASOF']),
-                        budget_ytd=safe_decimal_convert(row['BUDGET_PTD'])
-                    )
-                    
-                    balance_report.save()
-                    created_count += 1
-                    
-                    if created_count % 50 == 0:  # Progress indicator
-                        print(f"📝 Processed {created_count} records...")
-                        
-                except Exception as e:
-                    error_count += 1
-                    error_detail = {
-                        'row': index + 1,
-                        'error': str(e),
-                        'data': dict(row) if hasattr(row, 'to_dict') else str(row)
-                    }
-                    errors.append(error_detail)
+            existing = {}
+            for row in scope.values_list('id', *fields).iterator(chunk_size=5000):
+                current = dict(zip(fields, row[1:]))
+                key = tuple(current[field] for field in BALANCE_REPORT_KEY_FIELDS)
+                existing.setdefault(key, (row[0], current))
+
+            to_create = []
+            to_update = []
+            unchanged_ids = []
+            for record in records:
+                record = {field: (None if value is None or value is pd.NA else value) for field, value in record.items()}
+                key = tuple(record[field] for field in BALANCE_REPORT_KEY_FIELDS)
+                if key not in existing:
+                    to_create.append(XX_BalanceReport(snapshot=snapshot, updated_at=loaded_at, **record))
                     continue
-            
-            result['success'] = True
-            result['created_count'] = created_count
-            result['error_count'] = error_count
-            result['errors'] = errors
-            result['message'] = f"Successfully loaded {created_count} records"
-            
-            print(f"✅ Successfully loaded {created_count} records into XX_BalanceReport table")
-            if error_count > 0:
-                print(f"⚠️  {error_count} rows had errors and were skipped")
-            
-            return result
-        
+                row_id, current = existing[key]
+                if _balance_row_changed(current, record):
+                    to_update.append(XX_BalanceReport(id=row_id, snapshot=snapshot, updated_at=loaded_at, **record))
+                else:
+                    unchanged_ids.append(row_id)
+
+            XX_BalanceReport.objects.bulk_create(to_create, batch_size=BALANCE_REPORT_BATCH_SIZE)
+            _update_balance_rows(to_update, fields + ['snapshot', 'updated_at'])
+            # Rows that did not change only get their load stamp moved
+            for start in range(0, len(unchanged_ids), BALANCE_REPORT_BATCH_SIZE):
+                scope.filter(
+                    id__in=unchanged_ids[start:start + BALANCE_REPORT_BATCH_SIZE]
+                ).update(updated_at=loaded_at)
+
+            if clear_existing:
+                # Everything this load did not touch is stale (created rows get a later auto_now stamp)
+                result['deleted_count'] = scope.filter(
+                    Q(updated_at__lt=loaded_at) | Q(updated_at__isnull=True)
+                ).delete()[0]
+
+        result['success'] = True
+        result['created_count'] = len(to_create)
+        result['updated_count'] = len(to_update)
+        result['unchanged_count'] = len(unchanged_ids)
+        result['error_count'] = len(result['errors'])
+        result['message'] = f"Successfully loaded {len(to_create) + len(to_update) + len(unchanged_ids)} records"
+
+        print(
+            f"✅ Loaded XX_BalanceReport: {len(to_create)} created, {len(to_update)} updated, "
+            f"{len(unchanged_ids)} unchanged, {result['deleted_count']} stale rows removed"
+        )
+        if result['error_count'] > 0:
+            print(f"⚠️  {result['error_count']} rows had errors and were skipped")
+
+        return result
+
     except Exception as e:
         result['message'] = f"Error loading Excel data: {str(e)}"
         print(f"❌ {result['message']}")
         return result
 
 
+def _snapshot_key_filter(control_budget_name, period_name):
+    return Q(control_budget_name=control_budget_name, period_name__iexact=period_name)
+
+
+def balance_report_max_age():
+    """Seconds after which an active snapshot is considered stale"""
+    return getattr(settings, "BALANCE_REPORT_MAX_AGE_SECONDS", 900)
+
+
+def get_active_balance_snapshot(control_budget_name="MIC_HQ_MONTHLY", period_name="sep-25"):
+    """Active snapshot for a control budget and period, or None when none is loaded yet"""
+    return (
+        XX_BalanceReportSnapshot.objects.filter(
+            _snapshot_key_filter(control_budget_name, period_name), is_active=True
+        )
+        .order_by("-fetched_at")
+        .first()
+    )
+
+
+def get_active_balance_rows(control_budget_name=None, period_name=None):
+    """XX_BalanceReport rows of the active snapshots, optionally of one budget/period"""
+    queryset = XX_BalanceReport.objects.filter(snapshot__is_active=True)
+    if control_budget_name:
+        queryset = queryset.filter(snapshot__control_budget_name=control_budget_name)
+    if period_name:
+        queryset = queryset.filter(snapshot__period_name__iexact=period_name)
+    return queryset
+
+
+def balance_snapshot_age(snapshot):
+    """Age of a snapshot's data in whole seconds"""
+    return max(0, int((timezone.now() - snapshot.fetched_at).total_seconds()))
+
+
+def is_balance_snapshot_stale(snapshot):
+    return snapshot is None or balance_snapshot_age(snapshot) > balance_report_max_age()
+
+
+def activate_balance_snapshot(snapshot):
+    """
+    Make a loaded snapshot the one readers see, in a single transaction.
+
+    A snapshot is not activated over a newer active one, so a slow refresh that
+    finishes late never replaces fresher data.
+
+    Returns:
+        bool: True if the snapshot is now active
+    """
+    with transaction.atomic():
+        current = list(
+            XX_BalanceReportSnapshot.objects.select_for_update()
+            .filter(_snapshot_key_filter(snapshot.control_budget_name, snapshot.period_name), is_active=True)
+            .exclude(pk=snapshot.pk)
+        )
+        if any(other.fetched_at > snapshot.fetched_at for other in current):
+            XX_BalanceReportSnapshot.objects.filter(pk=snapshot.pk).update(status="ready")
+            snapshot.status = "ready"
+            return False
+
+        XX_BalanceReportSnapshot.objects.filter(pk__in=[other.pk for other in current]).update(is_active=False)
+        activated_at = timezone.now()
+        XX_BalanceReportSnapshot.objects.filter(pk=snapshot.pk).update(
+            status="ready", is_active=True, activated_at=activated_at
+        )
+    snapshot.status = "ready"
+    snapshot.is_active = True
+    snapshot.activated_at = activated_at
+    return True
+
+
+def prune_balance_snapshots(control_budget_name, period_name, keep=None):
+    """
+    Delete old snapshots of a budget/period: failed ones and all but the newest
+    `keep` ready ones. The active snapshot and loads in progress are never removed.
+
+    Returns:
+        int: Number of report rows deleted
+    """
+    if keep is None:
+        keep = getattr(settings, "BALANCE_REPORT_SNAPSHOTS_KEPT", 2)
+    snapshots = XX_BalanceReportSnapshot.objects.filter(_snapshot_key_filter(control_budget_name, period_name))
+    kept_ids = list(
+        snapshots.filter(status="ready").order_by("-fetched_at").values_list("id", flat=True)[:max(keep, 1)]
+    )
+    stale_ids = list(
+        snapshots.filter(is_active=False)
+        .exclude(status="loading")
+        .exclude(id__in=kept_ids)
+        .values_list("id", flat=True)
+    )
+    if not stale_ids:
+        return 0
+    with transaction.atomic():
+        deleted_rows = XX_BalanceReport.objects.filter(snapshot_id__in=stale_ids).delete()[0]
+        XX_BalanceReportSnapshot.objects.filter(id__in=stale_ids).delete()
+    return deleted_rows
+
+
+def balance_snapshot_info(snapshot):
+    """Serializable summary of a snapshot for API responses"""
+    if snapshot is None:
+        return None
+    return {
+        "snapshot_id": snapshot.id,
+        "control_budget_name": snapshot.control_budget_name,
+        "period_name": snapshot.period_name,
+        "status": snapshot.status,
+        "is_active": snapshot.is_active,
+        "row_count": snapshot.row_count,
+        "fetched_at": snapshot.fetched_at,
+        "age_seconds": balance_snapshot_age(snapshot),
+        "stale": is_balance_snapshot_stale(snapshot),
+    }
+
+
 def refresh_balance_report_data(control_budget_name="MIC_HQ_MONTHLY", period_name="sep-25"):
     """
     Complete process: Download report from Oracle and load into database
-    
+
+    The report is loaded into a new snapshot, which becomes the active one only
+    after it has loaded completely; readers keep using the previous snapshot
+    until then.
+
     Args:
         control_budget_name (str): Budget name parameter for the report
-        
+        period_name (str): Period name parameter for the report
+
     Returns:
-        dict: Result with success status and details
+        dict: Result with success status, details and the loaded snapshot
     """
     result = {
         'success': False,
         'download_success': False,
         'load_success': False,
         'message': '',
-        'details': {}
+        'details': {},
+        'snapshot': None,
     }
-    
+
+    snapshot = XX_BalanceReportSnapshot.objects.create(
+        control_budget_name=control_budget_name,
+        period_name=period_name,
+    )
+
     try:
-        print(f"🚀 Starting report refresh for: {control_budget_name} (Period: {period_name})")
-        
-        # Step 1: Download the report
-        download_success = download_oracle_report(control_budget_name, period_name, "report.xlsx")
-        result['download_success'] = download_success
+        print(f"🚀 Starting report refresh for: {control_budget_name} (Period: {period_name}), snapshot {snapshot.id}")
         
-        if not download_success:
-            result['message'] = "Failed to download report from Oracle"
-            return result
-        
-        # Step 2: Load data into database
-        load_result = load_excel_to_balance_report_table("report.xlsx", clear_existing=True)
+        # Download into a workspace of this refresh so concurrent refreshes do not share report.xlsx
+        with scoped_workspace(prefix="balance_report") as workspace:
+            report_path = str(workspace / "report.xlsx")
+
+            # Step 1: Download the report
+            download_success = download_oracle_report(control_budget_name, period_name, report_path)
+            result['download_success'] = download_success
+
+            if not download_success:
+                result['message'] = "Failed to download report from Oracle"
+                _fail_balance_snapshot(snapshot, result['message'])
+                return result
+
+            # Step 2: Load data into the new snapshot
+            load_result = load_excel_to_balance_report_table(report_path, clear_existing=True, snapshot=snapshot)
         result['load_success'] = load_result['success']
         result['details'] = load_result
         
         if load_result['success']:
+            # Step 3: Switch readers to the new snapshot and drop old ones
+            snapshot.row_count = (
+                load_result['created_count'] + load_result['updated_count'] + load_result['unchanged_count']
+            )
+            XX_BalanceReportSnapshot.objects.filter(pk=snapshot.pk).update(row_count=snapshot.row_count)
+            activated = activate_balance_snapshot(snapshot)
+            result['details']['deleted_count'] = prune_balance_snapshots(control_budget_name, period_name)
+
             result['success'] = True
-            result['message'] = f"Successfully refreshed balance report data. Created {load_result['created_count']} records."
-            
-            # Display summary statistics
-            total_records = XX_BalanceReport.objects.count()
-            print(f"📊 Total records in XX_BalanceReport table: {total_records}")
-            
-            # Show available periods
-            periods = XX_BalanceReport.objects.values_list('as_of_period', flat=True).distinct()
-            print(f"📅 Available periods: {list(periods)}")
+            result['message'] = (
+                f"Successfully refreshed balance report data. Loaded {snapshot.row_count} records "
+                f"into snapshot {snapshot.id}."
+            )
+            if not activated:
+                result['message'] += " A newer snapshot was already active, so it was kept."
+            print(f"📊 Snapshot {snapshot.id}: {snapshot.row_count} records, active: {activated}")
             
         else:
             result['message'] = f"Downloaded report but failed to load data: {load_result['message']}"
-            
+            _fail_balance_snapshot(snapshot, result['message'])
+
+        result['snapshot'] = balance_snapshot_info(snapshot)
         return result
         
     except Exception as e:
         result['message'] = f"Error during report refresh: {str(e)}"
+        _fail_balance_snapshot(snapshot, result['message'])
         return result
 
 
+def _fail_balance_snapshot(snapshot, error):
+    XX_BalanceReport.objects.filter(snapshot=snapshot).delete()
+    XX_BalanceReportSnapshot.objects.filter(pk=snapshot.pk).update(status="failed", error=error)
+    snapshot.status = "failed"
+    snapshot.error = error
+
+
 def extract_unique_segments_from_data(balance_data):
     """
     Extract unique segments from balance report data structure
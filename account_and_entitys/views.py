@@ -1,4 +1,3 @@
-import numpy as np
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -18,12 +17,10 @@ from .models import (
     XX_PivotFund,
     XX_TransactionAudit,
     XX_ACCOUNT_ENTITY_LIMIT,
-    XX_BalanceReport,
-    Account_Mapping,
-    Budget_data,
     XX_ACCOUNT_mapping,
     XX_Entity_mapping,
     EnvelopeManager,
+    XX_UploadJob,
 )
 from .serializers import (
     AccountSerializer,
@@ -47,6 +44,20 @@ from django.db.models import CharField
 from django.db.models.functions import Cast
 from django.db.models import Q
 from .utils import get_oracle_report_data, get_mapping_for_fusion_data
+from budget_transfer.global_function.blob_store import ranged_file_response
+from user_management.permissions import IsAdmin
+
+from .bulk_upload import iter_sheet_rows
+from .tasks import start_upload_job, upload_async_requested, upload_job_payload, upload_store
+from .upload_importers import (
+    import_account_entity_limits,
+    import_account_mappings,
+    import_accounts,
+    import_budget_data,
+    import_entities,
+    import_project_envelopes,
+    import_projects,
+)
 
 
 class EntityPagination(PageNumberPagination):
@@ -189,6 +200,65 @@ class AccountDeleteView(APIView):
         )
 
 
+# Excel uploads
+
+
+def _queue_upload(request, kind, uploaded_file):
+    """Store the workbook and answer with the upload job that imports it."""
+    job = start_upload_job(kind, uploaded_file, request.user)
+    return Response(
+        {"status": "queued", "job": upload_job_payload(job)},
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+class UploadJobStatusView(APIView):
+    """Progress and result of an upload job"""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = _get_upload_job(request, pk)
+        if job is None:
+            return Response(
+                {"message": "Upload job not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(upload_job_payload(job), status=status.HTTP_200_OK)
+
+
+class UploadJobErrorReportView(APIView):
+    """CSV of the rows an upload job rejected"""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = _get_upload_job(request, pk)
+        if job is None or not job.report_sha256 or not upload_store.exists(job.report_sha256):
+            return Response(
+                {"message": "No error report for this upload job."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        base_name = job.file_name.rsplit(".", 1)[0]
+        return ranged_file_response(
+            request,
+            upload_store.open(job.report_sha256),
+            upload_store.size(job.report_sha256),
+            f"{base_name}_errors.csv",
+            content_type="text/csv",
+            etag=job.report_sha256,
+        )
+
+
+def _get_upload_job(request, pk):
+    """The job if it belongs to the user (admins see every job)"""
+    job = XX_UploadJob.objects.filter(pk=pk).first()
+    if job is None:
+        return None
+    if job.user_id != request.user.id and not IsAdmin().has_permission(request, None):
+        return None
+    return job
+
+
 # Project views
 
 
@@ -213,86 +283,12 @@ class Upload_ProjectsView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            # Use openpyxl to read Excel content (openpyxl is listed in requirements)
-            from openpyxl import load_workbook
-            from django.db import transaction
-
-            wb = load_workbook(filename=uploaded_file, read_only=True, data_only=True)
-            sheet = wb.active
-
-            created = 0
-            updated = 0
-            skipped = 0
-            errors = []
+        if upload_async_requested(request):
+            return _queue_upload(request, "projects", uploaded_file)
 
+        try:
             with transaction.atomic():
-                # Iterate rows — assume header may be present; detect header by non-numeric first row
-                first = True
-                for row in sheet.iter_rows(values_only=True):
-                    # Skip entirely empty rows
-                    if not row or all(
-                        [
-                            c is None or (isinstance(c, str) and c.strip() == "")
-                            for c in row
-                        ]
-                    ):
-                        continue
-
-                    # Normalize columns: project_code, parent_code, alias_default
-                    project_code = str(row[0]).strip() if row[0] is not None else None
-                    parent_code = (
-                        str(row[1]).strip()
-                        if len(row) > 1 and row[1] is not None
-                        else None
-                    )
-                    alias_default = (
-                        str(row[2]).strip()
-                        if len(row) > 2 and row[2] is not None
-                        else None
-                    )
-
-                    # If the first row looks like a header (non-numeric project code) we skip it
-                    if first:
-                        first = False
-                        header_like = False
-                        # treat as header if first cell contains non-digit characters and not a typical code
-                        if project_code and not any(
-                            ch.isdigit() for ch in project_code
-                        ):
-                            header_like = True
-                        if header_like:
-                            continue
-
-                    # Validate project_code
-                    if not project_code:
-                        skipped += 1
-                        continue
-
-                    # Upsert: update if exists, else create
-                    try:
-                        obj, created_flag = XX_Project.objects.update_or_create(
-                            project=project_code,
-                            defaults={
-                                "parent": parent_code,
-                                "alias_default": alias_default,
-                            },
-                        )
-                        if created_flag:
-                            created += 1
-                        else:
-                            updated += 1
-                    except Exception as row_err:
-                        errors.append(
-                            {"project_code": project_code, "error": str(row_err)}
-                        )
-
-            summary = {
-                "created": created,
-                "updated": updated,
-                "skipped": skipped,
-                "errors": errors,
-            }
+                summary = import_projects(iter_sheet_rows(uploaded_file))
 
             return Response(
                 {"status": "ok", "summary": summary}, status=status.HTTP_200_OK
@@ -326,78 +322,12 @@ class Upload_AccountsView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            from openpyxl import load_workbook
-            from django.db import transaction
-
-            wb = load_workbook(filename=uploaded_file, read_only=True, data_only=True)
-            sheet = wb.active
-
-            created = 0
-            updated = 0
-            skipped = 0
-            errors = []
+        if upload_async_requested(request):
+            return _queue_upload(request, "accounts", uploaded_file)
 
+        try:
             with transaction.atomic():
-                first = True
-                for row in sheet.iter_rows(values_only=True):
-                    if not row or all(
-                        [
-                            c is None or (isinstance(c, str) and c.strip() == "")
-                            for c in row
-                        ]
-                    ):
-                        continue
-
-                    account_code = str(row[0]).strip() if row[0] is not None else None
-                    parent_code = (
-                        str(row[1]).strip()
-                        if len(row) > 1 and row[1] is not None
-                        else None
-                    )
-                    alias_default = (
-                        str(row[2]).strip()
-                        if len(row) > 2 and row[2] is not None
-                        else None
-                    )
-
-                    if first:
-                        first = False
-                        header_like = False
-                        if account_code and not any(
-                            ch.isdigit() for ch in account_code
-                        ):
-                            header_like = True
-                        if header_like:
-                            continue
-
-                    if not account_code:
-                        skipped += 1
-                        continue
-
-                    try:
-                        obj, created_flag = XX_Account.objects.update_or_create(
-                            account=account_code,
-                            defaults={
-                                "parent": parent_code,
-                                "alias_default": alias_default,
-                            },
-                        )
-                        if created_flag:
-                            created += 1
-                        else:
-                            updated += 1
-                    except Exception as row_err:
-                        errors.append(
-                            {"account_code": account_code, "error": str(row_err)}
-                        )
-
-            summary = {
-                "created": created,
-                "updated": updated,
-                "skipped": skipped,
-                "errors": errors,
-            }
+                summary = import_accounts(iter_sheet_rows(uploaded_file))
 
             return Response(
                 {"status": "ok", "summary": summary}, status=status.HTTP_200_OK
@@ -431,76 +361,12 @@ class Upload_EntitiesView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            from openpyxl import load_workbook
-            from django.db import transaction
-
-            wb = load_workbook(filename=uploaded_file, read_only=True, data_only=True)
-            sheet = wb.active
-
-            created = 0
-            updated = 0
-            skipped = 0
-            errors = []
+        if upload_async_requested(request):
+            return _queue_upload(request, "entities", uploaded_file)
 
+        try:
             with transaction.atomic():
-                first = True
-                for row in sheet.iter_rows(values_only=True):
-                    if not row or all(
-                        [
-                            c is None or (isinstance(c, str) and c.strip() == "")
-                            for c in row
-                        ]
-                    ):
-                        continue
-
-                    entity_code = str(row[0]).strip() if row[0] is not None else None
-                    parent_code = (
-                        str(row[1]).strip()
-                        if len(row) > 1 and row[1] is not None
-                        else None
-                    )
-                    alias_default = (
-                        str(row[2]).strip()
-                        if len(row) > 2 and row[2] is not None
-                        else None
-                    )
-
-                    if first:
-                        first = False
-                        header_like = False
-                        if entity_code and not any(ch.isdigit() for ch in entity_code):
-                            header_like = True
-                        if header_like:
-                            continue
-
-                    if not entity_code:
-                        skipped += 1
-                        continue
-
-                    try:
-                        obj, created_flag = XX_Entity.objects.update_or_create(
-                            entity=entity_code,
-                            defaults={
-                                "parent": parent_code,
-                                "alias_default": alias_default,
-                            },
-                        )
-                        if created_flag:
-                            created += 1
-                        else:
-                            updated += 1
-                    except Exception as row_err:
-                        errors.append(
-                            {"entity_code": entity_code, "error": str(row_err)}
-                        )
-
-            summary = {
-                "created": created,
-                "updated": updated,
-                "skipped": skipped,
-                "errors": errors,
-            }
+                summary = import_entities(iter_sheet_rows(uploaded_file))
 
             return Response(
                 {"status": "ok", "summary": summary}, status=status.HTTP_200_OK
@@ -529,83 +395,15 @@ class UploadAccountMappingView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            from openpyxl import load_workbook
-            import math
-
-            wb = load_workbook(filename=uploaded_file, read_only=True, data_only=True)
-            sheet = wb.active
-
-            created = 0
-            duplicates = 0
-            skipped = 0
-            errors = []
-
-            def normalize(value):
-                if value is None:
-                    return None
-                if isinstance(value, float):
-                    if math.isnan(value):
-                        return None
-                    if value.is_integer():
-                        return str(int(value))
-                return str(value).strip()
+        if upload_async_requested(request):
+            return _queue_upload(request, "account_mappings", uploaded_file)
 
+        try:
             with transaction.atomic():
-                first_row = True
-                for idx, row in enumerate(sheet.iter_rows(values_only=True), start=1):
-                    if not row or all(
-                        cell is None or (isinstance(cell, str) and cell.strip() == "")
-                        for cell in row
-                    ):
-                        continue
-
-                    source_account = normalize(row[0]) if len(row) > 0 else None
-                    target_account = normalize(row[1]) if len(row) > 1 else None
-
-                    if first_row:
-                        first_row = False
-                        lower_source = (source_account or "").lower()
-                        lower_target = (target_account or "").lower()
-                        if lower_source in {
-                            "source",
-                            "source_account",
-                        } or lower_target in {"target", "target_account"}:
-                            continue
-
-                    if not source_account or not target_account:
-                        skipped += 1
-                        continue
-
-                    try:
-                        _, created_flag = Account_Mapping.objects.get_or_create(
-                            source_account=source_account,
-                            target_account=target_account,
-                        )
-                        if created_flag:
-                            created += 1
-                        else:
-                            duplicates += 1
-                    except Exception as row_err:
-                        errors.append(
-                            {
-                                "row": idx,
-                                "source_account": source_account,
-                                "target_account": target_account,
-                                "error": str(row_err),
-                            }
-                        )
-
-            summary = {
-                "created": created,
-                "duplicates": duplicates,
-                "skipped": skipped,
-                "errors": errors,
-            }
+                summary = import_account_mappings(iter_sheet_rows(uploaded_file))
 
             return Response(
-                {"status": "ok", "summary": summary},
-                status=status.HTTP_200_OK,
+                {"status": "ok", "summary": summary}, status=status.HTTP_200_OK
             )
 
         except Exception as e:
@@ -1371,6 +1169,8 @@ class AccountEntityLimitAPI(APIView):
         uploaded_file = request.FILES.get("file")
 
         if uploaded_file:
+            if upload_async_requested(request):
+                return _queue_upload(request, "account_entity_limits", uploaded_file)
             return self._handle_file_upload(uploaded_file)
         else:
             return self._handle_single_record(request.data)
@@ -1378,36 +1178,11 @@ class AccountEntityLimitAPI(APIView):
     def _handle_file_upload(self, file):
         """Process Excel file for bulk creation"""
         try:
-            # Read Excel file
-            df = pd.read_excel(file)
-
-            # Clean column names (convert to lowercase and strip whitespace)
-            df.columns = df.columns.str.strip().str.lower()
-            df = df.replace([np.nan, pd.NA, pd.NaT, "", "NULL", "null"], None)
-
-            # Convert to list of dictionaries
-            records = df.to_dict("records")
-
-            created_count = 0
-            errors = []
-
             with transaction.atomic():
-                for idx, record in enumerate(records, start=1):
-                    try:
-                        serializer = AccountEntityLimitSerializer(data=record)
-                        if serializer.is_valid():
-                            serializer.save()
-                            created_count += 1
-                        else:
-                            errors.append(
-                                {
-                                    "row": idx,
-                                    "errors": serializer.errors,
-                                    "data": record,
-                                }
-                            )
-                    except Exception as e:
-                        errors.append({"row": idx, "error": str(e), "data": record})
+                result = import_account_entity_limits(iter_sheet_rows(file))
+
+            created_count = result["created_count"]
+            errors = result["errors"]
 
             response = {
                 "status": "success",
@@ -1502,19 +1277,55 @@ class DeleteAccountEntityLimit(APIView):
 # MainCurrency views
 
 
+def _with_balance_snapshot_headers(response, snapshot, refreshing=False):
+    """Tell clients which balance report snapshot they got and how old it is"""
+    from .utils import balance_snapshot_age, is_balance_snapshot_stale
+
+    if snapshot is not None:
+        response["X-Balance-Report-Snapshot"] = str(snapshot.id)
+        response["X-Balance-Report-Fetched-At"] = snapshot.fetched_at.isoformat()
+        response["X-Balance-Report-Age"] = str(balance_snapshot_age(snapshot))
+        response["X-Balance-Report-Stale"] = "true" if is_balance_snapshot_stale(snapshot) else "false"
+    response["X-Balance-Report-Refreshing"] = "true" if refreshing else "false"
+    return response
+
+
 class RefreshBalanceReportView(APIView):
     """API view to refresh balance report data from Oracle"""
 
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        """Trigger balance report refresh"""
+        """Trigger balance report refresh (refresh=async queues it in the background)"""
+        from .tasks import request_balance_report_refresh
         from .utils import refresh_balance_report_data
 
         budget_name = request.data.get("control_budget_name", "MIC_HQ_MONTHLY")
         period_name = request.data.get("Period_name", "sep-25")
+        refresh_mode = (
+            request.query_params.get("refresh") or request.data.get("refresh") or ""
+        ).lower()
 
         try:
+            if refresh_mode == "async":
+                queued = request_balance_report_refresh(budget_name, period_name)
+                return Response(
+                    {
+                        "success": True,
+                        "message": (
+                            "Balance report refresh started"
+                            if queued
+                            else "Balance report refresh is already running"
+                        ),
+                        "data": {
+                            "refresh_queued": queued,
+                            "budget_name": budget_name,
+                            "period_name": period_name,
+                        },
+                    },
+                    status=status.HTTP_202_ACCEPTED,
+                )
+
             print("Starting balance report refresh...")
             print(f"Budget: {budget_name}, Period: {period_name}")
             result = refresh_balance_report_data(budget_name, period_name)
@@ -1525,9 +1336,11 @@ class RefreshBalanceReportView(APIView):
                         "message": result["message"],
                         "data": {
                             "created_count": result["details"].get("created_count", 0),
+                            "updated_count": result["details"].get("updated_count", 0),
                             "deleted_count": result["details"].get("deleted_count", 0),
                             "error_count": result["details"].get("error_count", 0),
                             "budget_name": budget_name,
+                            "snapshot": result["snapshot"],
                         },
                     },
                     status=status.HTTP_200_OK,
@@ -1553,16 +1366,28 @@ class RefreshBalanceReportView(APIView):
 
     def get(self, request):
         """Get balance report refresh status"""
-        from .models import XX_BalanceReport
+        from .models import XX_BalanceReportSnapshot
+        from .tasks import is_balance_refresh_running
+        from .utils import balance_snapshot_info, get_active_balance_rows
 
         try:
-            total_records = XX_BalanceReport.objects.count()
-            latest_record = XX_BalanceReport.objects.order_by("-created_at").first()
+            active_rows = get_active_balance_rows()
+            total_records = active_rows.count()
+            latest_record = active_rows.order_by("-created_at").first()
             periods = list(
-                XX_BalanceReport.objects.values_list(
-                    "as_of_period", flat=True
-                ).distinct()
-            )
+                active_rows.values_list("as_of_period", flat=True)
+                .distinct()
+                .order_by("as_of_period")
+            )
+            snapshots = []
+            for snapshot in XX_BalanceReportSnapshot.objects.filter(is_active=True).order_by(
+                "control_budget_name", "period_name"
+            ):
+                info = balance_snapshot_info(snapshot)
+                info["refreshing"] = is_balance_refresh_running(
+                    snapshot.control_budget_name, snapshot.period_name
+                )
+                snapshots.append(info)
 
             return Response(
                 {
@@ -1576,6 +1401,7 @@ class RefreshBalanceReportView(APIView):
                         "last_period": (
                             latest_record.as_of_period if latest_record else None
                         ),
+                        "active_snapshots": snapshots,
                     },
                 },
                 status=status.HTTP_200_OK,
@@ -1768,14 +1594,14 @@ class BalanceReportSegmentsView(APIView):
 
     def get(self, request):
         """Get unique values for segment1, segment2, and segment3"""
-        from .models import XX_BalanceReport
+        from .utils import get_active_balance_rows
 
         try:
             # Get unique segments with filters
             segment1_filter = request.query_params.get("segment1")
             segment2_filter = request.query_params.get("segment2")
 
-            queryset = XX_BalanceReport.objects.all()
+            queryset = get_active_balance_rows()
 
             # Apply filters if provided
             if segment1_filter:
@@ -1785,7 +1611,8 @@ class BalanceReportSegmentsView(APIView):
 
             # Get unique values for each segment
             segment1_values = list(
-                XX_BalanceReport.objects.filter(segment1__isnull=False)
+                get_active_balance_rows()
+                .filter(segment1__isnull=False)
                 .values_list("segment1", flat=True)
                 .distinct()
                 .order_by("segment1")
@@ -1926,28 +1753,26 @@ class BalanceReportFinancialDataView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        """Get financial data for a specific segment1, segment2, segment3 combination"""
-        from .models import XX_BalanceReport
+        """
+        Get financial data for a specific segment1, segment2, segment3 combination
+
+        Reads the active balance report snapshot and never waits for Oracle. A
+        background refresh is queued when the snapshot is stale or missing, or
+        when refresh=async is passed; the X-Balance-Report-* headers tell how
+        old the returned data is.
+        """
         from django.db.models import Sum, Avg, Count
+        from .tasks import is_balance_refresh_running, request_balance_report_refresh
+        from .utils import get_active_balance_snapshot, is_balance_snapshot_stale
 
         try:
-            from .utils import refresh_balance_report_data
-
-            budget_name = request.data.get("control_budget_name", "MIC_HQ_MONTHLY")
-            period_name = request.data.get("Period_name", "sep-25")
-
-            try:
-                result = refresh_balance_report_data(
-                    budget_name, period_name=period_name
-                )
-            except Exception as e:
-                return Response(
-                    {
-                        "success": False,
-                        "message": f"Error refreshing balance report data: {str(e)}",
-                    },
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
+            budget_name = request.query_params.get(
+                "control_budget_name"
+            ) or request.data.get("control_budget_name", "MIC_HQ_MONTHLY")
+            period_name = request.query_params.get("Period_name") or request.data.get(
+                "Period_name", "sep-25"
+            )
+            refresh_mode = request.query_params.get("refresh", "").lower()
 
             # Get segments from query parameters
             segment1 = request.query_params.get("segment1")
@@ -1964,18 +1789,41 @@ class BalanceReportFinancialDataView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            # Filter records by the segments
-            queryset = XX_BalanceReport.objects.filter(
-                segment1=segment1, segment2=segment2, segment3=segment3
-            )
+            snapshot = get_active_balance_snapshot(budget_name, period_name)
+            if refresh_mode == "async" or is_balance_snapshot_stale(snapshot):
+                request_balance_report_refresh(budget_name, period_name)
+            refreshing = is_balance_refresh_running(budget_name, period_name)
 
-            if not queryset.exists():
-                return Response(
+            if snapshot is None:
+                response = Response(
                     {
                         "success": False,
-                        "message": f"No data found for segments: {segment1}/{segment2}/{segment3}",
+                        "message": (
+                            f"Balance report for {budget_name} / {period_name} is not loaded yet, "
+                            "a refresh is running. Please retry shortly."
+                        ),
                     },
-                    status=status.HTTP_404_NOT_FOUND,
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                )
+                response["Retry-After"] = "30"
+                return _with_balance_snapshot_headers(response, None, refreshing)
+
+            # Filter records of the active snapshot by the segments
+            queryset = snapshot.rows.filter(
+                segment1=segment1, segment2=segment2, segment3=segment3
+            )
+
+            if not queryset.exists():
+                return _with_balance_snapshot_headers(
+                    Response(
+                        {
+                            "success": False,
+                            "message": f"No data found for segments: {segment1}/{segment2}/{segment3}",
+                        },
+                        status=status.HTTP_404_NOT_FOUND,
+                    ),
+                    snapshot,
+                    refreshing,
                 )
 
             # Get the most recent record for this combination
@@ -2063,8 +1911,13 @@ class BalanceReportFinancialDataView(APIView):
                 },
             }
 
-            return Response(
-                {"success": True, "data": financial_data}, status=status.HTTP_200_OK
+            return _with_balance_snapshot_headers(
+                Response(
+                    {"success": True, "data": financial_data},
+                    status=status.HTTP_200_OK,
+                ),
+                snapshot,
+                refreshing,
             )
 
         except Exception as e:
@@ -2078,7 +1931,7 @@ class BalanceReportFinancialDataView(APIView):
 
     def post(self, request):
         """Get financial data for multiple segment combinations"""
-        from .models import XX_BalanceReport
+        from .utils import get_active_balance_rows
 
         try:
             segment_combinations = request.data.get("segments", [])
@@ -2111,9 +1964,8 @@ class BalanceReportFinancialDataView(APIView):
 
                 # Get data for this combination
                 record = (
-                    XX_BalanceReport.objects.filter(
-                        segment1=segment1, segment2=segment2, segment3=segment3
-                    )
+                    get_active_balance_rows()
+                    .filter(segment1=segment1, segment2=segment2, segment3=segment3)
                     .order_by("-created_at")
                     .first()
                 )
@@ -2232,108 +2084,13 @@ class Upload_ProjectEnvelopeView(APIView):
                 {"message": "No file uploaded."}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            from openpyxl import load_workbook
-            from django.db import transaction
-            from decimal import Decimal, InvalidOperation
-            import math
-            import re
-
-            from .models import Project_Envelope
-
-            wb = load_workbook(filename=uploaded_file, read_only=True, data_only=True)
-            sheet = wb.active
-
-            created = 0
-            updated = 0
-            skipped = 0
-            errors = []
-
-            def extract_project_code(raw_value):
-                """Return the leading numeric project code from the provided cell."""
-                if raw_value is None:
-                    return None
-                if isinstance(raw_value, int):
-                    return str(raw_value)
-                if isinstance(raw_value, float):
-                    if math.isnan(raw_value):
-                        return None
-                    if raw_value.is_integer():
-                        return str(int(raw_value))
-                    return str(raw_value)
-                value_str = str(raw_value).strip()
-                match = re.match(r"^\s*(\d+)", value_str)
-                return match.group(1) if match else None
+        if upload_async_requested(request):
+            return _queue_upload(request, "project_envelopes", uploaded_file)
 
+        try:
             with transaction.atomic():
-                for idx, row in enumerate(sheet.iter_rows(values_only=True), start=1):
-                    if not row or all(
-                        cell is None or (isinstance(cell, str) and cell.strip() == "")
-                        for cell in row
-                    ):
-                        continue
-
-                    project_code = extract_project_code(
-                        row[0] if len(row) > 0 else None
-                    )
-                    envelope_raw = row[1] if len(row) > 1 else None
-
-                    if not project_code:
-                        skipped += 1
-                        continue
-
-                    if envelope_raw is None or (
-                        isinstance(envelope_raw, str) and envelope_raw.strip() == ""
-                    ):
-                        skipped += 1
-                        continue
-
-                    try:
-                        if isinstance(envelope_raw, str):
-                            cleaned = re.sub(
-                                r"[^0-9.\-]", "", envelope_raw.replace(",", "")
-                            )
-                            envelope_val = Decimal(cleaned) if cleaned != "" else None
-                        else:
-                            envelope_val = Decimal(envelope_raw)
-                    except (InvalidOperation, TypeError):
-                        errors.append(
-                            {
-                                "row": idx,
-                                "project_code": project_code,
-                                "error": f"Invalid envelope value: {envelope_raw}",
-                            }
-                        )
-                        continue
-
-                    if envelope_val is None:
-                        skipped += 1
-                        continue
+                summary = import_project_envelopes(iter_sheet_rows(uploaded_file))
 
-                    try:
-                        _, created_flag = Project_Envelope.objects.update_or_create(
-                            project=project_code,
-                            defaults={"envelope": envelope_val},
-                        )
-                        if created_flag:
-                            created += 1
-                        else:
-                            updated += 1
-                    except Exception as row_err:
-                        errors.append(
-                            {
-                                "row": idx,
-                                "project_code": project_code,
-                                "error": str(row_err),
-                            }
-                        )
-
-            summary = {
-                "created": created,
-                "updated": updated,
-                "skipped": skipped,
-                "errors": errors,
-            }
             return Response(
                 {"status": "ok", "summary": summary}, status=status.HTTP_200_OK
             )
@@ -2361,136 +2118,15 @@ class UploadBudgetDataView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            from openpyxl import load_workbook
-            from django.db import transaction
-            from decimal import Decimal, InvalidOperation
-            import math
-            import re
-
-            wb = load_workbook(filename=uploaded_file, read_only=True, data_only=True)
-            sheet = wb.active
-
-            created = 0
-            updated = 0
-            skipped = 0
-            errors = []
-
-            def extract_project_code(raw_value):
-                """Return the project code from the provided cell."""
-                if raw_value is None:
-                    return None
-                if isinstance(raw_value, int):
-                    return str(raw_value)
-                if isinstance(raw_value, float):
-                    if math.isnan(raw_value):
-                        return None
-                    if raw_value.is_integer():
-                        return str(int(raw_value))
-                    return str(raw_value)
-                return str(raw_value).strip() or None
-
-            def normalize_account(raw_value):
-                if raw_value is None:
-                    return None
-                if isinstance(raw_value, float):
-                    if math.isnan(raw_value):
-                        return None
-                    if raw_value.is_integer():
-                        return str(int(raw_value))
-                    return str(raw_value)
-                value_str = str(raw_value).strip()
-                return value_str or None
-
-            def parse_budget(raw_value, label):
-                if raw_value is None:
-                    return Decimal("0")
-                if isinstance(raw_value, int):
-                    return Decimal(raw_value)
-                if isinstance(raw_value, float):
-                    if math.isnan(raw_value):
-                        return Decimal("0")
-                    return Decimal(str(raw_value))
-                value_str = str(raw_value).strip()
-                if not value_str:
-                    return Decimal("0")
-                cleaned = re.sub(r"[^0-9.\-]", "", value_str)
-                if cleaned in {"", "-", ".", "-.", ".-"}:
-                    return Decimal("0")
-                try:
-                    return Decimal(cleaned)
-                except InvalidOperation as exc:
-                    raise ValueError(f"Invalid {label} value: {raw_value}") from exc
+        if upload_async_requested(request):
+            return _queue_upload(request, "budget_data", uploaded_file)
 
+        try:
             with transaction.atomic():
-                for idx, row in enumerate(sheet.iter_rows(values_only=True), start=1):
-                    if not row or all(
-                        cell is None or (isinstance(cell, str) and cell.strip() == "")
-                        for cell in row
-                    ):
-                        continue
-
-                    project_code = extract_project_code(
-                        row[0] if len(row) > 0 else None
-                    )
-                    account_code = normalize_account(row[1] if len(row) > 1 else None)
+                summary = import_budget_data(iter_sheet_rows(uploaded_file))
 
-                    if not project_code or not account_code:
-                        skipped += 1
-                        continue
-
-                    try:
-                        fy24_budget = parse_budget(
-                            row[2] if len(row) > 2 else None,
-                            "FY24 budget",
-                        )
-                        fy25_budget = parse_budget(
-                            row[3] if len(row) > 3 else None,
-                            "FY25 budget",
-                        )
-                    except ValueError as budget_err:
-                        errors.append(
-                            {
-                                "row": idx,
-                                "project": project_code,
-                                "account": account_code,
-                                "error": str(budget_err),
-                            }
-                        )
-                        continue
-
-                    try:
-                        _, created_flag = Budget_data.objects.update_or_create(
-                            project=project_code,
-                            account=account_code,
-                            defaults={
-                                "FY24_budget": fy24_budget,
-                                "FY25_budget": fy25_budget,
-                            },
-                        )
-                        if created_flag:
-                            created += 1
-                        else:
-                            updated += 1
-                    except Exception as row_err:
-                        errors.append(
-                            {
-                                "row": idx,
-                                "project": project_code,
-                                "account": account_code,
-                                "error": str(row_err),
-                            }
-                        )
-
-            summary = {
-                "created": created,
-                "updated": updated,
-                "skipped": skipped,
-                "errors": errors,
-            }
             return Response(
-                {"status": "ok", "summary": summary},
-                status=status.HTTP_200_OK,
+                {"status": "ok", "summary": summary}, status=status.HTTP_200_OK
             )
 
         except Exception as e:
@@ -1,7 +1,9 @@
 # approval/managers.py
 
 from django.conf import settings
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
@@ -16,11 +18,26 @@ from .models import (
     ApprovalAssignment,
     ApprovalAction,
     ApprovalDelegation,
+    ApprovalInboxItem,
 )
 
 User = get_user_model()
 
 
+def _stage_count(queryset, field):
+    """Distinct count of field over queryset rows of each stage instance, as an annotation"""
+    return Coalesce(
+        Subquery(
+            queryset.filter(stage_instance=OuterRef("pk"))
+            .order_by()
+            .values("stage_instance")
+            .annotate(n=Count(field, distinct=True))
+            .values("n")[:1]
+        ),
+        0,
+    )
+
+
 class ApprovalManager:
     """
     Central manager for dynamic approval workflows.
@@ -155,15 +172,18 @@ class ApprovalManager:
                 status=ApprovalWorkflowStageInstance.STATUS_ACTIVE
             )
             now = timezone.now()
+            cancelled_stage_ids = []
             for stage in active_stages:
                 stage.status = ApprovalWorkflowStageInstance.STATUS_CANCELLED
                 stage.completed_at = now
                 stage.save(update_fields=["status", "completed_at"])
+                cancelled_stage_ids.append(stage.pk)
 
                 # deactivate any delegations for the stage
                 stage.delegations.filter(active=True).update(
                     active=False, deactivated_at=now
                 )
+            cls._sync_inbox(cancelled_stage_ids)
 
             instance.status = ApprovalWorkflowInstance.STATUS_CANCELLED
             instance.finished_at = now
@@ -204,20 +224,81 @@ class ApprovalManager:
         if st.required_role:
             qs = qs.filter(role=st.required_role)
 
-        created = []
-        for user in qs.distinct():
-            obj, created_flag = ApprovalAssignment.objects.get_or_create(
+        # Eligible users with their snapshots in one query, existing assignments in
+        # another, then one bulk insert: the instance lock is held for a fixed
+        # number of queries whatever the size of the approver pool
+        existing = set(stage_instance.assignments.values_list("user_id", flat=True))
+        to_create = [
+            ApprovalAssignment(
                 stage_instance=stage_instance,
-                user=user,
-                defaults={
-                    "role_snapshot": getattr(user, "role", None),
-                    "level_snapshot": getattr(user.user_level, "name", None),
-                    "is_mandatory": True,
-                },
+                user_id=user_id,
+                role_snapshot=role,
+                level_snapshot=level_name,
+                is_mandatory=True,
+            )
+            for user_id, role, level_name in qs.values_list(
+                "id", "role", "user_level__name"
+            ).distinct()
+            if user_id not in existing
+        ]
+        # Oracle cannot ignore conflicts; the existing assignments are filtered above
+        ApprovalAssignment.objects.bulk_create(
+            to_create,
+            batch_size=500,
+            ignore_conflicts=connection.features.supports_ignore_conflicts,
+        )
+        return to_create
+
+    @classmethod
+    def _sync_inbox(cls, stage_instance_ids):
+        """
+        Bring the inbox rows of the given stage instances in line with their
+        pending assignments: a stage that is no longer active has none. Rows
+        that stay keep their assigned_at / read_at.
+        """
+        stage_instance_ids = list(stage_instance_ids)
+        if not stage_instance_ids:
+            return
+
+        wanted = {
+            (stage_instance_id, user_id): (budget_transfer_id, assigned_at)
+            for stage_instance_id, user_id, budget_transfer_id, assigned_at in ApprovalAssignment.objects.filter(
+                stage_instance_id__in=stage_instance_ids,
+                status=ApprovalAssignment.STATUS_PENDING,
+                stage_instance__status=ApprovalWorkflowStageInstance.STATUS_ACTIVE,
+            ).values_list(
+                "stage_instance_id",
+                "user_id",
+                "stage_instance__workflow_instance__budget_transfer_id",
+                "created_at",
             )
-            if created_flag:
-                created.append(obj)
-        return created
+        }
+        existing = {
+            (stage_instance_id, user_id): pk
+            for pk, stage_instance_id, user_id in ApprovalInboxItem.objects.filter(
+                stage_instance_id__in=stage_instance_ids
+            ).values_list("pk", "stage_instance_id", "user_id")
+        }
+
+        stale = [pk for key, pk in existing.items() if key not in wanted]
+        if stale:
+            ApprovalInboxItem.objects.filter(pk__in=stale).delete()
+        ApprovalInboxItem.objects.bulk_create(
+            [
+                ApprovalInboxItem(
+                    stage_instance_id=stage_instance_id,
+                    user_id=user_id,
+                    budget_transfer_id=budget_transfer_id,
+                    assigned_at=assigned_at,
+                )
+                for (stage_instance_id, user_id), (
+                    budget_transfer_id,
+                    assigned_at,
+                ) in wanted.items()
+                if (stage_instance_id, user_id) not in existing
+            ],
+            batch_size=500,
+        )
 
     @classmethod
     def _activate_next_stage_internal(
@@ -249,18 +330,28 @@ class ApprovalManager:
                 return instance
 
             # find active stage(s)
-            active = instance.stage_instances.filter(
-                status=ApprovalWorkflowStageInstance.STATUS_ACTIVE
+            active = (
+                instance.stage_instances.filter(
+                    status=ApprovalWorkflowStageInstance.STATUS_ACTIVE
+                )
+                .select_related("stage_template")
+                .order_by("stage_template__order_index")
+                .first()
             )
-            if not active.exists():
+            if active is None:
                 # Did workflow ever start?
-                completed = instance.stage_instances.filter(
-                    status=ApprovalWorkflowStageInstance.STATUS_COMPLETED
-                ).order_by("-stage_template__order_index")
+                last_completed = (
+                    instance.stage_instances.filter(
+                        status=ApprovalWorkflowStageInstance.STATUS_COMPLETED
+                    )
+                    .select_related("stage_template")
+                    .order_by("-stage_template__order_index")
+                    .first()
+                )
 
-                if completed.exists():
+                if last_completed is not None:
                     # continue after last completed
-                    last_order = completed.first().stage_template.order_index
+                    last_order = last_completed.stage_template.order_index
                     next_template = (
                         instance.template.stages.filter(order_index__gt=last_order)
                         .order_by("order_index")
@@ -291,7 +382,7 @@ class ApprovalManager:
             else:
                 # mark existing active as completed if they are "done"
                 # (caller should have set them completed already; this path will just pick next order)
-                current_order = active.first().stage_template.order_index
+                current_order = active.stage_template.order_index
                 next_q = (
                     instance.template.stages.filter(order_index__gt=current_order)
                     .order_by("order_index")
@@ -353,6 +444,8 @@ class ApprovalManager:
                     # call hook for active stage (notifications)
                     cls.on_stage_activated(si)
 
+            cls._sync_inbox([si.pk for si in created_stage_instances])
+
             # set workflow instance status
             instance.status = ApprovalWorkflowInstance.STATUS_IN_PROGRESS
             # set current_stage_template to the first of activated templates for convenience
@@ -378,51 +471,47 @@ class ApprovalManager:
         if not instance:
             raise ValueError("No workflow instance found")
 
-        # lock active stages in transaction when caller wants to progress
-        active_stages = instance.stage_instances.filter(
-            status=ApprovalWorkflowStageInstance.STATUS_ACTIVE
+        # Per-stage counts in one query; the policies below only read them
+        group_stages = cls._active_stage_group(
+            instance,
+            annotate={
+                "reject_count": _stage_count(
+                    ApprovalAction.objects.filter(action=ApprovalAction.ACTION_REJECT),
+                    "pk",
+                ),
+                # distinct approving assignments (actions without one never count)
+                "approved_count": _stage_count(
+                    ApprovalAction.objects.filter(action=ApprovalAction.ACTION_APPROVE),
+                    "assignment_id",
+                ),
+                "unassigned_approvals": _stage_count(
+                    ApprovalAction.objects.filter(
+                        action=ApprovalAction.ACTION_APPROVE, assignment__isnull=True
+                    ),
+                    "pk",
+                ),
+                "total_assignments": _stage_count(ApprovalAssignment.objects, "pk"),
+            },
         )
-        if not active_stages.exists():
+        if not group_stages:
             return False, "pending"
 
-        # Determine the order_index group to evaluate (lowest order_index among active)
-        order_index = (
-            active_stages.order_by("stage_template__order_index")
-            .first()
-            .stage_template.order_index
-        )
-        group_stages = instance.stage_instances.filter(
-            status=ApprovalWorkflowStageInstance.STATUS_ACTIVE,
-            stage_template__order_index=order_index,
-        )
-
         any_rejected = False
         all_approved = True
 
         for stage in group_stages:
             stpl = stage.stage_template
             # short-circuit: if rejects exist and rejection allowed -> reject
-            if (
-                stpl.allow_reject
-                and stage.actions.filter(action=ApprovalAction.ACTION_REJECT).exists()
-            ):
+            if stpl.allow_reject and stage.reject_count:
                 any_rejected = True
                 continue
 
-            # approvals count: consider distinct assignment ids
-            approved_assignment_ids = (
-                stage.actions.filter(action=ApprovalAction.ACTION_APPROVE)
-                .values_list("assignment_id", flat=True)
-                .distinct()
-            )
-            approved_count = len([x for x in approved_assignment_ids if x])
-
-            total_assignments = stage.assignments.count()
+            approved_count = stage.approved_count
+            total_assignments = stage.total_assignments
 
             if stpl.decision_policy == ApprovalWorkflowStageTemplate.POLICY_ALL:
                 # require all assignments to have approved (ignoring delegated mandatory? we treat delegated assignment as assigned person)
-                all_ids = set(stage.assignments.values_list("id", flat=True))
-                if set(approved_assignment_ids) != all_ids:
+                if approved_count != total_assignments or stage.unassigned_approvals:
                     all_approved = False
 
             elif stpl.decision_policy == ApprovalWorkflowStageTemplate.POLICY_ANY:
@@ -448,6 +537,27 @@ class ApprovalManager:
             return True, "approved"
         return False, "pending"
 
+    @staticmethod
+    def _active_stage_group(instance: ApprovalWorkflowInstance, annotate=None):
+        """
+        Active stage instances sharing the lowest order_index, with their
+        templates, in one query.
+        """
+        stages = (
+            instance.stage_instances.filter(
+                status=ApprovalWorkflowStageInstance.STATUS_ACTIVE
+            )
+            .select_related("stage_template")
+            .order_by("stage_template__order_index", "pk")
+        )
+        if annotate:
+            stages = stages.annotate(**annotate)
+        stages = list(stages)
+        if not stages:
+            return []
+        order_index = stages[0].stage_template.order_index
+        return [st for st in stages if st.stage_template.order_index == order_index]
+
     @classmethod
     def _complete_active_stage_group(
         cls, instance: ApprovalWorkflowInstance, outcome: str, comment: str = None
@@ -456,49 +566,36 @@ class ApprovalManager:
         Mark active group (lowest order_index) as completed/skipped according to outcome,
         deactivate delegations, log actions and invoke hooks.
         """
-        active_stages = instance.stage_instances.filter(
-            status=ApprovalWorkflowStageInstance.STATUS_ACTIVE
-        )
-        if not active_stages.exists():
+        if outcome not in ("approved", "rejected"):
+            return
+        group_stages = cls._active_stage_group(instance)
+        if not group_stages:
             return
 
-        order_index = (
-            active_stages.order_by("stage_template__order_index")
-            .first()
-            .stage_template.order_index
-        )
-        group_stages = instance.stage_instances.filter(
-            status=ApprovalWorkflowStageInstance.STATUS_ACTIVE,
-            stage_template__order_index=order_index,
-        )
         now = timezone.now()
         system_user = cls._get_system_user()
+        group_stage_ids = [st.pk for st in group_stages]
 
-        if outcome == "approved":
-            for st in group_stages:
-                st.status = ApprovalWorkflowStageInstance.STATUS_COMPLETED
-                st.completed_at = now
-                st.save(update_fields=["status", "completed_at"])
-                # deactivate delegations for stage
-                st.delegations.filter(active=True).update(
-                    active=False, deactivated_at=now
-                )
-                # delete any remaining pending assignments on this completed stage
-                st.assignments.filter(status=ApprovalAssignment.STATUS_PENDING).delete()
-                # call hook
-                cls.on_stage_completed(st)
-                # optionally log system action (not necessary if user actions recorded)
-        elif outcome == "rejected":
-            for st in group_stages:
-                st.status = ApprovalWorkflowStageInstance.STATUS_COMPLETED
-                st.completed_at = now
-                st.save(update_fields=["status", "completed_at"])
-                st.delegations.filter(active=True).update(
-                    active=False, deactivated_at=now
-                )
-                # delete any remaining pending assignments on this completed stage
-                st.assignments.filter(status=ApprovalAssignment.STATUS_PENDING).delete()
-                cls.on_stage_completed(st)
+        # Approved or rejected, the group's stages complete the same way
+        ApprovalWorkflowStageInstance.objects.filter(pk__in=group_stage_ids).update(
+            status=ApprovalWorkflowStageInstance.STATUS_COMPLETED, completed_at=now
+        )
+        # deactivate delegations for the stages
+        ApprovalDelegation.objects.filter(
+            stage_instance_id__in=group_stage_ids, active=True
+        ).update(active=False, deactivated_at=now)
+        # delete any remaining pending assignments on the completed stages
+        ApprovalAssignment.objects.filter(
+            stage_instance_id__in=group_stage_ids,
+            status=ApprovalAssignment.STATUS_PENDING,
+        ).delete()
+        for st in group_stages:
+            st.status = ApprovalWorkflowStageInstance.STATUS_COMPLETED
+            st.completed_at = now
+            # call hook
+            cls.on_stage_completed(st)
+
+        if outcome == "rejected":
             # mark workflow rejected
             instance.status = ApprovalWorkflowInstance.STATUS_REJECTED
             instance.finished_at = now
@@ -508,13 +605,14 @@ class ApprovalManager:
             )
             # log system action
             ApprovalAction.objects.create(
-                stage_instance=group_stages.first(),
+                stage_instance=group_stages[0],
                 user=system_user,
                 assignment=None,
                 action=ApprovalAction.ACTION_REJECT,
                 comment=comment or "Workflow rejected",
                 triggers_stage_completion=True,
             )
+        cls._sync_inbox(group_stage_ids)
 
     # ----------------------
     # Manager-facing action processing
@@ -613,6 +711,7 @@ class ApprovalManager:
             if action in (ApprovalAction.ACTION_APPROVE, ApprovalAction.ACTION_REJECT):
                 assignment.status = action
                 assignment.save(update_fields=["status"])
+                cls._sync_inbox([active_stage.pk])
 
             # Evaluate whether stage group has finished
             finished, outcome = cls.check_finished_stage(budget_transfer)
@@ -694,6 +793,7 @@ class ApprovalManager:
             # update original assignment
             from_assignment.status = ApprovalAssignment.STATUS_DELEGATED
             from_assignment.save(update_fields=["status"])
+            cls._sync_inbox([stage_instance.pk])
 
             # log delegation action
             ApprovalAction.objects.create(
@@ -715,105 +815,40 @@ class ApprovalManager:
         """
         Return list of BudgetTransfer objects for which this user
         has pending approval assignments in active workflow stages.
+
+        Reads the user's inbox rows (ApprovalInboxItem) through their
+        (user, assigned_at, read_at) index; the queryset is lazy so callers can
+        filter and paginate it in the database.
         """
-        base_qs = xx_BudgetTransfer.objects.filter(
-            workflow_instance__status=ApprovalWorkflowInstance.STATUS_IN_PROGRESS
-        ).distinct()
-        print(f"Total transfers in queryset: {base_qs.count()}")
-
-        # Pre-user filter: active stages with any pending assignments
-        transfers = base_qs.filter(
-            workflow_instance__stage_instances__status=ApprovalWorkflowStageInstance.STATUS_ACTIVE,
-            workflow_instance__stage_instances__assignments__status=ApprovalAssignment.STATUS_PENDING,
-        ).distinct()
-        print(f"Transfers with active stages: {transfers.count()}")
-        print(f"Transfers with pending assignments: {transfers.count()}")
-        try:
-            pre_ids = list(transfers.values_list("id", flat=True))
-        except Exception:
-            pre_ids = []
-        # Debug: list stages and assignments (with users) before filtering by user
-        try:
-            print("Debug: Active stages and assignments for current transfers (before user filter):")
-            for tr in transfers:
-                wi = getattr(tr, "workflow_instance", None)
-                wi_id = getattr(wi, "id", None)
-                tr_id = getattr(tr, "id", getattr(tr, "pk", "?"))
-                print(f"- Transfer {tr_id}, WorkflowInstance {wi_id}")
-                if not wi:
-                    continue
-                stages_qs = wi.stage_instances.filter(
-                    status=ApprovalWorkflowStageInstance.STATUS_ACTIVE
-                )
-                for stg in stages_qs:
-                    stg_id = getattr(stg, "id", getattr(stg, "pk", "?"))
-                    tpl_name = getattr(getattr(stg, "stage_template", None), "name", "<no tpl>")
-                    print(f"  Stage {stg_id} ({tpl_name}) status={stg.status}")
-                    for asg in stg.assignments.all():
-                        asg_id = getattr(asg, "id", getattr(asg, "pk", "?"))
-                        asg_user = getattr(asg, "user", None)
-                        asg_user_id = getattr(asg_user, "id", getattr(asg_user, "pk", None))
-                        asg_user_name = None
-                        try:
-                            asg_user_name = str(asg_user)
-                        except Exception:
-                            asg_user_name = f"<user {asg_user_id}>"
-                        print(
-                            f"    Assignment {asg_id}: user={asg_user_name} (id={asg_user_id}) status={asg.status}"
-                        )
-        except Exception as e:
-            print(f"Debug listing error: {e}")
-        # IMPORTANT: Anchor user+pending to the SAME active stage instance.
-        # Using the assignment's stage_instance relation avoids mixing conditions
-        # across different stages in the same workflow.
-        transfers = base_qs.filter(
-            workflow_instance__stage_instances__assignments__user=user,
-            workflow_instance__stage_instances__assignments__status=ApprovalAssignment.STATUS_PENDING,
-            workflow_instance__stage_instances__assignments__stage_instance__status=ApprovalWorkflowStageInstance.STATUS_ACTIVE,
-        ).distinct()
-        print(
-            f"Transfers with active pending assignment for user {user}: {transfers.count()}"
+        return xx_BudgetTransfer.objects.filter(
+            transaction_id__in=ApprovalInboxItem.objects.filter(user=user).values(
+                "budget_transfer_id"
+            )
         )
-        try:
-            post_ids = list(transfers.values_list("id", flat=True))
-            excluded = sorted(set(pre_ids) - set(post_ids))
-            if excluded:
-                print(
-                    f"Transfers excluded after anchoring to user's active pending assignment: {excluded}"
-                )
-        except Exception:
-            pass
 
-        # Extra debug: list the exact assignment(s) for this user in active stages
-        try:
-            user_asgs = ApprovalAssignment.objects.filter(
-                user=user,
-                status=ApprovalAssignment.STATUS_PENDING,
-                stage_instance__status=ApprovalWorkflowStageInstance.STATUS_ACTIVE,
-                stage_instance__workflow_instance__status=ApprovalWorkflowInstance.STATUS_IN_PROGRESS,
-                stage_instance__workflow_instance__budget_transfer__in=transfers,
-            ).select_related(
-                "stage_instance__workflow_instance",
-                "stage_instance__stage_template",
-            )
-            print(
-                f"Debug: Active PENDING assignments for user {user} that drive the final result: {user_asgs.count()}"
-            )
-            for asg in user_asgs:
-                tr_id = getattr(
-                    getattr(asg.stage_instance.workflow_instance, "budget_transfer", None),
-                    "id",
-                    None,
-                )
-                stg = asg.stage_instance
-                tpl_name = getattr(stg.stage_template, "name", "<no tpl>")
-                print(
-                    f"  -> Transfer {tr_id}, Stage {stg.id} ({tpl_name}), assignment {asg.id}, status={asg.status}"
-                )
-        except Exception as e:
-            print(f"Debug (user assignments) listing error: {e}")
+    @staticmethod
+    def get_user_inbox_unread_count(user: xx_User, transfers=None):
+        """
+        Number of inbox items the user has not seen yet.
+
+        Args:
+            transfers: Optional BudgetTransfer queryset restricting the count
+                (e.g. the filtered inbox of a list view)
+        """
+        items = ApprovalInboxItem.objects.filter(user=user, read_at__isnull=True)
+        if transfers is not None:
+            items = items.filter(budget_transfer__in=transfers.values("transaction_id"))
+        return items.count()
 
-        return transfers
+    @staticmethod
+    def mark_inbox_read(user: xx_User, transfer_ids):
+        """Mark the user's inbox items of the given transfers as seen (one UPDATE)."""
+        transfer_ids = list(transfer_ids)
+        if not transfer_ids:
+            return 0
+        return ApprovalInboxItem.objects.filter(
+            user=user, budget_transfer_id__in=transfer_ids, read_at__isnull=True
+        ).update(read_at=timezone.now())
 
     @staticmethod
     def is_workflow_finished(budget_transfer: xx_BudgetTransfer):
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_inbox(apps, schema_editor):
+    """Inbox rows for the pending assignments of active stages of running workflows"""
+    ApprovalAssignment = apps.get_model("approvals", "ApprovalAssignment")
+    ApprovalInboxItem = apps.get_model("approvals", "ApprovalInboxItem")
+
+    rows = ApprovalAssignment.objects.filter(
+        status="pending",
+        stage_instance__status="active",
+        stage_instance__workflow_instance__status="in_progress",
+    ).values_list(
+        "stage_instance_id",
+        "user_id",
+        "stage_instance__workflow_instance__budget_transfer_id",
+        "created_at",
+    )
+    ApprovalInboxItem.objects.bulk_create(
+        [
+            ApprovalInboxItem(
+                stage_instance_id=stage_instance_id,
+                user_id=user_id,
+                budget_transfer_id=budget_transfer_id,
+                assigned_at=assigned_at,
+            )
+            for stage_instance_id, user_id, budget_transfer_id, assigned_at in rows
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals', '0003_alter_approvalaction_action'),
+        ('budget_management', '0003_attachment_blob_store'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApprovalInboxItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assigned_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('budget_transfer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_items', to='budget_management.xx_budgettransfer')),
+                ('stage_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_items', to='approvals.approvalworkflowstageinstance')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='approval_inbox', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'APPROVAL_INBOX_ITEM',
+                'indexes': [models.Index(fields=['user', 'assigned_at', 'read_at'], name='approval_inbox_user_idx')],
+                'constraints': [models.UniqueConstraint(fields=('stage_instance', 'user'), name='approval_inbox_stage_user_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_inbox, migrations.RunPython.noop),
+    ]
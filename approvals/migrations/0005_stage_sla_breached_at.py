@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('approvals', '0004_approval_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvalworkflowstageinstance',
+            name='sla_breached_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='approvalworkflowstageinstance',
+            index=models.Index(fields=['status', 'sla_breached_at'], name='approval_stage_sla_idx'),
+        ),
+    ]
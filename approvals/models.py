@@ -176,12 +176,17 @@ class ApprovalWorkflowStageInstance(models.Model):
 	status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=STATUS_PENDING)
 	activated_at = models.DateTimeField(null=True, blank=True)
 	completed_at = models.DateTimeField(null=True, blank=True)
+	# Set by the SLA sweep (approvals.tasks.check_sla_breaches) so a breach fires once
+	sla_breached_at = models.DateTimeField(null=True, blank=True)
 
 	class Meta:
 		db_table = "APPROVAL_WORKFLOW_STAGE_INSTANCE"
 		ordering = ["workflow_instance", "stage_template__order_index"]
 		indexes = [
 			models.Index(fields=["workflow_instance", "status"]),
+			models.Index(
+				fields=["status", "sla_breached_at"], name="approval_stage_sla_idx"
+			),
 		]
 
 	def __str__(self):
@@ -302,3 +307,40 @@ class ApprovalDelegation(models.Model):
 			self.active = False
 			self.deactivated_at = timezone.now()
 			self.save(update_fields=["active", "deactivated_at"])
+
+
+class ApprovalInboxItem(models.Model):
+	"""
+	Denormalized approver inbox: one row per pending assignment of an active stage.
+
+	Maintained by ApprovalManager (stage activation, actions, stage completion,
+	delegation and cancellation), so an approver's inbox and unread count are a
+	range scan of (user, assigned_at, read_at) instead of joins from transfers
+	through workflow, stage and assignment tables.
+	"""
+
+	user = models.ForeignKey(
+		"user_management.xx_User", related_name="approval_inbox", on_delete=models.CASCADE
+	)
+	budget_transfer = models.ForeignKey(
+		"budget_management.xx_BudgetTransfer",
+		related_name="inbox_items",
+		on_delete=models.CASCADE,
+	)
+	stage_instance = models.ForeignKey(
+		ApprovalWorkflowStageInstance, related_name="inbox_items", on_delete=models.CASCADE
+	)
+	assigned_at = models.DateTimeField(default=timezone.now)
+	read_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		db_table = "APPROVAL_INBOX_ITEM"
+		constraints = [
+			models.UniqueConstraint(fields=["stage_instance", "user"], name="approval_inbox_stage_user_uniq"),
+		]
+		indexes = [
+			models.Index(fields=["user", "assigned_at", "read_at"], name="approval_inbox_user_idx"),
+		]
+
+	def __str__(self):
+		return f"Inbox {self.user_id} -> Transfer {self.budget_transfer_id} (StageInstance {self.stage_instance_id})"
@@ -1,23 +1,65 @@
 # approval/tasks.py
 from celery import shared_task
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
-from .models import ApprovalWorkflowStageInstance
+from budget_transfer.global_function.oracle_limits import ORACLE_IN_BATCH_SIZE
+from .models import (
+    ApprovalDelegation,
+    ApprovalWorkflowStageInstance,
+    ApprovalWorkflowStageTemplate,
+)
 from .managers import ApprovalManager
 
 
 @shared_task
 def check_sla_breaches():
     """
-    Find all active stage instances that have SLA exceeded and call on_sla_breached.
+    Find the active stage instances whose SLA has just been exceeded and call
+    on_sla_breached once per stage.
+
+    The deadline check (activated_at + sla_hours < now) runs in the database as
+    one activation cutoff per distinct sla_hours, and breached stages are marked
+    with sla_breached_at, so each sweep only reads the stages that breached
+    since the previous one.
     """
     now = timezone.now()
-    for stage in ApprovalWorkflowStageInstance.objects.filter(status="active"):
-        sla_hours = stage.stage_template.sla_hours
-        if sla_hours:
-            deadline = stage.activated_at + timedelta(hours=sla_hours)
-            if now > deadline:
-                ApprovalManager.on_sla_breached(stage)
+    # One activation cutoff per SLA length in use; few templates, few distinct values
+    sla_lengths = (
+        ApprovalWorkflowStageTemplate.objects.filter(sla_hours__gt=0)
+        .values_list("sla_hours", flat=True)
+        .distinct()
+    )
+    overdue = Q()
+    for sla_hours in sla_lengths:
+        overdue |= Q(
+            stage_template__sla_hours=sla_hours,
+            activated_at__lt=now - timedelta(hours=sla_hours),
+        )
+    if not overdue:
+        return 0
+
+    with transaction.atomic():
+        breached = list(
+            ApprovalWorkflowStageInstance.objects.select_for_update(of=("self",))
+            .select_related("stage_template", "workflow_instance")
+            .filter(
+                overdue,
+                status=ApprovalWorkflowStageInstance.STATUS_ACTIVE,
+                sla_breached_at__isnull=True,
+            )
+            .order_by("pk")
+        )
+        for start in range(0, len(breached), ORACLE_IN_BATCH_SIZE):
+            ApprovalWorkflowStageInstance.objects.filter(
+                pk__in=[stage.pk for stage in breached[start:start + ORACLE_IN_BATCH_SIZE]]
+            ).update(sla_breached_at=now)
+
+    for stage in breached:
+        stage.sla_breached_at = now
+        ApprovalManager.on_sla_breached(stage)
+    return len(breached)
 
 
 @shared_task
@@ -25,7 +67,8 @@ def cleanup_delegations():
     """
     Deactivate stale delegations where the stage is no longer active.
     """
-    now = timezone.now()
-    qs = ApprovalWorkflowStageInstance.objects.exclude(status="active")
-    for stage in qs:
-        stage.delegations.filter(active=True).update(active=False, deactivated_at=now)
+    return (
+        ApprovalDelegation.objects.filter(active=True)
+        .exclude(stage_instance__status=ApprovalWorkflowStageInstance.STATUS_ACTIVE)
+        .update(active=False, deactivated_at=timezone.now())
+    )
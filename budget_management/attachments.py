@@ -0,0 +1,136 @@
+"""
+Budget transfer attachment storage
+
+Uploaded files are streamed into the "attachments" blob store and the
+xx_BudgetTransferAttachment row keeps only metadata and the SHA-256 of the
+content. Rows created before that still carry the file in file_data until
+migrate_attachment_blobs() moves it out of the database.
+"""
+import hashlib
+import io
+
+from budget_transfer.global_function.blob_store import BlobStore, ranged_file_response
+
+from .models import xx_BudgetTransferAttachment
+
+
+def _referenced_attachment_blobs(keys):
+    return set(
+        xx_BudgetTransferAttachment.objects.filter(file_sha256__in=keys).values_list(
+            "file_sha256", flat=True
+        )
+    )
+
+
+attachment_store = BlobStore("attachments", references=_referenced_attachment_blobs)
+
+# Everything but the legacy BLOB column
+ATTACHMENT_METADATA_FIELDS = (
+    "attachment_id",
+    "budget_transfer_id",
+    "file_name",
+    "file_type",
+    "file_size",
+    "file_sha256",
+    "upload_date",
+)
+
+
+def store_attachment(transfer, uploaded_file):
+    """Stream an uploaded file to the blob store and create its attachment row"""
+    sha256, size = attachment_store.save_upload(uploaded_file)
+    return xx_BudgetTransferAttachment.objects.create(
+        budget_transfer=transfer,
+        file_name=uploaded_file.name,
+        file_type=uploaded_file.content_type,
+        file_size=size,
+        file_sha256=sha256,
+    )
+
+
+def attachment_metadata(attachment):
+    return {
+        "attachment_id": attachment.attachment_id,
+        "file_name": attachment.file_name,
+        "file_type": attachment.file_type,
+        "file_size": attachment.file_size,
+        "file_sha256": attachment.file_sha256,
+        "upload_date": attachment.upload_date,
+    }
+
+
+def attachment_download_response(request, attachment):
+    """Streaming (Range-aware) download of an attachment from whichever storage holds it"""
+    if attachment.file_sha256:
+        return ranged_file_response(
+            request,
+            attachment_store.open(attachment.file_sha256),
+            attachment_store.size(attachment.file_sha256),
+            attachment.file_name,
+            attachment.file_type,
+            etag=attachment.file_sha256,
+        )
+
+    # Not migrated yet: the content is still in the database
+    data = bytes(
+        xx_BudgetTransferAttachment.objects.filter(pk=attachment.pk)
+        .values_list("file_data", flat=True)
+        .first()
+        or b""
+    )
+    return ranged_file_response(
+        request, io.BytesIO(data), len(data), attachment.file_name, attachment.file_type
+    )
+
+
+def release_attachment_blob(sha256):
+    """Delete a stored file once no attachment row references it (see BlobStore.release)."""
+    return attachment_store.release(sha256)
+
+
+def migrate_attachment_blobs(batch_size=100, dry_run=False):
+    """
+    Move file_data BLOBs into the blob store, one row at a time so only one
+    file is held in memory.
+
+    Returns:
+        dict: {'migrated', 'bytes', 'deduplicated', 'remaining'}
+    """
+    pending = xx_BudgetTransferAttachment.objects.filter(
+        file_sha256__isnull=True, file_data__isnull=False
+    )
+    result = {"migrated": 0, "bytes": 0, "deduplicated": 0, "remaining": pending.count()}
+    if dry_run:
+        return result
+
+    last_id = 0
+    while True:
+        ids = list(
+            pending.filter(attachment_id__gt=last_id)
+            .order_by("attachment_id")
+            .values_list("attachment_id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        for attachment_id in ids:
+            data = (
+                xx_BudgetTransferAttachment.objects.filter(pk=attachment_id)
+                .values_list("file_data", flat=True)
+                .first()
+            )
+            if data is None:
+                continue
+            data = bytes(data)
+            already_stored = attachment_store.exists(hashlib.sha256(data).hexdigest())
+            sha256, size = attachment_store.save_bytes(data)
+            xx_BudgetTransferAttachment.objects.filter(pk=attachment_id).update(
+                file_sha256=sha256, file_size=size, file_data=None
+            )
+            result["migrated"] += 1
+            result["bytes"] += size
+            if already_stored:
+                result["deduplicated"] += 1
+        last_id = ids[-1]
+
+    result["remaining"] = pending.count()
+    return result
@@ -0,0 +1,201 @@
+"""
+Delta maintenance of xx_DashboardTransferAggregate
+
+Every transfer line contributes its from/to amounts to the aggregate row keyed by
+(cost_center_code, account_code, project_code, status, fy), where status and fy
+come from the parent xx_BudgetTransfer. The signal receivers call the helpers in
+this module to move contributions when a line or its parent changes, and
+rebuild_dashboard_aggregates() recomputes the table from scratch.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from transaction.models import xx_TransactionTransfer
+from .models import xx_DashboardTransferAggregate
+
+AGGREGATE_KEY_FIELDS = (
+    "cost_center_code",
+    "account_code",
+    "project_code",
+    "status",
+    "fy",
+)
+
+
+def _amount(value):
+    return Decimal(str(value)) if value not in (None, "") else Decimal("0")
+
+
+def line_key(cost_center_code, account_code, project_code, status, fy):
+    """Aggregate key for one transfer line"""
+    return (
+        cost_center_code,
+        account_code,
+        str(project_code) if project_code is not None else None,
+        status,
+        fy,
+    )
+
+
+def apply_delta(key, total_from, total_to, line_count):
+    """
+    Add (or subtract, with negative values) amounts to the aggregate row for key.
+
+    Uses F() updates so concurrent writers do not lose updates; the row is created
+    on first use and dropped when its last line is removed.
+    """
+    total_from = _amount(total_from)
+    total_to = _amount(total_to)
+    if not total_from and not total_to and not line_count:
+        return
+
+    filters = dict(zip(AGGREGATE_KEY_FIELDS, key))
+    rows = xx_DashboardTransferAggregate.objects.filter(**filters)
+    updated = rows.update(
+        total_from=F("total_from") + total_from,
+        total_to=F("total_to") + total_to,
+        line_count=F("line_count") + line_count,
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                xx_DashboardTransferAggregate.objects.create(
+                    total_from=total_from,
+                    total_to=total_to,
+                    line_count=line_count,
+                    **filters,
+                )
+        except IntegrityError:
+            # Another writer created the row first
+            rows.update(
+                total_from=F("total_from") + total_from,
+                total_to=F("total_to") + total_to,
+                line_count=F("line_count") + line_count,
+            )
+
+    if line_count < 0:
+        rows.filter(line_count__lte=0).delete()
+
+
+def move_transaction_lines(transaction_id, old_status, old_fy, new_status, new_fy):
+    """
+    Move the contributions of every line of a budget transfer from its old
+    (status, fy) to the new one, using one grouped query over its lines.
+    """
+    groups = (
+        xx_TransactionTransfer.objects.filter(transaction_id=transaction_id)
+        .values("cost_center_code", "account_code", "project_code")
+        .annotate(
+            total_from=Sum("from_center"),
+            total_to=Sum("to_center"),
+            line_count=Count("transfer_id"),
+        )
+        .order_by()
+    )
+    for group in groups:
+        segments = (
+            group["cost_center_code"],
+            group["account_code"],
+            group["project_code"],
+        )
+        total_from = _amount(group["total_from"])
+        total_to = _amount(group["total_to"])
+        apply_delta(
+            line_key(*segments, old_status, old_fy),
+            -total_from,
+            -total_to,
+            -group["line_count"],
+        )
+        apply_delta(
+            line_key(*segments, new_status, new_fy),
+            total_from,
+            total_to,
+            group["line_count"],
+        )
+
+
+def compute_dashboard_aggregates():
+    """Aggregate totals computed from scratch over all transfer lines"""
+    expected = defaultdict(lambda: [Decimal("0"), Decimal("0"), 0])
+    rows = (
+        xx_TransactionTransfer.objects.values(
+            "cost_center_code",
+            "account_code",
+            "project_code",
+            "transaction__status",
+            "transaction__fy",
+        )
+        .annotate(
+            total_from=Sum("from_center"),
+            total_to=Sum("to_center"),
+            line_count=Count("transfer_id"),
+        )
+        .order_by()
+    )
+    for row in rows:
+        key = line_key(
+            row["cost_center_code"],
+            row["account_code"],
+            row["project_code"],
+            row["transaction__status"],
+            row["transaction__fy"],
+        )
+        totals = expected[key]
+        totals[0] += _amount(row["total_from"])
+        totals[1] += _amount(row["total_to"])
+        totals[2] += row["line_count"]
+    return expected
+
+
+def rebuild_dashboard_aggregates(dry_run=False):
+    """
+    Recompute xx_DashboardTransferAggregate from xx_TransactionTransfer.
+
+    Args:
+        dry_run (bool): Only report drift, do not rewrite the table
+
+    Returns:
+        dict: {'rows': int, 'drift': list of {'key', 'stored', 'expected'}}
+    """
+    expected = compute_dashboard_aggregates()
+
+    stored = {}
+    for row in xx_DashboardTransferAggregate.objects.values(
+        *AGGREGATE_KEY_FIELDS, "total_from", "total_to", "line_count"
+    ):
+        key = tuple(row[field] for field in AGGREGATE_KEY_FIELDS)
+        stored[key] = [row["total_from"], row["total_to"], row["line_count"]]
+
+    drift = []
+    for key in set(expected) | set(stored):
+        expected_totals = expected.get(key, [Decimal("0"), Decimal("0"), 0])
+        stored_totals = stored.get(key, [Decimal("0"), Decimal("0"), 0])
+        if [_amount(v) for v in expected_totals] != [_amount(v) for v in stored_totals]:
+            drift.append(
+                {
+                    "key": dict(zip(AGGREGATE_KEY_FIELDS, key)),
+                    "stored": stored_totals,
+                    "expected": expected_totals,
+                }
+            )
+
+    if not dry_run:
+        with transaction.atomic():
+            xx_DashboardTransferAggregate.objects.all().delete()
+            xx_DashboardTransferAggregate.objects.bulk_create(
+                [
+                    xx_DashboardTransferAggregate(
+                        total_from=totals[0],
+                        total_to=totals[1],
+                        line_count=totals[2],
+                        **dict(zip(AGGREGATE_KEY_FIELDS, key)),
+                    )
+                    for key, totals in expected.items()
+                ],
+                batch_size=1000,
+            )
+
+    return {"rows": len(expected), "drift": drift}
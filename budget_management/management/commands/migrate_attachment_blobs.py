@@ -0,0 +1,48 @@
+"""
+Django management command to move attachment BLOBs out of the database
+"""
+from django.core.management.base import BaseCommand, CommandError
+from budget_management.attachments import migrate_attachment_blobs
+
+
+class Command(BaseCommand):
+    help = 'Move xx_BudgetTransferAttachment.file_data BLOBs into the attachment blob store'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Attachments to look up per query (default: 100)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the attachments still stored in the database'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        try:
+            result = migrate_attachment_blobs(batch_size=options['batch_size'], dry_run=dry_run)
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'❌ Unexpected error: {str(e)}')
+            )
+            raise CommandError(f'Command failed: {str(e)}')
+
+        if dry_run:
+            self.stdout.write(f"📊 {result['remaining']} attachments still stored in the database (dry run, nothing moved)")
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Moved {result['migrated']} attachments ({result['bytes']} bytes) to the blob store, "
+                f"{result['deduplicated']} were duplicates of stored files"
+            )
+        )
+        if result['remaining']:
+            self.stdout.write(
+                self.style.WARNING(f"⚠️  {result['remaining']} attachments are still stored in the database")
+            )
@@ -0,0 +1,53 @@
+"""
+Django management command to rebuild the dashboard aggregate table
+"""
+from django.core.management.base import BaseCommand, CommandError
+from budget_management.dashboard_aggregates import rebuild_dashboard_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Rebuild XX_DASHBOARD_TRANSFER_AGG_XX from transfer lines and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drift, do not rewrite the table'
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='Print every drifted aggregate row'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        verbose = options['verbose']
+
+        try:
+            result = rebuild_dashboard_aggregates(dry_run=dry_run)
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'❌ Unexpected error: {str(e)}')
+            )
+            raise CommandError(f'Command failed: {str(e)}')
+
+        drift = result['drift']
+        if drift:
+            self.stdout.write(
+                self.style.WARNING(f"⚠️  {len(drift)} aggregate rows drifted from the transfer lines")
+            )
+            if verbose:
+                for item in drift:
+                    self.stdout.write(
+                        f"  {item['key']}: stored={item['stored']} expected={item['expected']}"
+                    )
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ No drift found'))
+
+        if dry_run:
+            self.stdout.write(f"📊 {result['rows']} aggregate rows expected (dry run, nothing written)")
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"✅ Rebuilt {result['rows']} aggregate rows")
+            )
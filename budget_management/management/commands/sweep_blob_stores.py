@@ -0,0 +1,24 @@
+"""
+Django management command to delete stored files no row references anymore
+"""
+from django.core.management.base import BaseCommand, CommandError
+from budget_management.tasks import sweep_blob_stores
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete blob store files (attachments, invoices, uploads) that no row references '
+        'and that were not written or reused within BLOB_DELETE_GRACE_SECONDS'
+    )
+
+    def handle(self, *args, **options):
+        try:
+            result = sweep_blob_stores()
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'❌ Unexpected error: {str(e)}')
+            )
+            raise CommandError(f'Command failed: {str(e)}')
+
+        for namespace, deleted in result.items():
+            self.stdout.write(self.style.SUCCESS(f'✅ {namespace}: deleted {deleted} unreferenced files'))
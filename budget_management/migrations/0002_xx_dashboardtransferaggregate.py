@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:32
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_dashboard_aggregates(apps, schema_editor):
+    TransactionTransfer = apps.get_model("transaction", "xx_TransactionTransfer")
+    Aggregate = apps.get_model("budget_management", "xx_DashboardTransferAggregate")
+    rows = (
+        TransactionTransfer.objects.values(
+            "cost_center_code",
+            "account_code",
+            "project_code",
+            "transaction__status",
+            "transaction__fy",
+        )
+        .annotate(
+            total_from=Sum("from_center"),
+            total_to=Sum("to_center"),
+            line_count=Count("transfer_id"),
+        )
+        .order_by()
+    )
+    Aggregate.objects.bulk_create(
+        [
+            Aggregate(
+                cost_center_code=row["cost_center_code"],
+                account_code=row["account_code"],
+                project_code=row["project_code"],
+                status=row["transaction__status"],
+                fy=row["transaction__fy"],
+                total_from=row["total_from"] or 0,
+                total_to=row["total_to"] or 0,
+                line_count=row["line_count"],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget_management', '0001_initial'),
+        ('transaction', '0002_xx_transactiontransfer_budget_adjustments_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='xx_DashboardTransferAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cost_center_code', models.IntegerField(blank=True, null=True)),
+                ('account_code', models.IntegerField(blank=True, null=True)),
+                ('project_code', models.CharField(blank=True, max_length=50, null=True)),
+                ('status', models.CharField(blank=True, max_length=10, null=True)),
+                ('fy', models.IntegerField(blank=True, null=True)),
+                ('total_from', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('total_to', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('line_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'XX_DASHBOARD_TRANSFER_AGG_XX',
+                'indexes': [models.Index(fields=['status', 'fy'], name='XX_DASHBOAR_status_7a3648_idx'), models.Index(fields=['status', 'cost_center_code', 'account_code'], name='XX_DASHBOAR_status_658f0b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cost_center_code', 'account_code', 'project_code', 'status', 'fy'), name='unique_dash_transfer_agg_key')],
+            },
+        ),
+        migrations.RunPython(populate_dashboard_aggregates, migrations.RunPython.noop),
+    ]
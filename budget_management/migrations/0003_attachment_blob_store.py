@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget_management', '0002_xx_dashboardtransferaggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='xx_budgettransferattachment',
+            name='file_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='xx_budgettransferattachment',
+            name='file_data',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
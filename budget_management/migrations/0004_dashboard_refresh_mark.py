@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget_management', '0003_attachment_blob_store'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='xx_DashboardRefreshMark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dashboard', models.CharField(max_length=20, unique=True)),
+                ('marks', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'XX_DASHBOARD_REFRESH_MARK_XX',
+            },
+        ),
+    ]
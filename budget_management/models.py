@@ -1,6 +1,7 @@
 from pyexpat import model
 from django.db import models
 from account_and_entitys.models import XX_Account, XX_Entity, XX_Project
+from account_and_entitys.hierarchy import get_hierarchy_index
 # Avoid importing xx_User at module import time to prevent circular imports
 
 # Removed encrypted fields import - using standard Django fields now
@@ -86,7 +87,7 @@ class xx_BudgetTransfer(models.Model):
 # JOIN XX_Entity_XX ON XX_Transaction_Transfer_XX.cost_center_code = XX_Entity_XX.entity
 # WHERE XX_Entity_XX.id IN (value1, value2, ...);
 
-from django.db.models import Q, Count, F
+from django.db.models import Q, Count, F, Exists, OuterRef
 from django.db.models import Value
 from django.db.models.functions import Cast
 from django.db.models import CharField
@@ -96,24 +97,13 @@ def get_entities_with_children(entity_ids):
     """
     Given a list of entity IDs, return all XX_Entity objects including their children (recursively).
     """
-    # Start with the initial set
-    entities = list(XX_Entity.objects.filter(id__in=entity_ids))
-    collected_ids = set(e.id for e in entities)
+    index = get_hierarchy_index(XX_Entity)
 
-    queue = list(entities)  # start with base entities
-    while queue:
-        parent_entity = queue.pop(0)
+    collected_ids = set(entity_ids)
+    for code in set(index.codes_for_ids(entity_ids)):
+        collected_ids.update(index.ids_for_codes(index.descendants(code)))
 
-        # Find children where parent matches the string version of this entity number
-        children = XX_Entity.objects.filter(parent=str(parent_entity.entity))
-
-        for child in children:
-            if child.id not in collected_ids:
-                collected_ids.add(child.id)
-                entities.append(child)
-                queue.append(child)
-
-    return entities
+    return list(XX_Entity.objects.filter(id__in=collected_ids))
 
 
 def get_zero_level_accounts(accounts_queryset):
@@ -121,19 +111,8 @@ def get_zero_level_accounts(accounts_queryset):
     Given a queryset of XX_Account objects, return only Zero Level accounts
     (accounts that are not parents to any other account).
     """
-    # Convert queryset to list if it's not already
-    accounts = list(accounts_queryset)
-
-    # Get all account numbers that are used as parents
-    parent_accounts = XX_Account.objects.exclude(parent__isnull=True).exclude(parent="")
-    parent_account_numbers = set(parent.parent for parent in parent_accounts)
-
-    # Filter for accounts that are not parents
-    zero_level_accounts = [
-        account for account in accounts if account.account not in parent_account_numbers
-    ]
-
-    return zero_level_accounts
+    index = get_hierarchy_index(XX_Account)
+    return [account for account in accounts_queryset if index.is_leaf(account.account)]
 
 
 def get_zero_level_projects(projects_queryset):
@@ -141,10 +120,8 @@ def get_zero_level_projects(projects_queryset):
     Given a queryset of XX_Project objects, return only Zero Level projects
     (projects that are not parents to any other project).
     """
-    projects = list(projects_queryset)
-    parent_projects = XX_Project.objects.exclude(parent__isnull=True).exclude(parent="")
-    parent_project_codes = set(p.parent for p in parent_projects)
-    return [proj for proj in projects if proj.project not in parent_project_codes]
+    index = get_hierarchy_index(XX_Project)
+    return [proj for proj in projects_queryset if index.is_leaf(proj.project)]
 
 
 def filter_budget_transfers_all_in_entities(
@@ -153,98 +130,45 @@ def filter_budget_transfers_all_in_entities(
     """
     From a given queryset of BudgetTransfer objects,
     return only those where *all* related transactions
-    belong to the given entity_ids.
+    belong to the entities the user has the Type ability on (or their children),
+    plus the user's own transfers.
 
-    Modified to avoid Oracle NCLOB issues with complex annotations.
+    The allowed cost center codes are read from the user's materialized scope
+    (XX_UserEntityScope), so the check is a single anti-join on
+    (transaction, cost_center_code) and no entity list is sent to the database.
     """
-    entity_ids = [
-        ability.Entity.id
-        for ability in user.abilities.all()
-        if ability.Entity and ability.Type == Type
-    ]
+    # Imported here to avoid circular imports with transaction and user_management
+    from transaction.models import xx_TransactionTransfer
+    from user_management.entity_scope import (
+        ensure_user_entity_scope,
+        entity_codes_for,
+    )
+    from user_management.models import XX_UserEntityScope
+
+    lines = xx_TransactionTransfer.objects.filter(
+        transaction=OuterRef("pk"), cost_center_code__isnull=False
+    )
+
     if dashboard_filler_per_project is not None:
+        entity_ids = [
+            ability.Entity_id
+            for ability in user.abilities.all()
+            if ability.Entity_id and ability.Type == Type
+        ]
         if int(dashboard_filler_per_project) in entity_ids:
-            entity_ids = [int(dashboard_filler_per_project)]
-    entities = get_entities_with_children(entity_ids)
-
-    # Collect allowed entity codes and convert to integers when possible to match numeric cost_center_code
-    raw_entity_codes = [e.entity for e in entities]
-    numeric_entity_codes = []
-    for code in raw_entity_codes:
-        try:
-            # Many entities are stored as strings but represent integers; convert safely
-            numeric_entity_codes.append(int(str(code).strip()))
-        except Exception:
-            # Skip non-numeric codes to avoid Oracle ORA-01722 when comparing to NUMBER columns
-            continue
-
-    # Simplified approach to avoid NCLOB issues
-    # Get transfer IDs that have all their transactions in allowed entities
-    from django.db import connection
-
-    try:
-        # Use raw SQL to avoid NCLOB issues with complex annotations
-        with connection.cursor() as cursor:
-            if numeric_entity_codes:
-                # Build dynamic placeholders for IN clause
-                placeholders = ",".join(["%s"] * len(numeric_entity_codes))
-                sql = f"""
-                    SELECT bt.transaction_id
-                    FROM XX_BUDGET_TRANSFER_XX bt
-                    WHERE NOT EXISTS (
-                        SELECT 1 
-                        FROM XX_TRANSACTION_TRANSFER_XX tt 
-                        WHERE tt.transaction_id = bt.transaction_id 
-                        AND tt.cost_center_code NOT IN ({placeholders})
-                    )
-                    AND EXISTS (
-                        SELECT 1 
-                        FROM XX_TRANSACTION_TRANSFER_XX tt2 
-                        WHERE tt2.transaction_id = bt.transaction_id
-                    )
-
-                    UNION
-
-                    SELECT bt.transaction_id
-                    FROM XX_BUDGET_TRANSFER_XX bt
-                    WHERE NOT EXISTS (
-                        SELECT 1 
-                        FROM XX_TRANSACTION_TRANSFER_XX tt 
-                        WHERE tt.transaction_id = bt.transaction_id
-                    )
-                """
-                cursor.execute(sql, numeric_entity_codes)
-            else:
-                # No numeric entity codes; skip NOT IN check and just select those with no transactions
-                cursor.execute(
-                    """
-                    SELECT bt.transaction_id
-                    FROM XX_BUDGET_TRANSFER_XX bt
-                    WHERE NOT EXISTS (
-                        SELECT 1
-                        FROM XX_TRANSACTION_TRANSFER_XX tt
-                        WHERE tt.transaction_id = bt.transaction_id
-                    )
-                    """
-                )
-
-            allowed_ids = [row[0] for row in cursor.fetchall()]
-
-        combined = budget_transfers.filter(
-            Q(transaction_id__in=allowed_ids) | Q(user_id=user.id)
-        ).distinct()
-        return combined
-
-    except Exception as e:
-        # Fallback to simple filtering if raw SQL fails
-        print(f"Error occurred: {e}")
-        if numeric_entity_codes:
+            # One entity subtree only: small enough to filter on directly
+            codes = entity_codes_for([int(dashboard_filler_per_project)])
+            lines_outside = lines.exclude(cost_center_code__in=codes)
             return budget_transfers.filter(
-                Q(transfers__cost_center_code__in=numeric_entity_codes)
-                | Q(user_id=user.id)
-            ).distinct()
-        # If nothing numeric to filter on, just fall back to user-owned transfers
-        return budget_transfers.filter(Q(user_id=user.id)).distinct()
+                ~Exists(lines_outside) | Q(user_id=user.id)
+            )
+
+    ensure_user_entity_scope(user.id)
+    in_scope = XX_UserEntityScope.objects.filter(
+        user_id=user.id, Type=Type, entity_code=OuterRef("cost_center_code")
+    )
+    lines_outside = lines.filter(~Exists(in_scope))
+    return budget_transfers.filter(~Exists(lines_outside) | Q(user_id=user.id))
 
 
 def get_level_zero_children(entity_ids):
@@ -294,7 +218,12 @@ def get_costcenter_code(user, Type="edit", dashboard_filler_per_project=None):
 
 
 class xx_BudgetTransferAttachment(models.Model):
-    """Model to store file attachments as BLOBs for budget transfers"""
+    """
+    File attachment of a budget transfer.
+
+    The content lives in the attachment blob store under file_sha256; file_data
+    only holds files uploaded before that, until migrate_attachment_blobs moves them.
+    """
 
     attachment_id = models.AutoField(primary_key=True)
     budget_transfer = models.ForeignKey(
@@ -306,7 +235,8 @@ class xx_BudgetTransferAttachment(models.Model):
     file_name = models.CharField(max_length=255)  # Changed from EncryptedCharField
     file_type = models.CharField(max_length=100)  # Changed from EncryptedCharField
     file_size = models.IntegerField()
-    file_data = models.BinaryField()  # This will store the BLOB data
+    file_data = models.BinaryField(null=True, blank=True)  # Legacy BLOB storage
+    file_sha256 = models.CharField(max_length=64, null=True, blank=True, db_index=True)
     upload_date = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -369,3 +299,62 @@ class xx_DashboardBudgetTransfer(models.Model):
 
     def __str__(self):
         return f"Dashboard Data {self.Dashboard_id} from {self.date}"
+
+
+class xx_DashboardTransferAggregate(models.Model):
+    """Running from/to totals of transfer lines per segment combination, status and FY
+
+    Maintained by deltas from the transfer signals (see
+    budget_management.dashboard_aggregates) and rebuilt by the
+    reconcile_dashboard_aggregates management command.
+    """
+
+    cost_center_code = models.IntegerField(null=True, blank=True)
+    account_code = models.IntegerField(null=True, blank=True)
+    project_code = models.CharField(max_length=50, null=True, blank=True)
+    status = models.CharField(max_length=10, null=True, blank=True)
+    fy = models.IntegerField(null=True, blank=True)
+    total_from = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    total_to = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    line_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "XX_DASHBOARD_TRANSFER_AGG_XX"
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "cost_center_code",
+                    "account_code",
+                    "project_code",
+                    "status",
+                    "fy",
+                ],
+                name="unique_dash_transfer_agg_key",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["status", "fy"]),
+            models.Index(fields=["status", "cost_center_code", "account_code"]),
+        ]
+
+    def __str__(self):
+        return f"Dashboard Aggregate {self.cost_center_code}/{self.account_code}/{self.project_code} {self.status} FY{self.fy}"
+
+
+class xx_DashboardRefreshMark(models.Model):
+    """Pending recomputation marks of one dashboard ("smart" or "normal")
+
+    Bumped by budget_management.tasks.mark_dashboard_dirty in the transaction
+    that changes transfers and consumed by refresh_dirty_dashboards, so the
+    marks are shared by the web processes and the Celery workers.
+    """
+
+    dashboard = models.CharField(max_length=20, unique=True)
+    marks = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "XX_DASHBOARD_REFRESH_MARK_XX"
+
+    def __str__(self):
+        return f"Dashboard {self.dashboard}: {self.marks} marks"
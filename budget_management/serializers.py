@@ -21,3 +21,18 @@ class BudgetTransferSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class BudgetTransferListSerializer(serializers.ModelSerializer):
+    """Columns shown in the approval lists"""
+
+    class Meta:
+        model = xx_BudgetTransfer
+        fields = [
+            'transaction_id',
+            'amount',
+            'status',
+            'status_level',
+            'requested_by',
+            'request_date',
+            'code',
+            'transaction_date',
+        ]
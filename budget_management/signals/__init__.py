@@ -12,5 +12,21 @@ except ImportError as e:
 except Exception as e:
     print(f"✗ Unexpected error loading budget transfer signals: {e}")
 
+try:
+    from . import transcation_transfer
+    print("✓ Transaction transfer signals imported successfully")
+except ImportError as e:
+    print(f"✗ Error importing transaction transfer signals: {e}")
+except Exception as e:
+    print(f"✗ Unexpected error loading transaction transfer signals: {e}")
+
+try:
+    from . import attachments
+    print("✓ Attachment signals imported successfully")
+except ImportError as e:
+    print(f"✗ Error importing attachment signals: {e}")
+except Exception as e:
+    print(f"✗ Unexpected error loading attachment signals: {e}")
+
 # You can add more signal imports here in the future
 # from . import other_signals_file
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""
+Django signals for xx_BudgetTransferAttachment model
+Remove stored attachment files that no row references anymore
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from ..attachments import release_attachment_blob
+from ..models import xx_BudgetTransferAttachment
+import logging
+
+logger = logging.getLogger("budget_transfer_signals")
+
+
+@receiver(post_delete, sender=xx_BudgetTransferAttachment)
+def attachment_post_delete(sender, instance, **kwargs):
+    """Delete the file after commit, unless another attachment has the same content"""
+    sha256 = instance.file_sha256
+    if not sha256:
+        return
+
+    def release():
+        try:
+            release_attachment_blob(sha256)
+        except Exception as e:
+            logger.error(f"Could not remove attachment file {sha256}: {e}")
+
+    transaction.on_commit(release)
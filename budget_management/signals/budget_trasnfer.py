@@ -11,7 +11,8 @@ from approvals.managers import ApprovalManager
 from ..models import xx_BudgetTransfer
 from user_management.models import xx_notification
 import logging
-from budget_transfer.global_function.dashbaord import dashboard_smart, dashboard_normal
+from ..tasks import mark_dashboard_dirty
+from ..dashboard_aggregates import move_transaction_lines
 
 # Configure logging for budget transfer signals
 logger = logging.getLogger("budget_transfer_signals")
@@ -21,6 +22,25 @@ logger = logging.getLogger("budget_transfer_signals")
 # ============================================================================
 
 
+@receiver(pre_save, sender=xx_BudgetTransfer)
+def budget_transfer_pre_save(sender, instance, **kwargs):
+    """
+    Function executed BEFORE saving xx_BudgetTransfer
+    Remembers the stored status/fy so the dashboard aggregates can be moved
+    """
+    instance._dashboard_old_state = None
+    if instance.pk is None:
+        return
+    try:
+        instance._dashboard_old_state = (
+            xx_BudgetTransfer.objects.filter(pk=instance.pk)
+            .values_list("status", "fy")
+            .first()
+        )
+    except Exception as e:
+        logger.error(f"Error in budget_transfer_pre_save: {str(e)}")
+
+
 @receiver(post_save, sender=xx_BudgetTransfer)
 def budget_transfer_post_save(sender, instance, created, **kwargs):
     """
@@ -28,21 +48,28 @@ def budget_transfer_post_save(sender, instance, created, **kwargs):
     Use this for notifications, related updates, or post-processing
     """
     try:
-        # Run dashboard function for ALL saves (create AND update)
-        if instance.status == "approved":
-            print("approved enterd")
-            dashboard_smart()
-        # elif instance.status == "pending":
-        print("pending enterd")
-        dashboard_normal()
+        # Move this transfer's lines to the new (status, fy) aggregate rows
+        old_state = getattr(instance, "_dashboard_old_state", None)
+        if old_state and old_state != (instance.status, instance.fy):
+            move_transaction_lines(
+                instance.transaction_id,
+                old_state[0],
+                old_state[1],
+                instance.status,
+                instance.fy,
+            )
+
+        # Mark dashboards dirty for ALL saves (create AND update); the
+        # recomputation runs in the background once per debounce window
+        mark_dashboard_dirty(smart=instance.status == "approved", normal=True)
 
         if created:
             logger.info(
-                f"New BudgetTransfer created: {instance.transaction_id} - Dashboard updated"
+                f"New BudgetTransfer created: {instance.transaction_id} - Dashboard refresh scheduled"
             )
         else:
             logger.info(
-                f"BudgetTransfer updated: {instance.transaction_id} - Dashboard updated"
+                f"BudgetTransfer updated: {instance.transaction_id} - Dashboard refresh scheduled"
             )
 
     except Exception as e:
@@ -56,10 +83,9 @@ def budget_transfer_post_delete(sender, instance, **kwargs):
     Use this for cleanup, notifications, or post-deletion processing
     """
     try:
-        dashboard_smart()
-        dashboard_normal()
+        mark_dashboard_dirty(smart=True, normal=True)
         logger.info(
-            f"Dashboard updated after deleting BudgetTransfer {instance.transaction_id}"
+            f"Dashboard refresh scheduled after deleting BudgetTransfer {instance.transaction_id}"
         )
 
     except Exception as e:
@@ -0,0 +1,133 @@
+"""
+Django signals for xx_TransactionTransfer model
+Keep the dashboard aggregate table in sync with transfer line changes
+"""
+
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from transaction.models import xx_TransactionTransfer
+from ..models import xx_BudgetTransfer
+from ..dashboard_aggregates import apply_delta, line_key
+import logging
+
+# Configure logging for transaction transfer signals
+logger = logging.getLogger("transaction_transfer_signals")
+
+
+def _transaction_status_and_fy(transaction_id):
+    if transaction_id is None:
+        return None, None
+    row = (
+        xx_BudgetTransfer.objects.filter(pk=transaction_id)
+        .values_list("status", "fy")
+        .first()
+    )
+    return row if row else (None, None)
+
+
+# ============================================================================
+# xx_TransactionTransfer Signals
+# ============================================================================
+
+
+@receiver(pre_save, sender=xx_TransactionTransfer)
+def transaction_transfer_pre_save(sender, instance, **kwargs):
+    """
+    Remember the stored line before it is overwritten so its old
+    contribution can be removed from the dashboard aggregates
+    """
+    instance._dashboard_old_line = None
+    if instance.pk is None:
+        return
+    try:
+        instance._dashboard_old_line = (
+            xx_TransactionTransfer.objects.filter(pk=instance.pk)
+            .values(
+                "cost_center_code",
+                "account_code",
+                "project_code",
+                "from_center",
+                "to_center",
+                "transaction__status",
+                "transaction__fy",
+            )
+            .first()
+        )
+    except Exception as e:
+        logger.error(f"Error in transaction_transfer_pre_save: {str(e)}")
+
+
+@receiver(post_save, sender=xx_TransactionTransfer)
+def transaction_transfer_post_save(sender, instance, created, **kwargs):
+    """
+    Apply the line change to the dashboard aggregates as a delta
+    """
+    try:
+        old = getattr(instance, "_dashboard_old_line", None)
+        if old:
+            apply_delta(
+                line_key(
+                    old["cost_center_code"],
+                    old["account_code"],
+                    old["project_code"],
+                    old["transaction__status"],
+                    old["transaction__fy"],
+                ),
+                -(old["from_center"] or 0),
+                -(old["to_center"] or 0),
+                -1,
+            )
+
+        status, fy = _transaction_status_and_fy(instance.transaction_id)
+        apply_delta(
+            line_key(
+                instance.cost_center_code,
+                instance.account_code,
+                instance.project_code,
+                status,
+                fy,
+            ),
+            instance.from_center or 0,
+            instance.to_center or 0,
+            1,
+        )
+    except Exception as e:
+        logger.error(f"Error in transaction_transfer_post_save: {str(e)}")
+
+
+@receiver(pre_delete, sender=xx_TransactionTransfer)
+def transaction_transfer_pre_delete(sender, instance, **kwargs):
+    """
+    Remember the parent's status/fy while it still exists (a cascade from
+    xx_BudgetTransfer may delete the parent row before the lines)
+    """
+    try:
+        instance._dashboard_parent_state = _transaction_status_and_fy(
+            instance.transaction_id
+        )
+    except Exception as e:
+        logger.error(f"Error in transaction_transfer_pre_delete: {str(e)}")
+
+
+@receiver(post_delete, sender=xx_TransactionTransfer)
+def transaction_transfer_post_delete(sender, instance, **kwargs):
+    """
+    Remove the deleted line's contribution from the dashboard aggregates
+    """
+    try:
+        status, fy = getattr(instance, "_dashboard_parent_state", (None, None))
+        apply_delta(
+            line_key(
+                instance.cost_center_code,
+                instance.account_code,
+                instance.project_code,
+                status,
+                fy,
+            ),
+            -(instance.from_center or 0),
+            -(instance.to_center or 0),
+            -1,
+        )
+    except Exception as e:
+        logger.error(f"Error in transaction_transfer_post_delete: {str(e)}")
@@ -0,0 +1,128 @@
+# budget_management/tasks.py
+"""
+Background dashboard recomputation
+
+Signals only mark the smart/normal dashboards dirty (a counter row in the
+database, so web processes and workers see the same marks). The first mark
+in a debounce window schedules one refresh (a Celery task when a broker is
+configured, otherwise an in-process timer thread), so a burst of saves
+costs a single recomputation.
+"""
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from budget_transfer.global_function.dashbaord import dashboard_smart, dashboard_normal
+from budget_transfer.global_function.dispatch import dispatch
+
+logger = logging.getLogger("budget_transfer_signals")
+
+DASHBOARD_REFRESH_SCHEDULED_KEY = "dashboard_refresh_scheduled"
+
+
+def _debounce_seconds():
+    return getattr(settings, "DASHBOARD_REFRESH_DEBOUNCE_SECONDS", 5)
+
+
+def _bump(dashboard, count=1):
+    from .models import xx_DashboardRefreshMark
+
+    marks = xx_DashboardRefreshMark.objects.filter(dashboard=dashboard)
+    if marks.update(marks=F("marks") + count):
+        return
+    try:
+        with transaction.atomic():
+            xx_DashboardRefreshMark.objects.create(dashboard=dashboard, marks=count)
+    except IntegrityError:
+        # Created concurrently
+        marks.update(marks=F("marks") + count)
+
+
+def _take(dashboard):
+    """Return the pending mark count of dashboard and consume exactly that many."""
+    from .models import xx_DashboardRefreshMark
+
+    marks = xx_DashboardRefreshMark.objects.filter(dashboard=dashboard)
+    count = marks.values_list("marks", flat=True).first() or 0
+    # Marks added since the read stay pending for the next run
+    if count and not marks.filter(marks__gte=count).update(marks=F("marks") - count):
+        return 0
+    return count
+
+
+def mark_dashboard_dirty(smart=False, normal=True):
+    """
+    Flag dashboards for recomputation and make sure a refresh is scheduled.
+
+    Args:
+        smart (bool): Recompute the smart (approved totals) dashboard
+        normal (bool): Recompute the normal (counts) dashboard
+    """
+    if smart:
+        _bump("smart")
+    if normal:
+        _bump("normal")
+    # Schedule after commit so the refresh sees the saved rows
+    transaction.on_commit(schedule_dashboard_refresh)
+
+
+def schedule_dashboard_refresh():
+    """
+    Schedule one refresh per debounce window; later calls in the window are no-ops.
+
+    Only the debounce lives in the cache: the refresh reads the marks from the
+    database when it runs, so marks made in the window are covered by it, and a
+    cache the worker does not share at most schedules an extra run.
+    """
+    window = _debounce_seconds()
+    if not cache.add(DASHBOARD_REFRESH_SCHEDULED_KEY, True, window):
+        return
+
+    dispatch(refresh_dirty_dashboards, countdown=window)
+
+
+@shared_task
+def refresh_dirty_dashboards():
+    """
+    Recompute the dashboards that were marked dirty since the last run.
+    """
+    failed = False
+    for name, recompute in (("smart", dashboard_smart), ("normal", dashboard_normal)):
+        marks = _take(name)
+        if not marks:
+            continue
+        try:
+            recompute()
+            logger.info(f"Dashboard {name} refreshed ({marks} marks)")
+        except Exception as e:
+            logger.error(f"Error in refresh_dirty_dashboards ({name}): {str(e)}")
+            # Give the marks back so the retry recomputes this dashboard
+            _bump(name, marks)
+            failed = True
+
+    if failed:
+        schedule_dashboard_refresh()
+
+
+@shared_task
+def sweep_blob_stores():
+    """
+    Delete stored files (attachments, invoices, uploads) that no row references anymore and
+    nobody wrote or reused within BLOB_DELETE_GRACE_SECONDS.
+
+    Returns:
+        dict: namespace -> number of files deleted
+    """
+    # Importing the modules registers their stores
+    import budget_management.attachments  # noqa: F401
+    import Invoice.files  # noqa: F401
+    import account_and_entitys.tasks  # noqa: F401
+    from budget_transfer.global_function.blob_store import sweep_blob_stores as sweep
+
+    result = sweep()
+    logger.info(f"Blob stores swept: {result}")
+    return result
@@ -11,6 +11,7 @@ from .views import (
     ListBudgetTransfer_approvels_View,
     BudgetTransferFileUploadView,
     DeleteBudgetTransferAttachmentView,
+    DownloadBudgetTransferAttachmentView,
     ListBudgetTransferAttachmentsView,
     list_budget_transfer_reject_reason,
     DashboardBudgetTransferView,
@@ -88,6 +89,11 @@ urlpatterns = [
         DeleteBudgetTransferAttachmentView.as_view(),
         name="budget-transfer-delete-attachment",
     ),
+    path(
+        "transfers/<int:transfer_id>/attachments/<int:attachment_id>/download/",
+        DownloadBudgetTransferAttachmentView.as_view(),
+        name="budget-transfer-download-attachment",
+    ),
     path(
         "transfers/list_reject/",
         list_budget_transfer_reject_reason.as_view(),
@@ -4,14 +4,12 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
 from django.utils import timezone
 from django.db.models import Q, Sum
 from django.db.models.functions import Cast, Coalesce
 from django.db.models import CharField
 from approvals.managers import ApprovalManager
 from approvals.models import ApprovalAction, ApprovalWorkflowInstance
-from test_upload_fbdi.automatic_posting import submit_automatic_posting
 from user_management.models import xx_User, xx_notification
 from .models import (
     filter_budget_transfers_all_in_entities,
@@ -19,11 +17,19 @@ from .models import (
     xx_BudgetTransferAttachment,
     xx_BudgetTransferRejectReason,
     xx_DashboardBudgetTransfer,
+    xx_DashboardTransferAggregate,
 )
 from account_and_entitys.models import XX_PivotFund, XX_Entity, XX_Account
 from transaction.models import xx_TransactionTransfer
-from .serializers import BudgetTransferSerializer
+from .serializers import BudgetTransferSerializer, BudgetTransferListSerializer
+from .attachments import (
+    ATTACHMENT_METADATA_FIELDS,
+    attachment_download_response,
+    attachment_metadata,
+    store_attachment,
+)
 from user_management.permissions import IsAdmin, CanTransferBudget
+from budget_transfer.global_function.pagination import KeysetPagination
 from budget_transfer.global_function.dashbaord import (
     get_all_dashboard_data,
     get_approval_rate_change,
@@ -31,7 +37,6 @@ from budget_transfer.global_function.dashbaord import (
     refresh_dashboard_data,
 )
 from public_funtion.update_pivot_fund import update_pivot_fund
-import base64
 from django.db.models.functions import Cast
 from django.db.models import CharField
 from collections import defaultdict
@@ -48,21 +53,33 @@ from decimal import Decimal
 import time
 from itertools import islice
 from django.db import connection
+from django.urls import reverse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q, Sum, Count, Case, When, Value, F
-from test_upload_fbdi.utility.creat_and_upload import submint_journal_and_upload
-from test_upload_fbdi.utility.submit_budget_and_upload import submit_budget_and_upload
+from transaction.tasks import (
+    followup_job_payload,
+    followup_needed,
+    start_approval_followup_job,
+)
+from django.db import transaction as db_transaction
 
 
-class TransferPagination(PageNumberPagination):
-    """Pagination class for budget transfers"""
+class TransferPagination(KeysetPagination):
+    """Pagination class for budget transfers (newest first, cursor on transaction_id)"""
 
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 100
+    ordering = ("-transaction_id",)
+
+
+class ApprovalTransferPagination(TransferPagination):
+    """Pagination class for transfers awaiting approval (latest requests first)"""
+
+    ordering = ("-request_date", "-transaction_id")
 
 
 class CreateBudgetTransferView(APIView):
@@ -273,9 +290,6 @@ class ListBudgetTransferView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Use only safe fields for ordering to avoid Oracle NCLOB issues
-        transfers = transfers.order_by("-transaction_id")
-
         # Ensure we return the workflow instance status (if any) in the `status` column.
         # If no workflow instance exists, fall back to the transfer's own status.
         # Annotate under a different name to avoid conflict with the model's `status` field
@@ -283,77 +297,57 @@ class ListBudgetTransferView(APIView):
             workflow_status=Coalesce(F("workflow_instance__status"), F("status"))
         )
 
-        # Convert to list to avoid lazy evaluation issues with Oracle
         # Exclude TextField columns that become NCLOB in Oracle
-        transfer_list = list(
-            transfers.values(
-                "transaction_id",
-                "transaction_date",
-                "amount",
-                "workflow_status",
-                "requested_by",
-                "user_id",
-                "request_date",
-                "code",
-                "gl_posting_status",
-                "approvel_1",
-                "approvel_2",
-                "approvel_3",
-                "approvel_4",
-                "approvel_1_date",
-                "approvel_2_date",
-                "approvel_3_date",
-                "approvel_4_date",
-                "status_level",
-                "attachment",
-                "fy",
-                "group_id",
-                "interface_id",
-                "reject_group_id",
-                "reject_interface_id",
-                "approve_group_id",
-                "approve_interface_id",
-                "report",
-                "type",
-                "notes",
-            )
+        transfers = transfers.values(
+            "transaction_id",
+            "transaction_date",
+            "amount",
+            "workflow_status",
+            "requested_by",
+            "user_id",
+            "request_date",
+            "code",
+            "gl_posting_status",
+            "approvel_1",
+            "approvel_2",
+            "approvel_3",
+            "approvel_4",
+            "approvel_1_date",
+            "approvel_2_date",
+            "approvel_3_date",
+            "approvel_4_date",
+            "status_level",
+            "attachment",
+            "fy",
+            "group_id",
+            "interface_id",
+            "reject_group_id",
+            "reject_interface_id",
+            "approve_group_id",
+            "approve_interface_id",
+            "report",
+            "type",
+            "notes",
         )
 
-        # Convert DB rows to a list and then map `workflow_status` -> `status`
-        transfer_list = list(transfer_list)
-        for row in transfer_list:
+        # Only the requested page is read (LIMIT/OFFSET, or keyset with ?cursor=),
+        # ordered by transaction_id, a safe field for Oracle
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(transfers, request, view=self)
+
+        # Map `workflow_status` -> `status`
+        for row in page:
             # Prefer the workflow_status annotation, fall back to existing status if present
             row["status"] = row.pop("workflow_status", row.get("status"))
 
-        # Manual pagination to avoid Oracle issues
-        page = int(request.GET.get("page", 1))
-        page_size = int(request.GET.get("page_size", 10))
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-
-        paginated_data = transfer_list[start_idx:end_idx]
-
-        return Response(
-            {
-                "results": paginated_data,
-                "count": len(transfer_list),
-                "next": (
-                    f"?page={page + 1}&page_size={page_size}"
-                    if end_idx < len(transfer_list)
-                    else None
-                ),
-                "previous": (
-                    f"?page={page - 1}&page_size={page_size}" if page > 1 else None
-                ),
-            }
-        )
+        return paginator.get_paginated_response(page)
 
 
 class ListBudgetTransfer_approvels_View(APIView):
     """List budget transfers with pagination"""
 
     permission_classes = [IsAuthenticated]
-    pagination_class = TransferPagination
+    pagination_class = ApprovalTransferPagination
 
     def get(self, request):
         code = request.query_params.get("code", None)
@@ -381,12 +375,16 @@ class ListBudgetTransfer_approvels_View(APIView):
         if code:
             transfers = transfers.filter(code__icontains=code)
 
-        transfers = transfers.order_by("-request_date")
+        # Counted before the page is marked as seen
+        unread_count = ApprovalManager.get_user_inbox_unread_count(
+            request.user, transfers
+        )
 
-        # Paginate results
+        # Paginate in the database, loading only the listed columns
+        transfers = transfers.only(*BudgetTransferListSerializer.Meta.fields)
         paginator = self.pagination_class()
         page = paginator.paginate_queryset(transfers, request, view=self)
-        serializer = BudgetTransferSerializer(page, many=True)
+        serializer = BudgetTransferListSerializer(page, many=True)
 
         # Create a list of dictionaries with just the fields we want
         filtered_data = []
@@ -403,7 +401,12 @@ class ListBudgetTransfer_approvels_View(APIView):
             }
             filtered_data.append(filtered_item)
 
-        return paginator.get_paginated_response(filtered_data)
+        ApprovalManager.mark_inbox_read(
+            request.user, [item["transaction_id"] for item in filtered_data]
+        )
+        response = paginator.get_paginated_response(filtered_data)
+        response.data["unread_count"] = unread_count
+        return response
 
 
 class ApproveBudgetTransferView(APIView):
@@ -651,13 +654,14 @@ class transcationtransferapprovel_reject(APIView):
         else:
             # Handle single transaction case
             items_to_process = [request.data]
-        results = []
+        decisions = []
         OtherUser = None
         reson = None
-        # Process each transaction
+        # Validate every item before acting on any of them
         for item in items_to_process:
             transaction_id = item.get("transaction_id")[0]
             decide = item.get("decide")[0]
+            OtherUserId = None
             if item.get("reason") is not None and len(item.get("reason")) > 0:
                 reson = item.get("reason")[0]
             if (
@@ -675,6 +679,16 @@ class transcationtransferapprovel_reject(APIView):
                     },
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            try:
+                transaction_id = int(transaction_id)
+            except (TypeError, ValueError):
+                return Response(
+                    {
+                        "error": "Invalid transaction id",
+                        "message": f"Transaction id must be a number, got {transaction_id}",
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
             if decide not in dict(ApprovalAction.ACTION_CHOICES):
                 return Response(
                     {
@@ -701,7 +715,8 @@ class transcationtransferapprovel_reject(APIView):
                         },
                         status=status.HTTP_400_BAD_REQUEST,
                     )
-                elif not xx_User.objects.filter(id=OtherUserId).exists():
+                OtherUser = xx_User.objects.filter(id=OtherUserId).first()
+                if OtherUser is None:
                     return Response(
                         {
                             "error": "Selected user does not exist",
@@ -709,155 +724,104 @@ class transcationtransferapprovel_reject(APIView):
                         },
                         status=status.HTTP_400_BAD_REQUEST,
                     )
-                else:
-                    OtherUser = xx_User.objects.get(id=OtherUserId)
-                    if not OtherUser.is_active:
-                        return Response(
-                            {
-                                "error": "Selected user is inactive",
-                                "message": "Please select an active user for delegation",
-                            },
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-            try:
-                # Get the transfer record - use get() for single record
-                trasncation = xx_BudgetTransfer.objects.get(
-                    transaction_id=transaction_id
-                )
-                ApprovalManager.process_action(
-                    trasncation,
-                    request.user,
-                    decide,
-                    comment=reson,
-                    target_user=OtherUser,
-                )
-                # Update pivot fund if final approval or rejection
-                pivot_updates = []
-                trasncation = xx_BudgetTransfer.objects.get(
-                    transaction_id=transaction_id
-                )
-                isFinal, Status = ApprovalManager.is_workflow_finished(trasncation)
-                if isFinal:
-                    trasfers = xx_TransactionTransfer.objects.filter(
-                        transaction_id=transaction_id
+                if not OtherUser.is_active:
+                    return Response(
+                        {
+                            "error": "Selected user is inactive",
+                            "message": "Please select an active user for delegation",
+                        },
+                        status=status.HTTP_400_BAD_REQUEST,
                     )
-                    # for transfer in trasfers:
-                    try:
-                        # Update the pivot fund
-
-                        if Status == "approved":
-                            if trasncation.code[0:3] != "AFR":
-                                csv_upload_result, result = submint_journal_and_upload(
-                                    transfers=trasfers,
-                                    transaction_id=transaction_id,
-                                    type="reject",
-                                )
-                                response_data = {
-                                    "message": "Transfers submitted for approval successfully",
-                                    "transaction_id": transaction_id,
-                                    "pivot_updates": pivot_updates,
-                                    "journal_file": result if result else None,
-                                }
-                                if csv_upload_result:
-                                    response_data["fbdi_upload_journal"] = (
-                                        csv_upload_result
-                                    )
-
-                                results.append(response_data)
-                                print("start for 90 seconds")
-                                time.sleep(
-                                    90
-                                )  # wait for 90 seconds before submitting budget
-                                print("wait for 90 seconds")
-                            submit_automatic_posting("300000312635883")
-                            time.sleep(
-                                10
-                            )  # wait for 10 seconds before submitting budget
-                            csv_upload_result, result = submit_budget_and_upload(
-                                transfers=trasfers,
-                                transaction_id=transaction_id,
-                            )
-                            if csv_upload_result:
-                                response_data["fbdi_upload_budget"] = csv_upload_result
-                        #   continue
-                        if Status == "rejected":
-                            if trasncation.code[0:3] != "AFR":
-                                csv_upload_result, result = submint_journal_and_upload(
-                                    transfers=trasfers,
-                                    transaction_id=transaction_id,
-                                    type="reject",
-                                )
-                                time.sleep(90)
-                                submit_automatic_posting("300000312635883")
-                                response_data = {
-                                    "message": "Transfers submitted for approval successfully",
-                                    "transaction_id": transaction_id,
-                                    "pivot_updates": pivot_updates,
-                                    "journal_file": result if result else None,
-                                }
-                                if csv_upload_result:
-                                    response_data["fbdi_upload"] = csv_upload_result
-
-                                results.append(response_data)
-
-                        # update_result = update_pivot_fund(
-                        #     transfer.cost_center_code,
-                        #     transfer.account_code,
-                        #     transfer.project_code,
-                        #     transfer.from_center or 0,
-                        #     transfer.to_center or 0,
-                        #     Status,
-                        # )
-                        # if update_result:
-                        #     pivot_updates.append(update_result)
-                    except Exception as e:
-                        pivot_updates.append(
-                            {
-                                "status": "error",
-                                "message": str(e),
-                            }
-                        )
-                        continue
+            decisions.append((transaction_id, decide, reson, OtherUser))
 
-                        # Add the result for this transaction
+        trasncations = xx_BudgetTransfer.objects.in_bulk(
+            [transaction_id for transaction_id, _, _, _ in decisions]
+        )
+        results = []
+        finalized = []
+        followup_job = None
+        # All decisions are applied in one short transaction; each item runs in
+        # its own savepoint so a failing item does not undo the others. Oracle
+        # work (journal, posting, budget import) is queued as one job for all
+        # finalized transfers once the transaction commits.
+        with db_transaction.atomic():
+            for transaction_id, decide, reson, OtherUser in decisions:
+                trasncation = trasncations.get(transaction_id)
+                if trasncation is None:
                     results.append(
                         {
                             "transaction_id": transaction_id,
-                            "status": Status,
-                            "status_level": trasncation.status_level,
-                            "pivot_updates": pivot_updates,
+                            "status": "error",
+                            "message": f"Budget transfer not found",
                         }
                     )
-                    trasncation.status = (
-                        "rejected" if Status == "rejected" else "approved"
+                    continue
+                try:
+                    with db_transaction.atomic():
+                        ApprovalManager.process_action(
+                            trasncation,
+                            request.user,
+                            decide,
+                            comment=reson,
+                            target_user=OtherUser,
+                        )
+                        trasncation = xx_BudgetTransfer.objects.select_related(
+                            "workflow_instance"
+                        ).get(transaction_id=transaction_id)
+                        isFinal, Status = ApprovalManager.is_workflow_finished(
+                            trasncation
+                        )
+                        if isFinal:
+                            trasncation.status = (
+                                "rejected" if Status == "rejected" else "approved"
+                            )
+                            trasncation.save()
+                except Exception as e:
+                    results.append(
+                        {
+                            "transaction_id": transaction_id,
+                            "status": "error",
+                            "message": str(e),
+                        }
+                    )
+                    continue
+
+                if isFinal and Status in ("approved", "rejected"):
+                    finalized.append(
+                        {
+                            "transaction_id": transaction_id,
+                            "code": trasncation.code,
+                            "status": Status,
+                        }
                     )
-                    trasncation.save()
-            except xx_BudgetTransfer.DoesNotExist:
                 results.append(
                     {
                         "transaction_id": transaction_id,
-                        "status": "error",
-                        "message": f"Budget transfer not found",
+                        "status": Status,
+                        "status_level": trasncation.status_level,
                     }
                 )
-            except Exception as e:
-                results.append(
-                    {
-                        "transaction_id": transaction_id,
-                        "status": "error",
-                        "message": str(e),
-                    }
+
+            if followup_needed(finalized):
+                followup_job = start_approval_followup_job(
+                    finalized, user=request.user
                 )
 
         # Return all results
         return Response(
-            {"message": "Transfers processed", "results": results},
+            {
+                "message": "Transfers processed",
+                "results": results,
+                "oracle_job": (
+                    followup_job_payload(followup_job) if followup_job else None
+                ),
+            },
             status=status.HTTP_200_OK,
         )
 
 
 class BudgetTransferFileUploadView(APIView):
-    """Upload files for a budget transfer and store as BLOBs"""
+    """Upload files for a budget transfer into the attachment blob store"""
 
     permission_classes = [IsAuthenticated]
 
@@ -884,30 +848,11 @@ class BudgetTransferFileUploadView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            # Process each uploaded file
+            # Process each uploaded file, streaming it to the blob store in chunks
             uploaded_files = []
             for file_key, uploaded_file in request.FILES.items():
-                # Read the file data
-                file_data = uploaded_file.read()
-
-                # Create the attachment record
-                attachment = xx_BudgetTransferAttachment.objects.create(
-                    budget_transfer=transfer,
-                    file_name=uploaded_file.name,
-                    file_type=uploaded_file.content_type,
-                    file_size=len(file_data),
-                    file_data=file_data,
-                )
-
-                uploaded_files.append(
-                    {
-                        "attachment_id": attachment.attachment_id,
-                        "file_name": attachment.file_name,
-                        "file_type": attachment.file_type,
-                        "file_size": attachment.file_size,
-                        "upload_date": attachment.upload_date,
-                    }
-                )
+                attachment = store_attachment(transfer, uploaded_file)
+                uploaded_files.append(attachment_metadata(attachment))
 
             # Update the attachment flag on the budget transfer
             transfer.attachment = "Yes"
@@ -968,9 +913,9 @@ class DeleteBudgetTransferAttachmentView(APIView):
 
             # Find the specific attachment
             try:
-                attachment = xx_BudgetTransferAttachment.objects.get(
-                    attachment_id=attachment_id, budget_transfer=transfer
-                )
+                attachment = xx_BudgetTransferAttachment.objects.only(
+                    *ATTACHMENT_METADATA_FIELDS
+                ).get(attachment_id=attachment_id, budget_transfer=transfer)
 
                 # Keep attachment details for response
                 attachment_details = {
@@ -1026,25 +971,20 @@ class ListBudgetTransferAttachmentsView(APIView):
             # Retrieve the main budget transfer record
             transfer = xx_BudgetTransfer.objects.get(transaction_id=transfer_id)
 
-            # Fetch related attachments
+            # Fetch related attachments, without their content
             attachments = xx_BudgetTransferAttachment.objects.filter(
                 budget_transfer=transfer
-            )
+            ).only(*ATTACHMENT_METADATA_FIELDS)
 
-            # Build a simplified response
+            # Metadata only; the content is fetched from the download endpoint
             data = []
             for attach in attachments:
-                encoded_data = base64.b64encode(attach.file_data).decode("utf-8")
-                data.append(
-                    {
-                        "attachment_id": attach.attachment_id,
-                        "file_name": attach.file_name,
-                        "file_type": attach.file_type,
-                        "file_size": attach.file_size,
-                        "file_data": encoded_data,  # base64-encoded
-                        "upload_date": attach.upload_date,
-                    }
+                item = attachment_metadata(attach)
+                item["download_url"] = reverse(
+                    "budget_management:budget-transfer-download-attachment",
+                    args=[transfer.transaction_id, attach.attachment_id],
                 )
+                data.append(item)
 
             return Response(
                 {"transaction_id": transfer_id, "attachments": data},
@@ -1056,6 +996,37 @@ class ListBudgetTransferAttachmentsView(APIView):
             )
 
 
+class DownloadBudgetTransferAttachmentView(APIView):
+    """Stream a budget transfer attachment (supports HTTP Range requests)"""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, transfer_id, attachment_id):
+        try:
+            attachment = xx_BudgetTransferAttachment.objects.only(
+                *ATTACHMENT_METADATA_FIELDS
+            ).get(attachment_id=attachment_id, budget_transfer_id=transfer_id)
+        except xx_BudgetTransferAttachment.DoesNotExist:
+            return Response(
+                {
+                    "error": "Attachment not found",
+                    "message": f"No attachment found with ID {attachment_id} for this transfer",
+                },
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        try:
+            return attachment_download_response(request, attachment)
+        except FileNotFoundError:
+            return Response(
+                {
+                    "error": "Attachment file missing",
+                    "message": f"The stored file for attachment {attachment_id} could not be found",
+                },
+                status=status.HTTP_410_GONE,
+            )
+
+
 class list_budget_transfer_reject_reason(APIView):
     """List all budget transfer reject reasons"""
 
@@ -1290,49 +1261,53 @@ class DashboardBudgetTransferView(APIView):
                     # PHASE 1: Database-level aggregations for approved transfers
                     aggregation_start = time.time()
 
-                    # Build base queryset with optimized filtering
-                    base_queryset = xx_TransactionTransfer.objects.select_related(
-                        "transaction"
-                    ).filter(transaction__status="approved")
+                    # Totals come from the delta-maintained aggregate table
+                    aggregate_queryset = xx_DashboardTransferAggregate.objects.filter(
+                        status="approved"
+                    )
 
                     # Apply additional filters if provided
                     if DashBoard_filler_per_Project:
-                        base_queryset = base_queryset.filter(
+                        aggregate_queryset = aggregate_queryset.filter(
                             cost_center_code=DashBoard_filler_per_Project
                         )
 
                     # Aggregate by cost center code (single database query)
                     cost_center_totals = list(
-                        base_queryset.values("cost_center_code")
+                        aggregate_queryset.values("cost_center_code")
                         .annotate(
-                            total_from_center=Sum("from_center"),
-                            total_to_center=Sum("to_center"),
+                            total_from_center=Sum("total_from"),
+                            total_to_center=Sum("total_to"),
                         )
                         .order_by("cost_center_code")
                     )
 
                     # Aggregate by account code (single database query)
                     account_code_totals = list(
-                        base_queryset.values("account_code")
+                        aggregate_queryset.values("account_code")
                         .annotate(
-                            total_from_center=Sum("from_center"),
-                            total_to_center=Sum("to_center"),
+                            total_from_center=Sum("total_from"),
+                            total_to_center=Sum("total_to"),
                         )
                         .order_by("account_code")
                     )
 
                     # Aggregate by combination of cost center and account code (single database query)
                     all_combinations = list(
-                        base_queryset.values("cost_center_code", "account_code")
+                        aggregate_queryset.values("cost_center_code", "account_code")
                         .annotate(
-                            total_from_center=Sum("from_center"),
-                            total_to_center=Sum("to_center"),
+                            total_from_center=Sum("total_from"),
+                            total_to_center=Sum("total_to"),
                         )
                         .order_by("cost_center_code", "account_code")
                     )
 
                     # Get filtered individual records if filters are applied
                     if DashBoard_filler_per_Project:
+                        base_queryset = xx_TransactionTransfer.objects.filter(
+                            transaction__status="approved",
+                            cost_center_code=DashBoard_filler_per_Project,
+                        )
                         filtered_combinations = list(
                             base_queryset.values(
                                 "cost_center_code",
@@ -1453,7 +1428,7 @@ class ListBudgetTransfer_approvels_MobileView(APIView):
     """List budget transfers with pagination"""
 
     permission_classes = [IsAuthenticated]
-    pagination_class = TransferPagination
+    pagination_class = ApprovalTransferPagination
 
     def get(self, request):
         code = request.query_params.get("code", None)
@@ -1478,9 +1453,23 @@ class ListBudgetTransfer_approvels_MobileView(APIView):
         if code:
             transfers = transfers.filter(code__icontains=code)
 
-        transfers = transfers.order_by("-request_date")
-        # Return all results without pagination
-        serializer = BudgetTransferSerializer(transfers, many=True)
+        # Counted before the listed items are marked as seen
+        unread_count = ApprovalManager.get_user_inbox_unread_count(
+            request.user, transfers
+        )
+        transfers = transfers.only(*BudgetTransferListSerializer.Meta.fields)
+
+        # Paginated when the app asks for it, otherwise the whole list as before
+        paginator = None
+        if any(
+            param in request.query_params
+            for param in ("page", "page_size", "cursor")
+        ):
+            paginator = self.pagination_class()
+            transfers = paginator.paginate_queryset(transfers, request, view=self)
+        else:
+            transfers = transfers.order_by(*self.pagination_class.ordering)
+        serializer = BudgetTransferListSerializer(transfers, many=True)
 
         # Create a list of dictionaries with just the fields we want
         filtered_data = []
@@ -1497,6 +1486,13 @@ class ListBudgetTransfer_approvels_MobileView(APIView):
             }
             filtered_data.append(filtered_item)
 
+        ApprovalManager.mark_inbox_read(
+            request.user, [item["transaction_id"] for item in filtered_data]
+        )
+        if paginator is not None:
+            response = paginator.get_paginated_response(filtered_data)
+            response.data["unread_count"] = unread_count
+            return response
         return Response(filtered_data, status=status.HTTP_200_OK)
 
 
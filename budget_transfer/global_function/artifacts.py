@@ -0,0 +1,113 @@
+"""
+Per-job working directories for generated and downloaded files.
+
+FBDI CSV/zip files and Oracle report downloads used to be written to fixed
+paths (test_upload_fbdi/, the CWD), so concurrent submits overwrote each other.
+Every job now gets its own directory under ARTIFACT_ROOT, which is removed when
+the job is done, or kept for ARTIFACT_RETENTION_SECONDS and purged later.
+"""
+import re
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def artifact_root():
+    """Base directory of all job workspaces (created on first use)."""
+    root = getattr(settings, "ARTIFACT_ROOT", None)
+    root = Path(root) if root else Path(tempfile.gettempdir()) / "tanfeez_artifacts"
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def _retention_seconds():
+    return getattr(settings, "ARTIFACT_RETENTION_SECONDS", 0)
+
+
+def open_workspace(name=None, prefix="job"):
+    """
+    Create a working directory for one job.
+
+    Args:
+        name (str): Stable directory name, for jobs that resume across stages;
+            an existing directory with that name is reused
+        prefix (str): Prefix of a new unique directory when name is not given
+
+    Returns:
+        Path: The workspace directory
+    """
+    purge_expired_workspaces()
+    root = artifact_root()
+    if name:
+        path = root / _SAFE_NAME.sub("_", str(name))
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+    return Path(tempfile.mkdtemp(prefix=f"{_SAFE_NAME.sub('_', prefix)}_", dir=root))
+
+
+def release_workspace(path, keep=None):
+    """
+    Remove a workspace once its job is finished.
+
+    Args:
+        path: Workspace directory (or a file inside it)
+        keep (bool): Keep the files; defaults to keeping them when a retention
+            period is configured, in which case purge_expired_workspaces()
+            removes them later
+    """
+    if not path:
+        return
+    if keep is None:
+        keep = _retention_seconds() > 0
+    if keep:
+        return
+
+    path = Path(path)
+    root = artifact_root().resolve()
+    # Accept a file inside the workspace, never delete anything outside the root
+    while path.resolve().parent != root:
+        if path.resolve() == root or path.parent == path:
+            return
+        path = path.parent
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@contextmanager
+def scoped_workspace(prefix="job", keep=None):
+    """Workspace that lives for the duration of a with block."""
+    path = open_workspace(prefix=prefix)
+    try:
+        yield path
+    finally:
+        release_workspace(path, keep=keep)
+
+
+def purge_expired_workspaces(max_age=None):
+    """
+    Delete workspaces older than max_age seconds (defaults to the retention period).
+
+    Returns:
+        int: Number of directories removed
+    """
+    if max_age is None:
+        max_age = _retention_seconds()
+    if not max_age:
+        return 0
+
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in artifact_root().iterdir():
+        try:
+            if path.is_dir() and path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        except FileNotFoundError:
+            # Removed concurrently by another worker
+            continue
+    return removed
@@ -0,0 +1,292 @@
+"""
+Content-addressed file store on local disk.
+
+Files are written in chunks while their SHA-256 is computed and stored once per
+namespace under <BLOB_STORAGE_ROOT>/<namespace>/<aa>/<bb>/<sha256>, so the same
+file uploaded twice takes the space of one. Database rows keep only the hash.
+ranged_file_response() streams a stored file back, honouring HTTP Range.
+
+Writers and the garbage collection of unreferenced files coordinate through
+the file's mtime: a write, or a deduplicated hit on an existing file, touches
+it, and release() only deletes files nobody wrote or reused within
+BLOB_DELETE_GRACE_SECONDS. A writer whose row is not committed yet therefore
+never loses its file; files released too early are retried after the grace
+period, and sweep() collects whatever is left (e.g. across a restart).
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+from .oracle_limits import ORACLE_IN_BATCH_SIZE
+
+CHUNK_SIZE = 64 * 1024
+
+logger = logging.getLogger("budget_transfer_signals")
+
+_STORES = {}  # namespace -> BlobStore with a references callable
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _grace_seconds():
+    return getattr(settings, "BLOB_DELETE_GRACE_SECONDS", 3600)
+
+
+def blob_storage_root():
+    root = getattr(settings, "BLOB_STORAGE_ROOT", None)
+    return Path(root) if root else Path(settings.BASE_DIR) / "storage" / "blobs"
+
+
+class BlobStore:
+    """Files of one kind (attachments, invoices, ...) keyed by their SHA-256"""
+
+    def __init__(self, namespace, references=None):
+        """
+        Args:
+            namespace (str): Directory of this kind of file
+            references (callable): list of sha256 -> set of the ones rows still
+                use; required by release() and sweep()
+        """
+        self.namespace = namespace
+        self.references = references
+        if references is not None:
+            _STORES[namespace] = self
+
+    @property
+    def root(self):
+        return blob_storage_root() / self.namespace
+
+    def path(self, sha256):
+        if not _SHA256.match(sha256 or ""):
+            raise ValueError(f"Invalid blob key: {sha256!r}")
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def exists(self, sha256):
+        return self.path(sha256).exists()
+
+    def save_chunks(self, chunks):
+        """
+        Store a file given as an iterable of byte chunks.
+
+        Returns:
+            (sha256, size)
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(prefix=".upload_", dir=self.root)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    tmp.write(chunk)
+
+            sha256 = digest.hexdigest()
+            target = self.path(sha256)
+            try:
+                # Same content already stored: touch it so release() keeps it
+                # until the caller's row is committed
+                os.utime(target)
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, target)
+            return sha256, size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def save_upload(self, uploaded_file):
+        """Store a Django UploadedFile without reading it into memory."""
+        return self.save_chunks(uploaded_file.chunks(CHUNK_SIZE))
+
+    def save_bytes(self, data):
+        return self.save_chunks(
+            data[start:start + CHUNK_SIZE] for start in range(0, len(data), CHUNK_SIZE)
+        )
+
+    def open(self, sha256):
+        return open(self.path(sha256), "rb")
+
+    def size(self, sha256):
+        return self.path(sha256).stat().st_size
+
+    def delete(self, sha256):
+        """Remove a stored file unconditionally (see release() for shared files)."""
+        try:
+            self.path(sha256).unlink()
+        except FileNotFoundError:
+            pass
+
+    def release(self, sha256, retry=True):
+        """
+        Delete a stored file once no row references it.
+
+        The file is first renamed out of the way, so a writer deduplicating
+        against it from then on stores a fresh copy; it is only deleted when
+        its mtime shows no write or reuse within the grace period, otherwise it
+        is put back and released again after the grace period.
+
+        Returns:
+            bool: True if the file was deleted
+        """
+        if not sha256 or sha256 in self.references([sha256]):
+            return False
+        path = self.path(sha256)
+        tombstone = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.release")
+        try:
+            os.rename(path, tombstone)
+        except FileNotFoundError:
+            return False
+
+        if time.time() - tombstone.stat().st_mtime >= _grace_seconds():
+            tombstone.unlink()
+            return True
+
+        # Written or reused recently: its row may not be committed yet
+        os.replace(tombstone, path)
+        if retry:
+            timer = threading.Timer(_grace_seconds() + 1, self._release_later, args=[sha256])
+            timer.daemon = True
+            timer.start()
+        return False
+
+    def _release_later(self, sha256):
+        try:
+            self.release(sha256, retry=False)
+        except Exception as e:
+            logger.error(f"Deferred release of {self.namespace} blob {sha256} failed: {e}")
+        finally:
+            close_old_connections()
+
+    def sweep(self):
+        """
+        Delete every stored file older than the grace period that no row references.
+
+        Returns:
+            int: Number of files deleted
+        """
+        if not self.root.exists():
+            return 0
+        cutoff = time.time() - _grace_seconds()
+        candidates = [
+            path.name
+            for path in self.root.glob("??/??/*")
+            if _SHA256.match(path.name) and path.stat().st_mtime < cutoff
+        ]
+        deleted = 0
+        for start in range(0, len(candidates), ORACLE_IN_BATCH_SIZE):
+            batch = candidates[start:start + ORACLE_IN_BATCH_SIZE]
+            referenced = self.references(batch)
+            for sha256 in batch:
+                if sha256 not in referenced and self.release(sha256, retry=False):
+                    deleted += 1
+        return deleted
+
+
+def sweep_blob_stores():
+    """
+    Sweep every store created with a references callable.
+
+    Returns:
+        dict: namespace -> number of files deleted
+    """
+    return {namespace: store.sweep() for namespace, store in _STORES.items()}
+
+
+def _parse_range(header, size):
+    """
+    Parse a single-range Range header.
+
+    Returns:
+        (start, end) inclusive, None when the header is absent or not a single
+        byte range, or False when the range cannot be satisfied
+    """
+    match = _RANGE.match((header or "").strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def _iter_range(fileobj, start, length):
+    try:
+        fileobj.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fileobj.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def ranged_file_response(request, fileobj, size, file_name, content_type=None, etag=None, as_attachment=True):
+    """
+    Stream fileobj as a download, with 206 Partial Content for a Range request.
+
+    Args:
+        request: Incoming request (its Range header is honoured)
+        fileobj: Binary file object positioned anywhere; closed by the response
+        size (int): Size of the file in bytes
+        file_name (str): Name offered to the client
+        content_type (str): MIME type, guessed from file_name when empty
+        etag (str): Strong validator, e.g. the content hash
+    """
+    byte_range = _parse_range(request.headers.get("Range"), size)
+
+    if byte_range is False:
+        fileobj.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+    elif byte_range is None:
+        response = FileResponse(
+            fileobj,
+            as_attachment=as_attachment,
+            filename=file_name,
+            content_type=content_type or None,
+        )
+        response["Content-Length"] = str(size)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _iter_range(fileobj, start, length),
+            status=206,
+            content_type=content_type or "application/octet-stream",
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(length)
+        response["Content-Disposition"] = content_disposition_header(as_attachment, file_name)
+
+    response["Accept-Ranges"] = "bytes"
+    if etag:
+        response["ETag"] = f'"{etag}"'
+    return response
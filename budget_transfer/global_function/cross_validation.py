@@ -0,0 +1,358 @@
+"""
+Local evaluation of the Oracle GL cross-validation rules (CVR).
+
+A rule applies to a segment combination that satisfies its condition filter
+and rejects the combination unless it also satisfies its validation filter.
+Rules are read from the exported rule sheet (CROSS_VALIDATION_RULES_FILE,
+parsed by cross_validation_functions) and compiled once per file content:
+
+- every distinct "equals to" / "between" operand becomes an interval of one
+  segment; equal values go to a dict and ranges to a list sorted by lower
+  bound, so the intervals a value falls in are found without scanning rules;
+  "not equals to" / "not between" reuse the same interval, negated;
+- filters are kept in disjunctive normal form (AND binds tighter than OR);
+- rules whose condition is a plain OR of positive clauses are indexed by the
+  intervals of that condition, so a combination only evaluates the rules its
+  segment values can trigger.
+
+Segment values are compared as strings, like Oracle's character value sets.
+Rules that use a segment the combination does not carry are left to Oracle.
+The From/To dates of a rule are checked on every call, so a cached rule set
+starts and stops enforcing rules as their dates come and go.
+"""
+import bisect
+import datetime
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger("transaction_transfer_signals")
+
+_CACHE_LOCK = threading.Lock()
+_RULE_SETS = {}  # sha256 of the rule file -> CrossValidationRuleSet
+_FILE_HASHES = {}  # (path, mtime, size) -> sha256
+
+
+def _segment_value(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def _parse_date(value):
+    if value in (None, ""):
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(str(value).strip()[:10])
+    except ValueError:
+        return None
+
+
+class _SegmentIndex:
+    """Intervals of one segment: exact values in a dict, ranges sorted by lower bound"""
+
+    def __init__(self):
+        self.equals = {}  # value -> [interval id]
+        self.ranges = []  # (low, high, interval id)
+        self._lows = []
+
+    def add(self, low, high, interval_id):
+        if low == high:
+            self.equals.setdefault(low, []).append(interval_id)
+        else:
+            self.ranges.append((low, high, interval_id))
+
+    def freeze(self):
+        self.ranges.sort()
+        self._lows = [low for low, _, _ in self.ranges]
+
+    def matches(self, value, matched):
+        matched.update(self.equals.get(value, ()))
+        # Only ranges starting at or below the value can hold it
+        for position in range(bisect.bisect_right(self._lows, value)):
+            low, high, interval_id = self.ranges[position]
+            if value <= high:
+                matched.add(interval_id)
+
+
+class _Filter:
+    """
+    OR of AND groups of (interval id, negated). Groups made of one positive
+    term are folded into a set, so the common "X equals a OR X equals b ..."
+    filter is a single set intersection.
+    """
+
+    __slots__ = ("any_of", "groups", "empty")
+
+    def __init__(self, groups):
+        self.empty = not groups
+        self.any_of = frozenset(
+            group[0][0] for group in groups if len(group) == 1 and not group[0][1]
+        )
+        self.groups = [group for group in groups if len(group) > 1 or group[0][1]]
+
+    def holds(self, matched):
+        # An empty filter holds for every combination
+        if self.empty or not self.any_of.isdisjoint(matched):
+            return True
+        return any(
+            all((interval_id in matched) != negated for interval_id, negated in group)
+            for group in self.groups
+        )
+
+
+class CrossValidationRule:
+    """One compiled rule: rejects combinations matching condition but not validation"""
+
+    __slots__ = (
+        "name", "message", "condition", "validation", "segments", "from_date", "to_date"
+    )
+
+    def __init__(
+        self, name, message, condition, validation, segments, from_date=None, to_date=None
+    ):
+        self.name = name
+        self.message = message
+        self.condition = _Filter(condition)
+        self.validation = _Filter(validation)
+        self.segments = segments
+        self.from_date = from_date
+        self.to_date = to_date
+
+    def effective_on(self, day):
+        return not (
+            (self.from_date and self.from_date > day) or (self.to_date and self.to_date < day)
+        )
+
+    def rejects(self, matched):
+        return self.condition.holds(matched) and not self.validation.holds(matched)
+
+
+class CrossValidationRuleSet:
+    """
+    Compiled rules of one rule file.
+
+    Usage:
+        rule_set = CrossValidationRuleSet.from_records(read_excel_to_dicts(path))
+        rule_set.check({"micHqGlLegalEntity": "10001", "micHqGlNaturalAccount": "4100009"})
+    """
+
+    def __init__(self):
+        self.rules = []
+        self.segments = {}  # segment -> _SegmentIndex
+        self._intervals = {}  # (segment, low, high) -> interval id
+        self._rules_by_interval = {}  # interval id -> [rule position]
+        self._unindexed_rules = []  # rule positions evaluated for every combination
+
+    def _interval(self, segment, low, high):
+        key = (segment, low, high)
+        interval_id = self._intervals.get(key)
+        if interval_id is None:
+            interval_id = len(self._intervals)
+            self._intervals[key] = interval_id
+            self.segments.setdefault(segment, _SegmentIndex()).add(low, high, interval_id)
+        return interval_id
+
+    def _compile_filter(self, clauses, segments):
+        """Parsed clauses -> OR of AND groups of (interval id, negated)"""
+        groups = []
+        for clause in clauses:
+            op = clause["op"]
+            value = clause["value"]
+            if op in ("between", "not_between"):
+                if not isinstance(value, tuple):
+                    raise ValueError(f"Invalid range '{value}'")
+                low, high = (_segment_value(part) for part in value)
+            else:
+                low = high = _segment_value(value)
+            if low is None or high is None:
+                raise ValueError(f"Missing value for {clause['field']}")
+
+            term = (self._interval(clause["field"], low, high), op.startswith("not_"))
+            segments.add(clause["field"])
+            if clause.get("join") == "and" and groups:
+                groups[-1].append(term)
+            else:
+                groups.append([term])
+        return groups
+
+    def add_rule(
+        self, name, message, condition_clauses, validation_clauses, from_date=None, to_date=None
+    ):
+        segments = set()
+        condition = self._compile_filter(condition_clauses, segments)
+        validation = self._compile_filter(validation_clauses, segments)
+        position = len(self.rules)
+        self.rules.append(
+            CrossValidationRule(
+                name, message, condition, validation, frozenset(segments), from_date, to_date
+            )
+        )
+
+        if condition and all(len(group) == 1 and not group[0][1] for group in condition):
+            for group in condition:
+                self._rules_by_interval.setdefault(group[0][0], []).append(position)
+        else:
+            self._unindexed_rules.append(position)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Compile the rows of an exported rule sheet. Disabled rules are skipped;
+        the From/To dates are kept on the rules and checked by check().
+        """
+        from cross_validation_functions import _parse_rule_clauses
+
+        rule_set = cls()
+        for record in records:
+            if str(record.get("Enabled") or "true").strip().lower() not in ("true", "y", "yes", "1"):
+                continue
+            from_date = _parse_date(record.get("From Date"))
+            to_date = _parse_date(record.get("To Date"))
+
+            name = record.get("Name") or record.get("Error Message Name") or ""
+            try:
+                rule_set.add_rule(
+                    name,
+                    record.get("Error Message") or record.get("Description") or name,
+                    _parse_rule_clauses(record.get("Condition Details")),
+                    _parse_rule_clauses(record.get("Validation Details")),
+                    from_date,
+                    to_date,
+                )
+            except ValueError as e:
+                logger.warning(f"Cross-validation rule {name} skipped: {e}")
+
+        for index in rule_set.segments.values():
+            index.freeze()
+        return rule_set
+
+    def check(self, combination, today=None):
+        """
+        Rules rejecting a segment combination.
+
+        Args:
+            combination (dict): Segment name -> value
+            today (date): Day the rules must be effective on (default: today)
+
+        Returns:
+            list: Rejecting CrossValidationRule objects (empty if the combination is valid)
+        """
+        values = {}
+        matched = set()
+        for segment, value in combination.items():
+            value = _segment_value(value)
+            if value is None:
+                continue
+            values[segment] = value
+            index = self.segments.get(segment)
+            if index is not None:
+                index.matches(value, matched)
+
+        # Indexed rules reached through a matched interval already meet their condition
+        triggered = set()
+        for interval_id in matched:
+            triggered.update(self._rules_by_interval.get(interval_id, ()))
+
+        today = today or datetime.date.today()
+        rejected = []
+        for position in sorted(triggered.union(self._unindexed_rules)):
+            rule = self.rules[position]
+            if not rule.segments.issubset(values) or not rule.effective_on(today):
+                continue
+            if position in triggered:
+                if not rule.validation.holds(matched):
+                    rejected.append(rule)
+            elif rule.rejects(matched):
+                rejected.append(rule)
+        return rejected
+
+
+def rules_file():
+    path = getattr(settings, "CROSS_VALIDATION_RULES_FILE", None)
+    return Path(path) if path else None
+
+
+def _file_sha256(path):
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    sha256 = _FILE_HASHES.get(key)
+    if sha256 is None:
+        sha256 = hashlib.sha256(path.read_bytes()).hexdigest()
+        _FILE_HASHES[key] = sha256
+    return sha256
+
+
+def get_rule_set(path=None):
+    """
+    Compiled rules of the rule file, cached per file content (SHA-256), so an
+    updated sheet is picked up on the next call and an unchanged one is never
+    parsed twice.
+
+    Returns:
+        CrossValidationRuleSet or None when no rule file is available
+    """
+    path = Path(path) if path else rules_file()
+    if path is None or not path.exists():
+        return None
+
+    with _CACHE_LOCK:
+        sha256 = _file_sha256(path)
+        rule_set = _RULE_SETS.get(sha256)
+        if rule_set is None:
+            from cross_validation_functions import read_excel_to_dicts
+
+            rule_set = CrossValidationRuleSet.from_records(read_excel_to_dicts(path))
+            _RULE_SETS.clear()
+            _RULE_SETS[sha256] = rule_set
+            logger.info(
+                f"Compiled {len(rule_set.rules)} cross-validation rules from {path.name} ({sha256[:12]})"
+            )
+        return rule_set
+
+
+def transfer_combination(cost_center_code, account_code, project_code):
+    """Segment combination of a transfer line, as journals send it to Oracle"""
+    segments = getattr(settings, "CROSS_VALIDATION_SEGMENTS", {})
+    fields = {
+        "cost_center_code": cost_center_code,
+        "account_code": account_code,
+        "project_code": project_code,
+    }
+    combination = dict(getattr(settings, "CROSS_VALIDATION_FIXED_SEGMENTS", {}))
+    for segment, field in segments.items():
+        combination[segment] = fields.get(field)
+    return combination
+
+
+def check_cross_validation(cost_center_code, account_code, project_code):
+    """
+    Cross-validation errors of a transfer line.
+
+    Returns:
+        list: Error messages (empty if valid or no rule file is configured)
+    """
+    try:
+        rule_set = get_rule_set()
+    except Exception as e:
+        logger.error(f"Cross-validation rules could not be loaded: {e}")
+        return []
+    if rule_set is None:
+        return []
+
+    return [
+        f"Cross-validation rule {rule.name} failed for {cost_center_code} and {project_code} and {account_code}: {rule.message}"
+        for rule in rule_set.check(
+            transfer_combination(cost_center_code, account_code, project_code)
+        )
+    ]
@@ -15,6 +15,7 @@ from budget_management.models import (
     xx_BudgetTransferAttachment,
     xx_BudgetTransferRejectReason,
     xx_DashboardBudgetTransfer,
+    xx_DashboardTransferAggregate,
 )
 from transaction.models import xx_TransactionTransfer
 import time
@@ -46,46 +47,58 @@ def dashboard_smart(filter_cost_center=None, filter_account_code=None):
         # PHASE 1: Database-level aggregations for approved transfers
         aggregation_start = time.time()
 
-        # Build base queryset with optimized filtering
-        base_queryset = xx_TransactionTransfer.objects.select_related(
-            "transaction"
-        ).filter(transaction__status="approved")
+        # Totals come from the delta-maintained aggregate table instead of
+        # grouping the full transfer history
+        aggregate_queryset = xx_DashboardTransferAggregate.objects.filter(
+            status="approved"
+        )
 
         # Apply additional filters if provided
         if filter_cost_center:
-            base_queryset = base_queryset.filter(cost_center_code=filter_cost_center)
+            aggregate_queryset = aggregate_queryset.filter(
+                cost_center_code=filter_cost_center
+            )
         if filter_account_code:
-            base_queryset = base_queryset.filter(account_code=filter_account_code)
+            aggregate_queryset = aggregate_queryset.filter(
+                account_code=filter_account_code
+            )
 
         # Aggregate by cost center code (single database query)
         cost_center_totals = list(
-            base_queryset.values("cost_center_code")
+            aggregate_queryset.values("cost_center_code")
             .annotate(
-                total_from_center=Sum("from_center"), total_to_center=Sum("to_center")
+                total_from_center=Sum("total_from"), total_to_center=Sum("total_to")
             )
             .order_by("cost_center_code")
         )
 
         # Aggregate by account code (single database query)
         account_code_totals = list(
-            base_queryset.values("account_code")
+            aggregate_queryset.values("account_code")
             .annotate(
-                total_from_center=Sum("from_center"), total_to_center=Sum("to_center")
+                total_from_center=Sum("total_from"), total_to_center=Sum("total_to")
             )
             .order_by("account_code")
         )
 
         # Aggregate by combination of cost center and account code (single database query)
         all_combinations = list(
-            base_queryset.values("cost_center_code", "account_code")
+            aggregate_queryset.values("cost_center_code", "account_code")
             .annotate(
-                total_from_center=Sum("from_center"), total_to_center=Sum("to_center")
+                total_from_center=Sum("total_from"), total_to_center=Sum("total_to")
             )
             .order_by("cost_center_code", "account_code")
         )
 
         # Get filtered individual records if filters are applied
         if filter_cost_center or filter_account_code:
+            base_queryset = xx_TransactionTransfer.objects.filter(
+                transaction__status="approved"
+            )
+            if filter_cost_center:
+                base_queryset = base_queryset.filter(cost_center_code=filter_cost_center)
+            if filter_account_code:
+                base_queryset = base_queryset.filter(account_code=filter_account_code)
             filtered_combinations = list(
                 base_queryset.values(
                     "cost_center_code", "account_code", "from_center", "to_center"
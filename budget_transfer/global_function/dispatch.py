@@ -0,0 +1,43 @@
+"""
+Background execution of Celery tasks, with or without a broker.
+
+dispatch() queues a task on Celery when CELERY_BROKER_URL is configured and
+falls back to a daemon timer thread in this process otherwise (or when the
+broker cannot be reached), closing the thread's database connections when the
+task is done.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger("budget_transfer_signals")
+
+
+def dispatch(task, args=(), countdown=0):
+    """
+    Run task(*args) in the background after countdown seconds.
+
+    Args:
+        task: Celery task (shared_task)
+        args (list): Positional arguments of the task
+        countdown (float): Seconds to wait before running it
+    """
+    if getattr(settings, "CELERY_BROKER_URL", None):
+        try:
+            task.apply_async(args=list(args), countdown=countdown)
+            return
+        except Exception as e:
+            logger.error(f"Could not queue {task.name}, using local worker: {e}")
+
+    timer = threading.Timer(countdown, _run_locally, args=[task, list(args)])
+    timer.daemon = True
+    timer.start()
+
+
+def _run_locally(task, args):
+    try:
+        task(*args)
+    finally:
+        close_old_connections()
@@ -0,0 +1,236 @@
+"""
+Shared HTTP client for Oracle Fusion SOAP services (BI Publisher, ERP Integration).
+
+Every Oracle call goes through oracle_soap_post(), which uses one pooled
+requests.Session per process (keep-alive and TLS reuse), per-operation
+timeouts, retries with backoff for operations that are safe to repeat, and
+records latency per operation (see oracle_client_metrics()). Report payloads
+can be base64-decoded straight from the response stream with
+stream_report_bytes().
+"""
+import base64
+import logging
+import random
+import re
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("oracle_client")
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (10, 180)
+OPERATION_TIMEOUTS = {
+    "runReport": (10, 300),
+    "getESSJobStatus": (10, 60),
+    "submitESSJobRequest": (10, 120),
+    "importBulkDataAsync": (10, 300),
+    "importBulkData": (10, 300),
+    "uploadFileToUcm": (10, 300),
+}
+
+# Read-only operations are retried on 5xx and connection errors; anything that
+# submits work is retried only when the connection could not be opened
+IDEMPOTENT_OPERATIONS = {"runReport", "getESSJobStatus"}
+RETRY_STATUSES = {500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+_OPERATION_RE = re.compile(rb"<(?:[\w-]+:)?Body[^>]*>\s*<(?:[\w-]+:)?([\w-]+)")
+_REPORT_BYTES_START = re.compile(rb"<(?:[\w-]+:)?reportBytes[^>]*>")
+
+
+class OracleClientError(Exception):
+    """Raised when an Oracle call cannot be completed."""
+
+
+def _setting(name, default):
+    # The FBDI scripts can also run standalone, without Django settings
+    if not settings.configured:
+        return default
+    return getattr(settings, name, default)
+
+
+def get_oracle_session():
+    """Process-wide pooled session for all Oracle calls."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                pool_size = _setting("ORACLE_CLIENT_POOL_SIZE", 16)
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def soap_operation_name(body):
+    """Name of the first element inside the SOAP Body, e.g. 'runReport'."""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    match = _OPERATION_RE.search(body or b"")
+    return match.group(1).decode() if match else "soap"
+
+
+def _record(operation, seconds, ok, retries):
+    with _metrics_lock:
+        stats = _metrics.setdefault(
+            operation,
+            {"calls": 0, "errors": 0, "retries": 0, "total_seconds": 0.0, "max_seconds": 0.0},
+        )
+        stats["calls"] += 1
+        stats["retries"] += retries
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        if not ok:
+            stats["errors"] += 1
+
+
+def oracle_client_metrics(reset=False):
+    """
+    Per-operation call counts and latency for this process.
+
+    Returns:
+        dict: {operation: {'calls', 'errors', 'retries', 'total_seconds',
+                           'max_seconds', 'avg_seconds'}}
+    """
+    with _metrics_lock:
+        snapshot = {
+            operation: dict(stats, avg_seconds=stats["total_seconds"] / stats["calls"] if stats["calls"] else 0.0)
+            for operation, stats in _metrics.items()
+        }
+        if reset:
+            _metrics.clear()
+    return snapshot
+
+
+def _is_soap_fault(response):
+    try:
+        return b"Fault" in response.content[:4096]
+    except Exception:
+        return False
+
+
+def oracle_soap_post(url, body, headers=None, auth=None, operation=None, timeout=None, stream=False):
+    """
+    POST a SOAP envelope to Oracle.
+
+    Args:
+        url (str): Service endpoint
+        body (str|bytes): SOAP envelope
+        headers (dict): HTTP headers (Content-Type / SOAPAction)
+        auth: requests auth (tuple or HTTPBasicAuth)
+        operation (str): Operation name for timeouts, retries and metrics;
+            read from the envelope when not given
+        timeout: Overrides the operation timeout
+        stream (bool): Leave the body unread (for stream_report_bytes)
+
+    Returns:
+        requests.Response: The last response, whatever its status code
+
+    Raises:
+        requests.RequestException: When no response could be obtained
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    operation = operation or soap_operation_name(body)
+    timeout = timeout or _setting("ORACLE_CLIENT_TIMEOUTS", {}).get(
+        operation, OPERATION_TIMEOUTS.get(operation, DEFAULT_TIMEOUT)
+    )
+    max_retries = _setting("ORACLE_CLIENT_MAX_RETRIES", 3)
+    backoff = _setting("ORACLE_CLIENT_BACKOFF_SECONDS", 0.5)
+    idempotent = operation in IDEMPOTENT_OPERATIONS
+
+    session = get_oracle_session()
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        try:
+            response = session.post(
+                url, data=body, headers=headers, auth=auth, timeout=timeout, stream=stream
+            )
+            retry = (
+                idempotent
+                and response.status_code in RETRY_STATUSES
+                and not _is_soap_fault(response)
+            )
+            if not retry or attempt >= max_retries:
+                elapsed = time.monotonic() - started
+                _record(operation, elapsed, response.status_code < 400, attempt)
+                logger.info(
+                    f"Oracle {operation}: HTTP {response.status_code} in {elapsed:.2f}s"
+                    f" ({attempt} retries)"
+                )
+                return response
+            response.close()
+            reason = f"HTTP {response.status_code}"
+        except (requests.ConnectionError, requests.Timeout) as e:
+            retry = idempotent or isinstance(e, requests.ConnectTimeout)
+            if not retry or attempt >= max_retries:
+                elapsed = time.monotonic() - started
+                _record(operation, elapsed, False, attempt)
+                logger.error(f"Oracle {operation} failed after {elapsed:.2f}s: {e}")
+                raise
+            reason = str(e)
+
+        attempt += 1
+        delay = backoff * (2 ** (attempt - 1)) * (1 + random.random() * 0.25)
+        logger.warning(f"Oracle {operation} attempt {attempt} failed ({reason}), retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+
+def stream_report_bytes(response, output, chunk_size=64 * 1024):
+    """
+    Base64-decode the <reportBytes> element of a runReport response into output
+    while reading the response, without holding the whole payload in memory.
+
+    Args:
+        response (requests.Response): Response from oracle_soap_post(stream=True)
+        output: Writable binary file object
+
+    Returns:
+        int: Number of decoded bytes written (0 when there is no <reportBytes>)
+    """
+    buffer = b""
+    in_payload = False
+    pending = b""  # base64 characters not yet forming a 4-character group
+    written = 0
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            buffer += chunk
+            if not in_payload:
+                match = _REPORT_BYTES_START.search(buffer)
+                if not match:
+                    # Keep enough of the tail to match a tag split across chunks
+                    buffer = buffer[-256:]
+                    continue
+                in_payload = True
+                buffer = buffer[match.end():]
+
+            end = buffer.find(b"<")
+            data = buffer if end == -1 else buffer[:end]
+            buffer = b"" if end == -1 else buffer[end:]
+
+            pending += re.sub(rb"\s+", b"", data)
+            usable = len(pending) - len(pending) % 4
+            if usable:
+                decoded = base64.b64decode(pending[:usable])
+                output.write(decoded)
+                written += len(decoded)
+                pending = pending[usable:]
+            if end != -1:
+                break
+    finally:
+        response.close()
+
+    if pending:
+        raise OracleClientError("Truncated <reportBytes> payload")
+    return written
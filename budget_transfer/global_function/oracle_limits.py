@@ -0,0 +1,7 @@
+"""
+Query limits shared by code that has to run on Oracle.
+"""
+
+# Items per IN list (key prefetches, batched UPDATEs, reference lookups); Oracle
+# rejects IN lists of more than 1000 items (ORA-01795)
+ORACLE_IN_BATCH_SIZE = 500
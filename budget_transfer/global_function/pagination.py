@@ -0,0 +1,200 @@
+"""
+Database-side pagination for large lists.
+
+KeysetPagination always lets the database do the slicing: ?page= pages are
+fetched with LIMIT/OFFSET and ?cursor= pages with a keyset condition on the
+ordering fields (e.g. transaction_id < last seen), so a page costs the same
+whatever its depth. Every response carries next_cursor for the keyset mode.
+
+The total count is optional (?count=exact|estimate|none). "estimate" reuses a
+COUNT(*) cached per query for PAGINATION_COUNT_CACHE_SECONDS, and the count is
+derived from the page itself whenever the last page is reached.
+"""
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+COUNT_EXACT = "exact"
+COUNT_ESTIMATE = "estimate"
+COUNT_NONE = "none"
+
+
+def _json_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_json_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, length):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        raise NotFound("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != length:
+        raise NotFound("Invalid cursor.")
+    return values
+
+
+def cached_count(queryset, timeout=None):
+    """
+    COUNT(*) of a queryset, cached per SQL statement for a few seconds.
+
+    Lists are re-requested page after page with the same filters, so the
+    count of the first request serves the following ones.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "PAGINATION_COUNT_CACHE_SECONDS", 60)
+    if not timeout:
+        return queryset.count()
+    try:
+        sql = str(queryset.query)
+    except Exception:
+        # EmptyResultSet and friends: nothing worth caching
+        return queryset.count()
+
+    key = f"pagination_count:{queryset.model._meta.db_table}:{hashlib.sha1(sql.encode('utf-8')).hexdigest()}"
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+class KeysetPagination(BasePagination):
+    """
+    Page-number and keyset (cursor) pagination pushed down to the database.
+
+    ordering must end with a unique field (the primary key) so the keyset is
+    total. Response: {count, next, previous, next_cursor, results}; count is
+    None when it was not requested.
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    page_query_param = "page"
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    ordering = ("-transaction_id",)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if size < 1:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_count_mode(self, request, default):
+        mode = request.query_params.get(self.count_query_param, default)
+        return mode if mode in (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE) else default
+
+    def _row_value(self, row, field):
+        return row[field] if isinstance(row, dict) else getattr(row, field)
+
+    def _keyset_filter(self, values):
+        """(a, b) after (x, y) in the ordering: a > x OR (a = x AND b > y), per direction"""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+
+        queryset = queryset.order_by(*self.ordering)
+
+        if cursor:
+            self.page_number = None
+            page_queryset = queryset.filter(
+                self._keyset_filter(decode_cursor(cursor, len(self.ordering)))
+            )
+            offset = None
+            count_mode = self.get_count_mode(request, COUNT_NONE)
+        else:
+            try:
+                self.page_number = int(request.query_params.get(self.page_query_param, 1))
+            except (TypeError, ValueError):
+                raise NotFound("Invalid page.")
+            if self.page_number < 1:
+                raise NotFound("Invalid page.")
+            offset = (self.page_number - 1) * self.page_size_value
+            page_queryset = queryset[offset:]
+            count_mode = self.get_count_mode(request, COUNT_EXACT)
+
+        # One extra row tells whether there is a next page without counting
+        rows = list(page_queryset[: self.page_size_value + 1])
+        self.has_next = len(rows) > self.page_size_value
+        rows = rows[: self.page_size_value]
+
+        self.next_cursor = None
+        if self.has_next:
+            last = rows[-1]
+            self.next_cursor = encode_cursor(
+                [self._row_value(last, field.lstrip("-")) for field in self.ordering]
+            )
+
+        if count_mode == COUNT_NONE:
+            self.count = None
+        elif not self.has_next and offset is not None and (rows or offset == 0):
+            # Last page reached: the count is known without asking the database
+            self.count = offset + len(rows)
+        elif count_mode == COUNT_ESTIMATE:
+            self.count = cached_count(queryset)
+        else:
+            self.count = queryset.count()
+
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number is None:
+            return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        # Keyset pages only go forward; numbered pages link back
+        if not self.page_number or self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.count,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "next_cursor": self.next_cursor,
+                "results": data,
+            }
+        )
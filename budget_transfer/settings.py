@@ -2,6 +2,7 @@
 Django settings for budget_transfer project.
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -126,15 +127,103 @@ DATABASES = {
 
 CELERY_BEAT_SCHEDULE = {
     "check-sla-breaches": {
-        "task": "approval.tasks.check_sla_breaches",
+        "task": "approvals.tasks.check_sla_breaches",
         "schedule": 300.0,  # every 5 min
     },
     "cleanup-delegations": {
-        "task": "approval.tasks.cleanup_delegations",
+        "task": "approvals.tasks.cleanup_delegations",
         "schedule": 600.0,  # every 10 min
     },
+    "refresh-stale-balance-reports": {
+        "task": "account_and_entitys.tasks.refresh_stale_balance_reports",
+        "schedule": 300.0,  # every 5 min
+    },
+    "resume-upload-jobs": {
+        "task": "account_and_entitys.tasks.resume_upload_jobs",
+        "schedule": 300.0,  # every 5 min
+    },
+    "sweep-blob-stores": {
+        "task": "budget_management.tasks.sweep_blob_stores",
+        "schedule": 3600.0,  # every hour
+    },
 }
 
+# Seconds a stored file must go without being written or reused before an
+# unreferenced copy is deleted (covers uploads whose row is not committed yet)
+BLOB_DELETE_GRACE_SECONDS = 3600
+
+# Seconds to coalesce budget transfer saves into one dashboard recomputation
+DASHBOARD_REFRESH_DEBOUNCE_SECONDS = 5
+
+# Seconds a list's total count is reused across its pages when clients ask for
+# count=estimate (0 = always count)
+PAGINATION_COUNT_CACHE_SECONDS = 60
+
+# Journal submission jobs: seconds between ESS status checks, checks before giving up,
+# and the ledger used for automatic posting
+JOURNAL_JOB_POLL_SECONDS = 15
+JOURNAL_JOB_MAX_POLLS = 80
+JOURNAL_POSTING_LEDGER_ID = "300000312635883"
+
+# Per-job working directories for FBDI files and downloaded reports (None = system temp dir);
+# finished job directories are kept this many seconds for troubleshooting (0 = delete right away)
+ARTIFACT_ROOT = None
+ARTIFACT_RETENTION_SECONDS = 0
+
+# Content-addressed file storage for attachments and invoices (kept outside MEDIA_ROOT,
+# which is served without authentication)
+BLOB_STORAGE_ROOT = BASE_DIR / "storage" / "blobs"
+
+# Excel uploads run as background jobs (202 + job status URL) unless the client passes
+# async=false; False keeps the synchronous response until clients poll upload jobs
+EXCEL_UPLOAD_ASYNC_DEFAULT = False
+
+# A running upload job without a progress save for this long lost its worker and is failed
+UPLOAD_JOB_STALE_SECONDS = 1800
+
+# Constant segments of the transfer journal lines sent through FBDI (Segment1, 3 and 5
+# carry the cost center, account and project of each line)
+FBDI_JOURNAL_FIXED_SEGMENTS = {
+    "Segment2": "B040009",
+    "Segment4": "M0000",
+    "Segment6": "00000",
+    "Segment7": "000000",
+    "Segment8": "000000",
+    "Segment9": "000000",
+}
+
+# Oracle GL cross-validation rules checked by validate_transaction (exported rule sheet,
+# None = no local check), the segment each transfer field fills, and constant segments
+CROSS_VALIDATION_RULES_FILE = BASE_DIR / "Cross Validation.xls"
+CROSS_VALIDATION_SEGMENTS = {
+    "micHqGlLegalEntity": "cost_center_code",
+    "micHqGlNaturalAccount": "account_code",
+    "micHqGlProject": "project_code",
+}
+CROSS_VALIDATION_FIXED_SEGMENTS = {
+    "micHqGlRespCenter": FBDI_JOURNAL_FIXED_SEGMENTS["Segment2"],
+    "micHqGlSubAccounts": FBDI_JOURNAL_FIXED_SEGMENTS["Segment4"],
+    "micHqGlIntercompany": FBDI_JOURNAL_FIXED_SEGMENTS["Segment6"],
+}
+
+# Balance report snapshots: age after which the active snapshot is refreshed in the
+# background, snapshots kept per budget/period, and how long a refresh holds its lock
+BALANCE_REPORT_MAX_AGE_SECONDS = 900
+BALANCE_REPORT_SNAPSHOTS_KEPT = 2
+BALANCE_REPORT_REFRESH_LOCK_SECONDS = 600
+
+# Shared Oracle SOAP client: connection pool size, retries of read-only calls with
+# exponential backoff, and (connect, read) timeout overrides per SOAP operation
+ORACLE_CLIENT_POOL_SIZE = 16
+ORACLE_CLIENT_MAX_RETRIES = 3
+ORACLE_CLIENT_BACKOFF_SECONDS = 0.5
+ORACLE_CLIENT_TIMEOUTS = {}
+
+# BI Publisher report service (None = built-in dev instance)
+ORACLE_BI_REPORT_URL = os.getenv("ORACLE_BI_REPORT_URL")
+ORACLE_BI_USERNAME = os.getenv("ORACLE_BI_USERNAME")
+ORACLE_BI_PASSWORD = os.getenv("ORACLE_BI_PASSWORD")
+
 # Password validation
 
 
@@ -249,5 +338,10 @@ LOGGING = {
             "level": "INFO",
             "propagate": False,
         },
+        "oracle_client": {
+            "handlers": ["console", "budget_signals_file"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
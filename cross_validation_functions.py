@@ -169,14 +169,26 @@ def _parse_html_table(path: Path, header: bool, fillna: Any) -> List[Dict[str, A
     return records
 
 
-def _parse_rule_clauses(text: Optional[str]) -> List[Dict[str, Union[str, Tuple[str, str]]]]:
-    """Split a rule cell into structured clauses."""
+def _parse_rule_clauses(text: Optional[str]) -> List[Dict[str, Union[str, Tuple[str, str], None]]]:
+    """
+    Split a rule cell into structured clauses.
+
+    Each clause is {"field", "op", "value", "join"}; join is the connector to
+    the previous clause ("or" / "and", None for the first one).
+    """
 
     if not text:
         return []
 
-    clauses: List[Dict[str, Union[str, Tuple[str, str]]]] = []
+    clauses: List[Dict[str, Union[str, Tuple[str, str], None]]] = []
+    previous_end: Optional[int] = None
     for match in CLAUSE_PATTERN.finditer(text):
+        join: Optional[str] = None
+        if previous_end is not None:
+            gap = text[previous_end:match.start()].strip().lower()
+            join = "and" if gap == "and" else "or"
+        previous_end = match.end()
+
         field = match.group("field")
         op_token = match.group("op").lower().replace(" ", "_")
         value_raw = match.group("value").strip()
@@ -190,7 +202,7 @@ def _parse_rule_clauses(text: Optional[str]) -> List[Dict[str, Union[str, Tuple[
         else:
             value = value_raw
 
-        clauses.append({"field": field, "op": op_token, "value": value})
+        clauses.append({"field": field, "op": op_token, "value": value, "join": join})
 
     return clauses
 
@@ -471,12 +483,6 @@ def export_rules_to_excel(
 
 __all__ = ["read_excel_to_dicts", "export_rules_to_excel"]
 
-export_rules_to_excel("Cross Validation.xls", "Normalized_Rules.xlsx")
-
-
-
-# def Check_Validation_Rules(Entity, Account, Project):
-
 
 if __name__ == "__main__":
     import argparse
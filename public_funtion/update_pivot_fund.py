@@ -1,74 +1,277 @@
-from account_and_entitys.models import XX_PivotFund
-from decimal import Decimal  # Add this import
+"""
+Pivot fund ledger
+
+apply_pivot_fund_movements() applies all the lines of a transfer in one
+database transaction: the pivot funds involved are locked with one
+SELECT ... FOR UPDATE (in primary key order, so parallel approvers queue
+instead of deadlocking), the new balances are written with one bulk_update
+and every change is appended to XX_PivotFundMovement. The journal can
+rebuild the balances (rebuild_pivot_fund_balances).
+
+Balances edited directly (PivotFundUpdateView, the admin, any save()) are
+journaled as "adjustment" movements by record_pivot_fund_adjustment(), called
+from account_and_entitys.signals, so a rebuild keeps manual corrections.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from account_and_entitys.models import XX_PivotFund, XX_PivotFundMovement
+
+# Combinations per locking query (OR of exact matches, no IN list limit involved)
+LOCK_BATCH_SIZE = 200
+
+
+def _to_decimal(value):
+    if value in (None, "", " "):
+        return Decimal("0")
+    return Decimal(str(value).strip())
+
+
+def _line_value(line, field):
+    if isinstance(line, dict):
+        return line.get(field)
+    return getattr(line, field, None)
+
+
+def _movement_deltas(decide, from_center_dec, to_center_dec):
+    """(encumbrance delta, actual delta) of one line"""
+    # decide =1 when sent for approvel
+    if decide == "pending":
+        return from_center_dec, Decimal("0")
+    # decide = 2 when approved
+    if decide == "approved":
+        if from_center_dec > 0:
+            return -from_center_dec, Decimal("0")
+        if to_center_dec > 0:
+            return Decimal("0"), to_center_dec
+    # decide = 3 when rejected
+    elif decide == "rejected":
+        if from_center_dec > 0:
+            return from_center_dec, Decimal("0")
+    return Decimal("0"), Decimal("0")
+
+
+def _lock_pivot_funds(keys):
+    """Lock the pivot funds of (entity, account, project) keys: {key: [fund, ...]}"""
+    funds = {}
+    keys = list(keys)
+    for start in range(0, len(keys), LOCK_BATCH_SIZE):
+        condition = Q()
+        for entity, account, project in keys[start:start + LOCK_BATCH_SIZE]:
+            condition |= Q(entity=entity, account=account, project=project)
+        for fund in XX_PivotFund.objects.select_for_update().filter(condition).order_by("pk"):
+            funds.setdefault((fund.entity, fund.account, fund.project), []).append(fund)
+    return funds
+
+
+def apply_pivot_fund_movements(lines, decide, transaction_id=None):
+    """
+    Apply the lines of a transfer to the pivot funds atomically.
+
+    Args:
+        lines: xx_TransactionTransfer objects or dicts with cost_center_code,
+            account_code, project_code, from_center, to_center (and optionally transfer_id)
+        decide (str): "pending", "approved" or "rejected"
+        transaction_id (int): Budget transfer recorded on the movements
+
+    Returns:
+        list: One result dict per line, as update_pivot_fund returns it
+    """
+    parsed = []
+    for line in lines:
+        cost_center_code = _line_value(line, "cost_center_code")
+        account_code = _line_value(line, "account_code")
+        project_code = _line_value(line, "project_code")
+        key = (
+            str(cost_center_code),
+            str(account_code),
+            str(project_code) if project_code is not None else None,
+        )
+        parsed.append((line, key))
+
+    results = []
+    with transaction.atomic():
+        funds = _lock_pivot_funds({key for _, key in parsed})
+        fund_ids = [fund.pk for matches in funds.values() for fund in matches]
+        journaled = set(
+            XX_PivotFundMovement.objects.filter(pivot_fund_id__in=fund_ids)
+            .values_list("pivot_fund_id", flat=True)
+            .distinct()
+        ) if fund_ids else set()
+
+        changed = {}
+        movements = []
+        for line, key in parsed:
+            from_center = _line_value(line, "from_center")
+            to_center = _line_value(line, "to_center")
+            result = {
+                "cost_center_code": _line_value(line, "cost_center_code"),
+                "account_code": _line_value(line, "account_code"),
+                "project_code": _line_value(line, "project_code"),
+                "from_center": from_center,
+            }
+
+            matches = funds.get(key, [])
+            if len(matches) != 1:
+                result.update(
+                    status="failed",
+                    error="Pivot fund not found" if not matches else "More than one pivot fund found",
+                )
+                results.append(result)
+                continue
+
+            pivot_fund = matches[0]
+            pivot_fund.encumbrance = _to_decimal(pivot_fund.encumbrance)
+            pivot_fund.actual = _to_decimal(pivot_fund.actual)
+
+            if pivot_fund.pk not in journaled:
+                # Balances from before the journal existed
+                journaled.add(pivot_fund.pk)
+                movements.append(
+                    XX_PivotFundMovement(
+                        pivot_fund=pivot_fund,
+                        decide="opening",
+                        encumbrance_delta=pivot_fund.encumbrance,
+                        actual_delta=pivot_fund.actual,
+                        encumbrance_after=pivot_fund.encumbrance,
+                        actual_after=pivot_fund.actual,
+                    )
+                )
+
+            # Store old value before changes for reporting
+            old_encumbrance = pivot_fund.encumbrance
+            encumbrance_delta, actual_delta = _movement_deltas(
+                decide,
+                _to_decimal(from_center),
+                _to_decimal(to_center),
+            )
+            pivot_fund.encumbrance += encumbrance_delta
+            pivot_fund.actual += actual_delta
+            changed[pivot_fund.pk] = pivot_fund
+
+            movements.append(
+                XX_PivotFundMovement(
+                    pivot_fund=pivot_fund,
+                    decide=decide,
+                    transaction_id=transaction_id,
+                    transfer_id=_line_value(line, "transfer_id"),
+                    encumbrance_delta=encumbrance_delta,
+                    actual_delta=actual_delta,
+                    encumbrance_after=pivot_fund.encumbrance,
+                    actual_after=pivot_fund.actual,
+                )
+            )
+            result.update(
+                status="updated seccessfully",
+                encumbrance_old_value=old_encumbrance,
+                encumbrance_new_value=pivot_fund.encumbrance,
+            )
+            results.append(result)
+
+        if changed:
+            XX_PivotFund.objects.bulk_update(changed.values(), ["encumbrance", "actual"])
+        if movements:
+            XX_PivotFundMovement.objects.bulk_create(movements)
+
+    return results
+
+
+def record_pivot_fund_adjustment(pivot_fund, encumbrance_before, actual_before):
+    """
+    Journal a direct change of a pivot fund's balances.
+
+    Funds without movements are left alone: their first movement records the
+    balances they have by then as the opening entry.
+
+    Returns:
+        XX_PivotFundMovement or None when nothing had to be recorded
+    """
+    encumbrance = _to_decimal(pivot_fund.encumbrance)
+    actual = _to_decimal(pivot_fund.actual)
+    encumbrance_delta = encumbrance - _to_decimal(encumbrance_before)
+    actual_delta = actual - _to_decimal(actual_before)
+    if not encumbrance_delta and not actual_delta:
+        return None
+    if not XX_PivotFundMovement.objects.filter(pivot_fund=pivot_fund).exists():
+        return None
+    return XX_PivotFundMovement.objects.create(
+        pivot_fund=pivot_fund,
+        decide="adjustment",
+        encumbrance_delta=encumbrance_delta,
+        actual_delta=actual_delta,
+        encumbrance_after=encumbrance,
+        actual_after=actual,
+    )
+
 
 def update_pivot_fund(cost_center_code, account_code, project_code, from_center, to_center, decide):
     """
     Update the pivot fund for a given cost center and account with the from_center amount.
     Returns a dict with update status and information.
     """
-    try:
-        # Convert values to Decimal to ensure type compatibility
-        from_center_dec = Decimal(str(from_center)) if from_center is not None else Decimal('0')
-        to_center_dec = Decimal(str(to_center)) if to_center is not None else Decimal('0')
-
-        print(f"cost_center_code: {cost_center_code}")
-        print(f"account_code: {account_code}")
-        print(f"project_code: {project_code}")
-        print(f"from_center: {from_center}")
-        print(f"to_center: {to_center}")
-
-        pivot_fund = XX_PivotFund.objects.get(entity=cost_center_code, account=account_code, project=project_code)
-        pivot_fund.encumbrance = Decimal(str(pivot_fund.encumbrance).strip()) if pivot_fund.encumbrance not in [None, '', ' '] else Decimal('0')
-        pivot_fund.actual = Decimal(str(pivot_fund.actual).strip()) if pivot_fund.actual not in [None, '', ' '] else Decimal('0')
-
-        print(f"Pivot fund found: ////////////")
-        print(f"Pivot fund found: {pivot_fund}")
-        print(f"Pivot fund found: ////////////")
-
-        # Store old value before changes for reporting
-        old_encumbrance = pivot_fund.encumbrance
-
-        # decide =1 when sent for approvel
-        print(f"decide: {decide}")
-        if decide == "pending":
-            print(f"from_center_dec: {from_center_dec}")
-            print(f"encumbrance: {pivot_fund.encumbrance}")
-            pivot_fund.encumbrance += from_center_dec
-        # decide = 2 when approved
-        elif decide == "approved":
-            if from_center_dec > 0:
-                print(f"from_center_dec: {from_center_dec}")
-                print(f"encumbrance: {pivot_fund.encumbrance}")
-                pivot_fund.encumbrance -= from_center_dec
-            elif to_center_dec > 0:
-                pivot_fund.actual += to_center_dec
-        # decide = 3 when rejected
-        elif decide == "rejected":  # Changed to elif to avoid multiple executions
-            if from_center_dec > 0:
-                pivot_fund.encumbrance += from_center_dec
-
-        print(f"Pivot fund updated: {pivot_fund}")
-
-        pivot_fund.save()
-        print("finish")
-
-        return {
-            "cost_center_code": cost_center_code,
-            "account_code": account_code,
-            "project_code": project_code,
-            "from_center": from_center,
-            "status": "updated seccessfully",
-            "encumbrance_old_value": old_encumbrance,
-            "encumbrance_new_value": pivot_fund.encumbrance,
-        }
-
-    except XX_PivotFund.DoesNotExist:
-        # Handle the case where the pivot fund does not exist
-        return {
-            "cost_center_code": cost_center_code,
-            "account_code": account_code,
-            "project_code": project_code,
-            "from_center": from_center,
-            "status": "failed",
-            "error": "Pivot fund not found",
-        }
+    return apply_pivot_fund_movements(
+        [
+            {
+                "cost_center_code": cost_center_code,
+                "account_code": account_code,
+                "project_code": project_code,
+                "from_center": from_center,
+                "to_center": to_center,
+            }
+        ],
+        decide,
+    )[0]
+
+
+def rebuild_pivot_fund_balances(dry_run=False):
+    """
+    Recompute the balances of journaled pivot funds from their movements.
+
+    Returns:
+        dict: {'checked', 'corrected', 'differences': [{'pivot_fund_id', 'encumbrance', 'expected_encumbrance', 'actual', 'expected_actual'}]}
+    """
+    totals = {
+        row["pivot_fund"]: row
+        for row in XX_PivotFundMovement.objects.values("pivot_fund").annotate(
+            encumbrance=Sum("encumbrance_delta"), actual=Sum("actual_delta")
+        )
+    }
+    result = {"checked": len(totals), "corrected": 0, "differences": []}
+    if not totals:
+        return result
+
+    with transaction.atomic():
+        funds = XX_PivotFund.objects.filter(
+            pk__in=XX_PivotFundMovement.objects.values("pivot_fund")
+        )
+        if not dry_run:
+            funds = funds.select_for_update().order_by("pk")
+
+        corrected = []
+        for fund in funds:
+            expected = totals[fund.pk]
+            if (
+                _to_decimal(fund.encumbrance) == expected["encumbrance"]
+                and _to_decimal(fund.actual) == expected["actual"]
+            ):
+                continue
+            result["differences"].append(
+                {
+                    "pivot_fund_id": fund.pk,
+                    "encumbrance": fund.encumbrance,
+                    "expected_encumbrance": expected["encumbrance"],
+                    "actual": fund.actual,
+                    "expected_actual": expected["actual"],
+                }
+            )
+            fund.encumbrance = expected["encumbrance"]
+            fund.actual = expected["actual"]
+            corrected.append(fund)
+
+        if corrected and not dry_run:
+            XX_PivotFund.objects.bulk_update(corrected, ["encumbrance", "actual"])
+            result["corrected"] = len(corrected)
+
+    return result
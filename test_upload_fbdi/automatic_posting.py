@@ -4,6 +4,8 @@
 import os, requests, xml.etree.ElementTree as ET, re
 from dotenv import load_dotenv
 
+from budget_transfer.global_function.oracle_client import oracle_soap_post
+
 
 def normalize_base(url: str) -> str:
     """Normalize the base URL by removing service-specific paths"""
@@ -48,9 +50,7 @@ def post_soap(
         "SOAPAction": soap_action,
     }
     print(f"\n➡️  POST {endpoint}  (SOAPAction: {headers['SOAPAction']!r})")
-    r = requests.post(
-        endpoint, data=xml, headers=headers, auth=(user, pwd), timeout=180
-    )
+    r = oracle_soap_post(endpoint, xml, headers=headers, auth=(user, pwd))
     print("HTTP", r.status_code)
     print(r.text[:1400])
     return r
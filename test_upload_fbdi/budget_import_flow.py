@@ -4,6 +4,8 @@
 import os, time, re, base64, zipfile, requests, xml.etree.ElementTree as ET
 from dotenv import load_dotenv
 
+from budget_transfer.global_function.oracle_client import oracle_soap_post
+
 # ================= USER CONFIG =================
 ZIP_PATH = r"test_upload_fbdi\XccBudgetInterface.zip"   # must contain XccBudgetInterface.csv at ROOT
 CSV_REQUIRED_NAME = "XccBudgetInterface.csv"
@@ -66,14 +68,14 @@ def post_soap(endpoint: str, user: str, pwd: str, xml: str, soap_action: str = "
         "SOAPAction": soap_action
     }
     print(f"\n➡️  POST {endpoint}  (SOAPAction: {headers['SOAPAction']!r})")
-    r = requests.post(endpoint, data=xml, headers=headers, auth=(user, pwd), timeout=180)
+    r = oracle_soap_post(endpoint, xml, headers=headers, auth=(user, pwd))
     
     # Handle 415 with SOAP 1.2 retry
     if r.status_code == 415:
         print(f'🔁 415 detected, retrying with SOAP 1.2...')
         headers_12 = headers.copy()
         headers_12['Content-Type'] = f'application/soap+xml; charset=utf-8; action="{soap_action}"'
-        r2 = requests.post(endpoint, data=xml, headers=headers_12, auth=(user, pwd), timeout=180)
+        r2 = oracle_soap_post(endpoint, xml, headers=headers_12, auth=(user, pwd))
         print(f'SOAP 1.2 retry status: {r2.status_code}')
         if r2.status_code < 400:
             r = r2  # Use the successful retry response
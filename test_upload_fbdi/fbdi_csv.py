@@ -0,0 +1,156 @@
+"""
+Direct FBDI CSV/zip generation.
+
+Writes GL_INTERFACE / XccBudgetInterface CSV rows straight from the journal and
+budget entry dicts, using the column order read once from the template header
+row, and zips them in memory. The output matches what the old workbook round
+trip (fill the .xlsm with openpyxl, re-read it with pandas, to_csv) produced.
+"""
+import csv
+import io
+import os
+import time
+import zipfile
+from decimal import Decimal
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+from openpyxl import load_workbook
+
+# Template sheet -> CSV file name Oracle expects inside the zip
+FBDI_CSV_NAMES = {
+    "GL_INTERFACE": "GL_INTERFACE.csv",
+    "XCC_BUDGET_INTERFACE": "XccBudgetInterface.csv",
+}
+
+# Header row of the interface sheets (rows 1-3 hold the title and instructions)
+TEMPLATE_HEADER_ROW = 4
+
+# Strings pandas.read_excel turned into empty cells
+_NA_STRINGS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+}
+
+
+@lru_cache(maxsize=8)
+def _load_template_layout(template_path: str, sheet_name: str, mtime: float) -> Tuple[List[str], int]:
+    wb = load_workbook(template_path, read_only=True)
+    try:
+        sheet = wb[sheet_name]
+        top_rows = list(
+            sheet.iter_rows(min_row=1, max_row=TEMPLATE_HEADER_ROW, values_only=True)
+        )
+    finally:
+        wb.close()
+
+    headers = []
+    for value in top_rows[-1]:
+        if value is None or not str(value).strip():
+            break
+        headers.append(str(value).lstrip("*").strip())
+
+    # pandas kept every column up to the last non-empty cell of the title/header rows
+    width = len(headers)
+    for row in top_rows:
+        filled = [i for i, value in enumerate(row) if value is not None and str(value) != ""]
+        if filled:
+            width = max(width, filled[-1] + 1)
+    return headers, width
+
+
+def template_layout(template_path: str, sheet_name: str) -> Tuple[List[str], int]:
+    """
+    Column headers (without the leading '*') and CSV width for a template sheet.
+
+    Cached per template file and modification time.
+    """
+    template_path = str(template_path)
+    return _load_template_layout(template_path, sheet_name, os.path.getmtime(template_path))
+
+
+def csv_value(value: Any) -> Any:
+    """Format one cell the way the workbook round trip did."""
+    if value is None or isinstance(value, bool):
+        return "" if value is None else value
+    if isinstance(value, (int, float, Decimal)):
+        # Excel stores numbers as doubles; whole numbers were read back as ints
+        number = float(value)
+        if number.is_integer():
+            return int(number)
+        return number
+    if isinstance(value, str) and value in _NA_STRINGS:
+        return ""
+    return value
+
+
+def iter_csv_rows(entries: Iterable[Dict[str, Any]], headers: List[str], width: int):
+    """Yield CSV rows (lists of cell values) for entries in template column order."""
+    padding = [""] * (width - len(headers))
+    for entry in entries:
+        row = [csv_value(entry.get(header, "")) for header in headers]
+        if all(value == "" for value in row):
+            continue
+        yield row + padding
+
+
+def build_fbdi_csv(entries: Iterable[Dict[str, Any]], template_path: str, sheet_name: str) -> bytes:
+    """
+    Render entries as the CSV for sheet_name of the template.
+
+    Returns:
+        bytes: UTF-8 CSV content, no header row
+    """
+    headers, width = template_layout(template_path, sheet_name)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator=os.linesep)
+    row_count = 0
+    for row in iter_csv_rows(entries, headers, width):
+        writer.writerow(row)
+        row_count += 1
+    if not row_count:
+        raise ValueError(f"No data rows for {sheet_name}")
+    return buffer.getvalue().encode("utf-8")
+
+
+def build_fbdi_zip(csv_name: str, csv_bytes: bytes) -> bytes:
+    """Zip a single CSV at the archive root, in memory."""
+    buffer = io.BytesIO()
+    info = zipfile.ZipInfo(csv_name, date_time=time.localtime()[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.external_attr = 0o644 << 16
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(info, csv_bytes)
+    return buffer.getvalue()
+
+
+def write_fbdi_files(
+    entries: Iterable[Dict[str, Any]],
+    template_path: str,
+    sheet_name: str,
+    zip_path: str,
+) -> Tuple[str, str]:
+    """
+    Generate the CSV and its zip for sheet_name and write both next to each other.
+
+    Args:
+        entries: Journal / budget entry dicts keyed by template header
+        template_path: FBDI .xlsm template, used only for the column layout
+        sheet_name: 'GL_INTERFACE' or 'XCC_BUDGET_INTERFACE'
+        zip_path: Destination of the zip; the CSV is written to the same folder
+
+    Returns:
+        (zip_path, csv_path)
+    """
+    csv_name = FBDI_CSV_NAMES[sheet_name]
+    csv_bytes = build_fbdi_csv(entries, template_path, sheet_name)
+
+    zip_path = Path(zip_path)
+    csv_path = zip_path.parent / csv_name
+    csv_path.write_bytes(csv_bytes)
+    zip_path.write_bytes(build_fbdi_zip(csv_name, csv_bytes))
+    print(f"Created CSV: {csv_path} ({csv_bytes.count(os.linesep.encode())} rows)")
+    print(f"ZIP created: {zip_path}")
+    return str(zip_path), str(csv_path)
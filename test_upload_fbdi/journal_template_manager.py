@@ -5,6 +5,7 @@ import shutil
 from pathlib import Path
 import time
 from typing import Dict, List, Any
+from django.conf import settings
 from test_upload_fbdi.zip_fbdi import excel_to_csv_and_zip
 
 
@@ -214,6 +215,8 @@ def create_sample_journal_data(
     journal_name = f"JOURNAL_TRANSFER_{timestamp} transaction id={transaction_id}"
     journal_description = f"Journal Entry for Balance Transfer - Created {time.strftime('%Y-%m-%d %H:%M:%S')}"
 
+    # Same constants the cross-validation check fills in (CROSS_VALIDATION_FIXED_SEGMENTS)
+    fixed_segments = settings.FBDI_JOURNAL_FIXED_SEGMENTS
     sample_data = []
     total_debit = 0
     for transfer in transfers:
@@ -235,14 +238,14 @@ def create_sample_journal_data(
                 "Journal Entry Creation Date": "2025-09-26",
                 "Actual Flag": "E",
                 "Segment1": transfer.cost_center_code,
-                "Segment2": "B040009",
+                "Segment2": fixed_segments["Segment2"],
                 "Segment3": transfer.account_code,
-                "Segment4": "M0000",
+                "Segment4": fixed_segments["Segment4"],
                 "Segment5": transfer.project_code,
-                "Segment6": "00000",
-                "Segment7": "000000",
-                "Segment8": "000000",
-                "Segment9": "000000",
+                "Segment6": fixed_segments["Segment6"],
+                "Segment7": fixed_segments["Segment7"],
+                "Segment8": fixed_segments["Segment8"],
+                "Segment9": fixed_segments["Segment9"],
                 "Entered Debit Amount": (
                     getattr(transfer, "from_center")
                     if (transfer.from_center is not None) and (type == "submit")
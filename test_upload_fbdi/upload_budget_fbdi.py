@@ -3,11 +3,12 @@ import argparse
 import base64
 from datetime import datetime
 import os
-import requests
 from requests.auth import HTTPBasicAuth
 from dotenv import load_dotenv
 from urllib.parse import urlsplit
 
+from budget_transfer.global_function.oracle_client import oracle_soap_post
+
 load_dotenv()
 
 BASE_URL = os.getenv("FUSION_BASE_URL").rstrip("/") if os.getenv("FUSION_BASE_URL") else None
@@ -147,7 +148,7 @@ def upload_gl_budget_interface_zip(zip_file_path: str,
     try:
         print(f"Uploading GL Budget Interface ZIP via {op}...")
         print(f"Endpoint: {endpoint}")
-        r = requests.post(endpoint, data=envelope, headers=headers, auth=HTTPBasicAuth(user, pwd), timeout=180)
+        r = oracle_soap_post(endpoint, envelope, headers=headers, auth=HTTPBasicAuth(user, pwd))
         print(f"Response Status: {r.status_code}")
         if r.status_code >= 400:
             return {"success": False, "error": f"HTTP {r.status_code} {r.reason}", "response": r.text[:1000]}
@@ -237,12 +238,11 @@ def submit_import_budget_amounts(data_access_set_id: str, ledger_id: str, source
             print(f"Job Name: {job_info['job']}")
             print(f"Parameters: {parameter_list}")
             
-            response = requests.post(
+            response = oracle_soap_post(
                 ess_url,
-                auth=HTTPBasicAuth(USER, PASS),
+                soap_body,
                 headers=headers,
-                data=soap_body,
-                timeout=120
+                auth=HTTPBasicAuth(USER, PASS),
             )
             
             print(f"Response Status: {response.status_code}")
@@ -349,12 +349,11 @@ def upload_budget_fbdi_to_oracle(csv_file_path: str, group_id: str = None, run_i
         print(f"Group ID: {group_id}")
         print(f"SOAP URL: {soap_url}")
         
-        response = requests.post(
+        response = oracle_soap_post(
             soap_url,
-            auth=HTTPBasicAuth(USER, PASS),
+            soap_body,
             headers=headers,
-            data=soap_body,
-            timeout=120  # Slightly longer timeout for budget imports
+            auth=HTTPBasicAuth(USER, PASS),
         )
         
         print(f"Response Status: {response.status_code}")
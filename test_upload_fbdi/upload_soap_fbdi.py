@@ -3,10 +3,11 @@ import argparse
 import base64
 from datetime import datetime
 import os
-import requests
 from requests.auth import HTTPBasicAuth
 from dotenv import load_dotenv
 
+from budget_transfer.global_function.oracle_client import oracle_soap_post
+
 load_dotenv()
 
 BASE_URL = os.getenv("FUSION_BASE_URL").rstrip("/")
@@ -121,12 +122,11 @@ def upload_fbdi_to_oracle(csv_file_path: str, group_id: str = None) -> dict:
             return {"success": False, "error": "FUSION_BASE_URL not configured"}
         
         # Send SOAP request
-        response = requests.post(
+        response = oracle_soap_post(
             soap_url,
-            auth=HTTPBasicAuth(USER, PASS),
+            soap_body,
             headers=headers,
-            data=soap_body,
-            timeout=60
+            auth=HTTPBasicAuth(USER, PASS),
         )
         
         if response.status_code >= 400:
@@ -4,10 +4,9 @@
 from pathlib import Path
 from time import time
 from django.conf import settings
-from test_upload_fbdi.journal_template_manager import (
-    create_sample_journal_data,
-    create_journal_from_scratch,
-)
+from test_upload_fbdi.journal_template_manager import create_sample_journal_data
+from test_upload_fbdi.fbdi_csv import write_fbdi_files
+from budget_transfer.global_function.artifacts import scoped_workspace
 from test_upload_fbdi.upload_soap_fbdi import (
     b64_csv,
     build_soap_envelope,
@@ -17,32 +16,75 @@ from account_and_entitys.utils import get_oracle_report_data
 from datetime import datetime
 
 
-def submint_journal_and_upload(transfers,transaction_id,type="submit"):
+def new_journal_group_id():
+    """Interface group identifier: timestamp with milliseconds, digits only"""
+    group_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]  # timestamp with milliseconds
+    return group_id.replace('_', '')
 
+
+def _write_journal_zip(data, output_dir):
+    """Write GL_INTERFACE rows as CSV and zip in output_dir; returns the ZIP path"""
     base_dir = Path(settings.BASE_DIR)
 
     template_path = (
         base_dir / "test_upload_fbdi" / "JournalImportTemplate.xlsm"
     )
-    output_name = base_dir / "test_upload_fbdi" / "SampleJournal"
+    output_name = Path(output_dir) / "SampleJournal"
 
     print(f"Template path: {template_path}")
     print(f"Output name: {output_name}")
 
-    group_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]  # timestamp with milliseconds
-    group_id = group_id.replace('_', '')
-    # Generate journal entry using the transfers
-    data = create_sample_journal_data(transfers,transaction_id,type,group_id)
-    result = create_journal_from_scratch(
+    # CSV rows are written straight from the entries; the template only supplies the column layout
+    result, _ = write_fbdi_files(
+        data,
         template_path=str(template_path),
-        journal_data=data,
-        output_name=str(output_name),
-        auto_zip=True,
+        sheet_name="GL_INTERFACE",
+        zip_path=f"{output_name}.zip",
     )
     print(f"\nCompleted! Final file: {result}")
+    return result
+
+
+def build_journal_zip(transfers, transaction_id, output_dir, type="submit", group_id=None):
+    """
+    Build the GL_INTERFACE CSV and its zip for the transfers in output_dir.
+
+    Returns:
+        str: Path of the created ZIP file
+    """
+    if group_id is None:
+        group_id = new_journal_group_id()
+    # Generate journal entry using the transfers
+    data = create_sample_journal_data(transfers,transaction_id,type,group_id)
+    return _write_journal_zip(data, output_dir)
 
-    # Extract CSV file path and upload to Oracle Fusion
-    csv_upload_result = None
+
+def build_batch_journal_zip(transfers_by_transaction, output_dir, type="submit", group_id=None):
+    """
+    Build one GL_INTERFACE CSV holding a balanced journal per transaction.
+
+    Args:
+        transfers_by_transaction (dict): transaction_id -> transfers
+        group_id (str): Interface group shared by all journals of the file
+
+    Returns:
+        str: Path of the created ZIP file
+    """
+    if group_id is None:
+        group_id = new_journal_group_id()
+    data = []
+    for transaction_id, transfers in transfers_by_transaction.items():
+        data.extend(create_sample_journal_data(transfers, transaction_id, type, group_id))
+    return _write_journal_zip(data, output_dir)
+
+
+def upload_journal_zip(result, group_id):
+    """
+    Upload the GL_INTERFACE CSV next to the journal ZIP to Oracle Fusion.
+
+    Returns:
+        dict: upload_fbdi_to_oracle result ('success', 'request_id', 'error', ...)
+    """
     if result and result.endswith(".zip"):
         # The CSV file should be in the same directory as the ZIP file
         zip_path = Path(result)
@@ -72,4 +114,16 @@ def submint_journal_and_upload(transfers,transaction_id,type="submit"):
             "success": False,
             "error": "No ZIP file created",
         }
-    return csv_upload_result ,result
\ No newline at end of file
+    return csv_upload_result
+
+
+def submint_journal_and_upload(transfers,transaction_id,type="submit"):
+
+    group_id = new_journal_group_id()
+    # Each submission gets its own directory so concurrent submits do not share files
+    with scoped_workspace(prefix=f"journal_{transaction_id}") as workspace:
+        result = build_journal_zip(transfers, transaction_id, workspace, type, group_id)
+
+        # Extract CSV file path and upload to Oracle Fusion
+        csv_upload_result = upload_journal_zip(result, group_id)
+    return csv_upload_result ,result
@@ -1,9 +1,8 @@
 from pathlib import Path
 from django.conf import settings
-from test_upload_fbdi.budget_template_manager import (
-    create_sample_budget_data,
-    create_budget_from_scratch,
-)
+from test_upload_fbdi.budget_template_manager import create_sample_budget_data
+from test_upload_fbdi.fbdi_csv import write_fbdi_files
+from budget_transfer.global_function.artifacts import scoped_workspace
 from test_upload_fbdi.upload_budget_fbdi import (
     upload_budget_fbdi_to_oracle,
     upload_budget_from_zip,
@@ -25,27 +24,46 @@ def submit_budget_and_upload(transfers, transaction_id,):
             - file_path: Path to the created file (ZIP)
     """
     
+    # Each submission gets its own directory so concurrent submits do not share files
+    with scoped_workspace(prefix=f"budget_{transaction_id}") as workspace:
+        return _submit_budget_and_upload(transfers, transaction_id, workspace)
+
+
+def build_budget_zip(transfers, transaction_id, output_dir):
+    """
+    Build the XCC_BUDGET_INTERFACE CSV and its zip for the transfers in output_dir.
+
+    Args:
+        transaction_id: Suffix of the budget entry name (MIC_HQ_MONTHLY_<transaction_id>)
+
+    Returns:
+        str: Path of the created ZIP file
+    """
     base_dir = Path(settings.BASE_DIR)
 
     template_path = (
         base_dir / "test_upload_fbdi" / "BudgetImportTemplate.xlsm"
     )
-    output_name = base_dir / "test_upload_fbdi" / "XccBudgetInterface"
+    output_name = Path(output_dir) / "XccBudgetInterface"
 
     print(f"Template path: {template_path}")
     print(f"Output name: {output_name}")
 
     # Generate budget entry using the transfers
     data = create_sample_budget_data(transfers, transaction_id)
-
-    result = create_budget_from_scratch(
+    result, _ = write_fbdi_files(
+        data,
         template_path=str(template_path),
-        budget_data=data,
-        output_name=str(output_name),
-        auto_zip=True,
+        sheet_name="XCC_BUDGET_INTERFACE",
+        zip_path=f"{output_name}.zip",
     )
 
     print(f"\nCompleted! Final file: {result}")
+    return result
+
+
+def _submit_budget_and_upload(transfers, transaction_id, output_dir):
+    result = build_budget_zip(transfers, transaction_id, output_dir)
 
     # Upload ZIP file directly to Oracle Fusion
     csv_upload_result = None
@@ -90,23 +108,28 @@ def submit_budget_csv_and_upload(transfers, transaction_id, type="submit"):
         Tuple: (upload_result, file_path)
     """
     
+    with scoped_workspace(prefix=f"budget_{transaction_id}") as workspace:
+        return _submit_budget_csv_and_upload(transfers, transaction_id, workspace, type)
+
+
+def _submit_budget_csv_and_upload(transfers, transaction_id, output_dir, type="submit"):
     base_dir = Path(settings.BASE_DIR)
 
     template_path = (
         base_dir / "test_upload_fbdi" / "BudgetImportTemplate.xlsm"
     )
-    output_name = base_dir / "test_upload_fbdi" / "SampleBudget"
+    output_name = Path(output_dir) / "SampleBudget"
 
     print(f"Template path: {template_path}")
     print(f"Output name: {output_name}")
 
     # Generate budget entry using the transfers
     data = create_sample_budget_data(transfers, transaction_id)
-    result = create_budget_from_scratch(
+    result, _ = write_fbdi_files(
+        data,
         template_path=str(template_path),
-        budget_data=data,
-        output_name=str(output_name),
-        auto_zip=True,
+        sheet_name="XCC_BUDGET_INTERFACE",
+        zip_path=f"{output_name}.zip",
     )
     print(f"\nCompleted! Final file: {result}")
 
@@ -0,0 +1,64 @@
+"""
+Django management command to resume unfinished journal submission and
+approval follow-up jobs
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from transaction.tasks import (
+    resumable_followup_job_ids,
+    resumable_journal_job_ids,
+    resume_journal_jobs,
+    run_approval_followup_job,
+    run_journal_job,
+    unfinished_followup_job_ids,
+    unfinished_journal_job_ids,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Resume journal submission and approval follow-up jobs nobody is working on '
+        '(queued, or running/waiting without progress, e.g. after a restart). '
+        'Jobs are re-queued on Celery when a broker is configured, otherwise they are '
+        'driven to completion in this process.'
+    )
+
+    def handle(self, *args, **options):
+        try:
+            if getattr(settings, 'CELERY_BROKER_URL', None):
+                count = resume_journal_jobs()
+                self.stdout.write(self.style.SUCCESS(f'✅ Re-queued {count} journal jobs'))
+                return
+            self.run_locally()
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'❌ Unexpected error: {str(e)}')
+            )
+            raise CommandError(f'Command failed: {str(e)}')
+
+    def run_locally(self):
+        job_ids = resumable_journal_job_ids()
+        followup_ids = resumable_followup_job_ids()
+        if not job_ids and not followup_ids:
+            self.stdout.write('📊 No unfinished journal jobs')
+            return
+
+        self.stdout.write(
+            f'🔄 Running {len(job_ids)} journal jobs and {len(followup_ids)} approval follow-up jobs'
+        )
+        poll_seconds = getattr(settings, 'JOURNAL_JOB_POLL_SECONDS', 15)
+        while job_ids or followup_ids:
+            for job_id in job_ids:
+                run_journal_job(job_id, reschedule=False)
+            for job_id in followup_ids:
+                run_approval_followup_job(job_id, reschedule=False)
+            # Jobs of another worker are left to it; only follow the ones started here
+            job_ids = unfinished_journal_job_ids(job_ids)
+            followup_ids = unfinished_followup_job_ids(followup_ids)
+            if job_ids or followup_ids:
+                self.stdout.write(f'⏳ {len(job_ids) + len(followup_ids)} jobs waiting for Oracle')
+                time.sleep(poll_seconds)
+
+        self.stdout.write(self.style.SUCCESS('✅ All journal jobs finished'))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget_management', '0002_xx_dashboardtransferaggregate'),
+        ('transaction', '0002_xx_transactiontransfer_budget_adjustments_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='xx_JournalSubmissionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(default='submit', max_length=10)),
+                ('stage', models.CharField(choices=[('build', 'Build journal workbook and CSV/zip'), ('upload', 'Upload FBDI to Oracle'), ('poll', 'Wait for journal import ESS job'), ('post', 'Submit automatic posting'), ('done', 'Done')], default='build', max_length=10)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('waiting', 'Waiting'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('group_id', models.CharField(blank=True, max_length=30, null=True)),
+                ('journal_file', models.CharField(blank=True, max_length=500, null=True)),
+                ('upload_request_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('ess_status', models.CharField(blank=True, max_length=100, null=True)),
+                ('poll_attempts', models.IntegerField(default=0)),
+                ('posting_request_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('transaction', models.ForeignKey(db_column='transaction_id', on_delete=django.db.models.deletion.CASCADE, related_name='journal_jobs', to='budget_management.xx_budgettransfer')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='journal_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'XX_JOURNAL_SUBMISSION_JOB_XX',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'stage'], name='journal_job_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget_management', '0003_attachment_blob_store'),
+        ('transaction', '0003_xx_journalsubmissionjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='xx_transactiontransfer',
+            index=models.Index(fields=['transaction', 'cost_center_code'], name='tt_txn_cost_center_idx'),
+        ),
+    ]
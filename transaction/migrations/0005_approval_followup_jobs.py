@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction', '0004_entity_scope'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='xx_ApprovalFollowUpJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('items', models.JSONField(default=list)),
+                ('stage', models.CharField(choices=[('build', 'Build batch journal'), ('upload', 'Upload journal FBDI to Oracle'), ('poll', 'Wait for journal import ESS job'), ('post', 'Submit automatic posting'), ('budget', 'Build and upload budget FBDI'), ('load', 'Wait for budget interface loader'), ('import', 'Wait for budget import ESS job'), ('done', 'Done')], default='build', max_length=10)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('waiting', 'Waiting'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('group_id', models.CharField(blank=True, max_length=30, null=True)),
+                ('journal_file', models.CharField(blank=True, max_length=500, null=True)),
+                ('upload_request_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('ess_status', models.CharField(blank=True, max_length=100, null=True)),
+                ('poll_attempts', models.IntegerField(default=0)),
+                ('posting_request_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('budget_file', models.CharField(blank=True, max_length=500, null=True)),
+                ('loader_request_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('budget_request_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='approval_followup_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'XX_APPROVAL_FOLLOWUP_JOB_XX',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'stage'], name='followup_job_status_idx')],
+            },
+        ),
+    ]
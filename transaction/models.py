@@ -39,6 +39,111 @@ class xx_TransactionTransfer(models.Model):
 
     class Meta:
         db_table = "XX_TRANSACTION_TRANSFER_XX"
+        indexes = [
+            # Entity permission filter: lines of a transfer by cost center
+            models.Index(
+                fields=["transaction", "cost_center_code"], name="tt_txn_cost_center_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"ADJD Transfer {self.transfer_id}"
+
+
+class xx_JournalSubmissionJob(models.Model):
+    """
+    Background journal submission for a budget transfer.
+
+    The pipeline runs build -> upload -> poll -> post; stage and status are saved
+    after every step so a job can be resumed from where it stopped.
+    """
+
+    STAGE_CHOICES = [
+        ("build", "Build journal workbook and CSV/zip"),
+        ("upload", "Upload FBDI to Oracle"),
+        ("poll", "Wait for journal import ESS job"),
+        ("post", "Submit automatic posting"),
+        ("done", "Done"),
+    ]
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("waiting", "Waiting"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    ]
+
+    transaction = models.ForeignKey('budget_management.xx_BudgetTransfer', on_delete=models.CASCADE, db_column="transaction_id", related_name="journal_jobs")
+    user = models.ForeignKey('user_management.xx_User', on_delete=models.SET_NULL, null=True, blank=True, related_name="journal_jobs")
+    entry_type = models.CharField(max_length=10, default="submit")  # submit / reject
+    stage = models.CharField(max_length=10, choices=STAGE_CHOICES, default="build")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    group_id = models.CharField(max_length=30, null=True, blank=True)
+    journal_file = models.CharField(max_length=500, null=True, blank=True)
+    upload_request_id = models.CharField(max_length=50, null=True, blank=True)
+    ess_status = models.CharField(max_length=100, null=True, blank=True)
+    poll_attempts = models.IntegerField(default=0)
+    posting_request_id = models.CharField(max_length=50, null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "XX_JOURNAL_SUBMISSION_JOB_XX"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "stage"], name="journal_job_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"Journal job {self.id} ({self.stage}/{self.status})"
+
+
+class xx_ApprovalFollowUpJob(models.Model):
+    """
+    Oracle follow-up of the transfers finalized by one approval request.
+
+    All finalized transfers share one GL_INTERFACE journal (reversing their
+    encumbrance) and the approved ones one budget import. The pipeline runs
+    build -> upload -> poll -> post -> budget -> load -> import; stage and
+    status are saved after every step so a job can be resumed.
+    """
+
+    STAGE_CHOICES = [
+        ("build", "Build batch journal"),
+        ("upload", "Upload journal FBDI to Oracle"),
+        ("poll", "Wait for journal import ESS job"),
+        ("post", "Submit automatic posting"),
+        ("budget", "Build and upload budget FBDI"),
+        ("load", "Wait for budget interface loader"),
+        ("import", "Wait for budget import ESS job"),
+        ("done", "Done"),
+    ]
+    STATUS_CHOICES = xx_JournalSubmissionJob.STATUS_CHOICES
+
+    user = models.ForeignKey('user_management.xx_User', on_delete=models.SET_NULL, null=True, blank=True, related_name="approval_followup_jobs")
+    items = models.JSONField(default=list)  # [{"transaction_id", "code", "status"}]
+    stage = models.CharField(max_length=10, choices=STAGE_CHOICES, default="build")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    group_id = models.CharField(max_length=30, null=True, blank=True)
+    journal_file = models.CharField(max_length=500, null=True, blank=True)
+    upload_request_id = models.CharField(max_length=50, null=True, blank=True)
+    ess_status = models.CharField(max_length=100, null=True, blank=True)
+    poll_attempts = models.IntegerField(default=0)
+    posting_request_id = models.CharField(max_length=50, null=True, blank=True)
+    budget_file = models.CharField(max_length=500, null=True, blank=True)
+    loader_request_id = models.CharField(max_length=50, null=True, blank=True)
+    budget_request_id = models.CharField(max_length=50, null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "XX_APPROVAL_FOLLOWUP_JOB_XX"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "stage"], name="followup_job_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"Approval follow-up job {self.id} ({self.stage}/{self.status})"
@@ -0,0 +1,757 @@
+# transaction/tasks.py
+"""
+Background journal / FBDI submission pipeline
+
+A xx_JournalSubmissionJob moves through build -> upload -> poll -> post -> done.
+Every stage saves the job before the next one starts, so run_journal_job() can be
+re-queued at any point and continues from the saved stage. The poll stage
+re-schedules itself until the journal import ESS job reaches a terminal status,
+and automatic posting is submitted only after that.
+
+Every stage is claimed with a conditional UPDATE before it runs (see
+_claim_stage), so a duplicate delivery of the same job id (Celery redelivery,
+a resume while another worker still owns the job) never repeats a stage:
+uploads and postings reach Oracle once.
+
+A xx_ApprovalFollowUpJob does the same for all transfers finalized by one
+approval request: one batch journal, one automatic posting and one budget
+import (interface loader, then budget import) for the approved transfers.
+"""
+import logging
+from datetime import timedelta
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from celery import shared_task
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from budget_transfer.global_function.artifacts import open_workspace, release_workspace
+from budget_transfer.global_function.dispatch import dispatch
+
+from .models import (
+    xx_ApprovalFollowUpJob,
+    xx_JournalSubmissionJob,
+    xx_TransactionTransfer,
+)
+
+logger = logging.getLogger("transaction_transfer_signals")
+
+ESS_SUCCESS_STATES = {"SUCCEEDED", "WARNING"}
+ESS_FAILURE_STATES = {"ERROR", "CANCELLED", "FAULT", "EXPIRED"}
+UNFINISHED_STATUSES = ("queued", "running", "waiting")
+
+
+def _poll_seconds():
+    return getattr(settings, "JOURNAL_JOB_POLL_SECONDS", 15)
+
+
+def _max_polls():
+    return getattr(settings, "JOURNAL_JOB_MAX_POLLS", 80)
+
+
+def _stale_seconds():
+    # A running job untouched this long lost its worker; longer than any single stage
+    return getattr(settings, "JOURNAL_JOB_STALE_SECONDS", 1800)
+
+
+def _posting_ledger_id():
+    return getattr(settings, "JOURNAL_POSTING_LEDGER_ID", "300000312635883")
+
+
+def job_payload(job):
+    """Serializable view of a job for API responses and websocket messages"""
+    return {
+        "job_id": job.id,
+        "transaction_id": job.transaction_id,
+        "entry_type": job.entry_type,
+        "stage": job.stage,
+        "status": job.status,
+        "group_id": job.group_id,
+        "journal_file": job.journal_file,
+        "upload_request_id": job.upload_request_id,
+        "ess_status": job.ess_status,
+        "posting_request_id": job.posting_request_id,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+def _notify(job, message, notification_type="info"):
+    """Push job progress to the owner's NotificationConsumer group."""
+    if not job.user_id:
+        return
+    try:
+        if job.status in ("succeeded", "failed"):
+            # Final outcome is also stored as a regular notification
+            from user_management.utils import send_notification
+
+            send_notification(job.user, message, notification_type)
+            return
+
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(
+            f"user_{job.user_id}",
+            {
+                "type": "send_notification",
+                "message": {
+                    "type": "journal_job",
+                    "message": message,
+                    **job_payload(job),
+                },
+            },
+        )
+    except Exception as e:
+        logger.error(f"Could not notify user for journal job {job.id}: {e}")
+
+
+def _save(job, message=None, notification_type="info", **fields):
+    for field, value in fields.items():
+        setattr(job, field, value)
+    job.save()
+    if message:
+        _notify(job, message, notification_type)
+
+
+def _fail(job, error):
+    logger.error(f"Journal job {job.id} failed at stage {job.stage}: {error}")
+    _save(
+        job,
+        f"Journal submission for transaction {job.transaction_id} failed: {error}",
+        "error",
+        status="failed",
+        error=str(error),
+    )
+
+
+def _claim_stage(job, owned=False):
+    """
+    Mark the job running for its current stage with one conditional UPDATE.
+
+    A queued or waiting job can be claimed by any runner, a running one only
+    when it is stale, or by the runner that saved it last (owned: it is moving
+    on to its next stage, and the row still has the updated_at it wrote).
+
+    Returns:
+        bool: False when another runner owns the job or moved it on
+    """
+    now = timezone.now()
+    claimable = Q(status__in=("queued", "waiting")) | Q(
+        status="running", updated_at__lt=now - timedelta(seconds=_stale_seconds())
+    )
+    if owned:
+        claimable |= Q(status="running", updated_at=job.updated_at)
+    claimed = type(job).objects.filter(claimable, pk=job.pk, stage=job.stage).update(
+        status="running", updated_at=now
+    )
+    if claimed:
+        job.status = "running"
+        job.updated_at = now
+    return bool(claimed)
+
+
+def _resumable(queryset):
+    """Jobs nobody is working on: queued, or running/waiting without a save for a while"""
+    cutoff = timezone.now() - timedelta(seconds=_stale_seconds())
+    return (
+        queryset.filter(
+            Q(status="queued") | Q(status__in=("running", "waiting"), updated_at__lt=cutoff)
+        )
+        .exclude(stage="done")
+        .values_list("id", flat=True)
+    )
+
+
+def enqueue_journal_job(job_id, countdown=0):
+    """
+    Queue run_journal_job for job_id: on Celery when a broker is configured,
+    otherwise on a local timer thread.
+    """
+    dispatch(run_journal_job, [job_id], countdown)
+
+
+def start_journal_job(budget_transfer, user=None, entry_type="submit"):
+    """
+    Create a journal submission job and queue it once the current transaction commits.
+
+    Returns:
+        xx_JournalSubmissionJob: The queued job
+    """
+    job = xx_JournalSubmissionJob.objects.create(
+        transaction=budget_transfer,
+        user=user if user is not None and user.is_authenticated else None,
+        entry_type=entry_type,
+    )
+    db_transaction.on_commit(lambda: enqueue_journal_job(job.id))
+    return job
+
+
+def _build(job):
+    from test_upload_fbdi.utility.creat_and_upload import (
+        build_journal_zip,
+        new_journal_group_id,
+    )
+
+    transfers = xx_TransactionTransfer.objects.filter(transaction_id=job.transaction_id)
+    group_id = job.group_id or new_journal_group_id()
+    journal_file = build_journal_zip(
+        transfers=transfers,
+        transaction_id=job.transaction_id,
+        output_dir=open_workspace(name=f"journal_job_{job.id}"),
+        type=job.entry_type,
+        group_id=group_id,
+    )
+    if not journal_file or not str(journal_file).endswith(".zip"):
+        _fail(job, "Journal creation did not produce expected ZIP file")
+        return
+    _save(
+        job,
+        "Journal file created, uploading to Oracle",
+        stage="upload",
+        group_id=group_id,
+        journal_file=journal_file,
+    )
+
+
+def _upload(job):
+    from test_upload_fbdi.utility.creat_and_upload import upload_journal_zip
+
+    if not job.journal_file or not Path(job.journal_file).exists():
+        # Resumed on a worker without the files (or after cleanup); rebuild them
+        # with the same group id before uploading
+        _save(job, stage="build")
+        return
+
+    upload_result = upload_journal_zip(job.journal_file, job.group_id)
+    if not upload_result.get("success"):
+        _fail(job, upload_result.get("error") or "FBDI upload failed")
+        return
+    _save(
+        job,
+        "Journal uploaded to Oracle, waiting for journal import",
+        stage="poll",
+        upload_request_id=upload_result.get("request_id"),
+    )
+
+
+def _ess_outcome(ess_status, attempts):
+    """'succeeded', 'failed', 'timeout' or 'waiting' for an ESS status seen on poll number attempts"""
+    if any(state in ess_status for state in ESS_SUCCESS_STATES):
+        return "succeeded"
+    if any(state in ess_status for state in ESS_FAILURE_STATES):
+        return "failed"
+    if attempts >= _max_polls():
+        return "timeout"
+    return "waiting"
+
+
+def _poll(job):
+    """
+    Check the journal import ESS job once.
+
+    Returns:
+        bool: True when the job must be polled again later
+    """
+    from test_upload_fbdi.budget_import_flow import get_ess_status
+
+    if not job.upload_request_id:
+        # Oracle did not return a request id to follow; post right away as before
+        _save(job, stage="post", ess_status="UNKNOWN")
+        return False
+
+    ess_status = get_ess_status(job.upload_request_id)
+    attempts = job.poll_attempts + 1
+    outcome = _ess_outcome(ess_status, attempts)
+
+    if outcome == "succeeded":
+        _save(
+            job,
+            f"Journal import finished ({ess_status}), submitting automatic posting",
+            stage="post",
+            ess_status=ess_status,
+            poll_attempts=attempts,
+        )
+        return False
+
+    if outcome == "failed":
+        job.ess_status = ess_status
+        job.poll_attempts = attempts
+        _fail(job, f"Journal import ended with status {ess_status}")
+        return False
+
+    if outcome == "timeout":
+        job.ess_status = ess_status
+        job.poll_attempts = attempts
+        _fail(job, f"Journal import still {ess_status} after {attempts} checks")
+        return False
+
+    _save(job, status="waiting", ess_status=ess_status, poll_attempts=attempts)
+    return True
+
+
+def _post(job):
+    from test_upload_fbdi.automatic_posting import submit_automatic_posting
+
+    try:
+        posting_request_id = submit_automatic_posting(_posting_ledger_id())
+    except SystemExit as e:
+        # submit_automatic_posting reports SOAP failures with SystemExit
+        _fail(job, f"Automatic posting failed: {e}")
+        return
+    _save(
+        job,
+        f"Journal for transaction {job.transaction_id} submitted and posted",
+        "success",
+        stage="done",
+        status="succeeded",
+        posting_request_id=posting_request_id,
+    )
+
+
+STAGE_HANDLERS = {
+    "build": _build,
+    "upload": _upload,
+    "post": _post,
+}
+
+
+@shared_task
+def run_journal_job(job_id, reschedule=True):
+    """
+    Run a journal submission job from its saved stage until it finishes,
+    fails, or has to wait for Oracle.
+
+    Args:
+        job_id (int): xx_JournalSubmissionJob id
+        reschedule (bool): Queue the next poll when waiting for Oracle; callers
+            that drive the job themselves pass False
+    """
+    try:
+        job = xx_JournalSubmissionJob.objects.select_related("user").get(pk=job_id)
+    except xx_JournalSubmissionJob.DoesNotExist:
+        logger.error(f"Journal job {job_id} not found")
+        return
+
+    if job.status not in UNFINISHED_STATUSES:
+        return
+
+    owned = False
+    try:
+        while job.status in UNFINISHED_STATUSES and job.stage != "done":
+            if not _claim_stage(job, owned):
+                logger.info(f"Journal job {job.id} ({job.stage}) is run by another worker")
+                return
+            owned = True
+
+            if job.stage == "poll":
+                if _poll(job):
+                    if reschedule:
+                        enqueue_journal_job(job.id, countdown=_poll_seconds())
+                    return
+                continue
+
+            STAGE_HANDLERS[job.stage](job)
+    except Exception as e:
+        _fail(job, e)
+
+    if job.status in ("succeeded", "failed"):
+        release_workspace(job.journal_file)
+
+
+def unfinished_journal_job_ids(job_ids=None):
+    queryset = xx_JournalSubmissionJob.objects.filter(status__in=UNFINISHED_STATUSES)
+    if job_ids is not None:
+        queryset = queryset.filter(pk__in=job_ids)
+    return list(queryset.exclude(stage="done").values_list("id", flat=True))
+
+
+def resumable_journal_job_ids():
+    return list(_resumable(xx_JournalSubmissionJob.objects.all()))
+
+
+def resume_journal_jobs():
+    """
+    Re-queue the journal and approval follow-up jobs nobody is working on
+    (queued, or stale running/waiting), e.g. after a worker restart.
+
+    Returns:
+        int: Number of jobs queued
+    """
+    job_ids = resumable_journal_job_ids()
+    for job_id in job_ids:
+        enqueue_journal_job(job_id)
+    followup_ids = resumable_followup_job_ids()
+    for job_id in followup_ids:
+        enqueue_followup_job(job_id)
+    return len(job_ids) + len(followup_ids)
+
+
+# ---------------------------------------------------------------------------
+# Approval follow-up: one journal and one budget import per approval request
+# ---------------------------------------------------------------------------
+
+
+def followup_job_payload(job):
+    """Serializable view of an approval follow-up job"""
+    return {
+        "job_id": job.id,
+        "items": job.items,
+        "stage": job.stage,
+        "status": job.status,
+        "group_id": job.group_id,
+        "upload_request_id": job.upload_request_id,
+        "ess_status": job.ess_status,
+        "posting_request_id": job.posting_request_id,
+        "loader_request_id": job.loader_request_id,
+        "budget_request_id": job.budget_request_id,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+def _notify_followup(job, message, notification_type="info"):
+    if not job.user_id:
+        return
+    try:
+        if job.status in ("succeeded", "failed"):
+            from user_management.utils import send_notification
+
+            send_notification(job.user, message, notification_type)
+            return
+
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(
+            f"user_{job.user_id}",
+            {
+                "type": "send_notification",
+                "message": {
+                    "type": "approval_followup_job",
+                    "message": message,
+                    **followup_job_payload(job),
+                },
+            },
+        )
+    except Exception as e:
+        logger.error(f"Could not notify user for approval follow-up job {job.id}: {e}")
+
+
+def _save_followup(job, message=None, notification_type="info", **fields):
+    for field, value in fields.items():
+        setattr(job, field, value)
+    job.save()
+    if message:
+        _notify_followup(job, message, notification_type)
+
+
+def _fail_followup(job, error):
+    logger.error(f"Approval follow-up job {job.id} failed at stage {job.stage}: {error}")
+    _save_followup(
+        job,
+        f"Oracle update for transfers {_followup_codes(job)} failed: {error}",
+        "error",
+        status="failed",
+        error=str(error),
+    )
+
+
+def _followup_codes(job):
+    return ", ".join(str(item.get("code") or item["transaction_id"]) for item in job.items)
+
+
+def _journal_items(job):
+    # AFR transfers never reserved encumbrance, so they have nothing to reverse
+    return [item for item in job.items if not str(item.get("code") or "").startswith("AFR")]
+
+
+def _budget_items(job):
+    return [item for item in job.items if item.get("status") == "approved"]
+
+
+def _transfers_by_transaction(items):
+    """transaction_id -> transfer lines, in one query"""
+    transaction_ids = [item["transaction_id"] for item in items]
+    lines = {transaction_id: [] for transaction_id in transaction_ids}
+    for line in xx_TransactionTransfer.objects.filter(
+        transaction_id__in=transaction_ids
+    ).order_by("transaction_id", "transfer_id"):
+        lines[line.transaction_id].append(line)
+    return lines
+
+
+def followup_needed(items):
+    """True when finalized items need Oracle work (a journal or a budget import)"""
+    job = xx_ApprovalFollowUpJob(items=items)
+    return bool(_journal_items(job) or _budget_items(job))
+
+
+def enqueue_followup_job(job_id, countdown=0):
+    """Queue run_approval_followup_job like enqueue_journal_job does for journal jobs."""
+    dispatch(run_approval_followup_job, [job_id], countdown)
+
+
+def start_approval_followup_job(items, user=None):
+    """
+    Create the follow-up job of finalized transfers and queue it once the
+    current transaction commits.
+
+    Args:
+        items (list): {"transaction_id", "code", "status"} of every finalized
+            transfer, status being "approved" or "rejected"
+
+    Returns:
+        xx_ApprovalFollowUpJob: The queued job
+    """
+    job = xx_ApprovalFollowUpJob.objects.create(
+        items=items,
+        user=user if user is not None and user.is_authenticated else None,
+    )
+    db_transaction.on_commit(lambda: enqueue_followup_job(job.id))
+    return job
+
+
+def _followup_build(job):
+    from test_upload_fbdi.utility.creat_and_upload import (
+        build_batch_journal_zip,
+        new_journal_group_id,
+    )
+
+    items = _journal_items(job)
+    if not items:
+        _save_followup(job, stage="budget")
+        return
+
+    group_id = job.group_id or new_journal_group_id()
+    journal_file = build_batch_journal_zip(
+        _transfers_by_transaction(items),
+        output_dir=open_workspace(name=f"approval_followup_{job.id}"),
+        type="reject",
+        group_id=group_id,
+    )
+    if not journal_file or not str(journal_file).endswith(".zip"):
+        _fail_followup(job, "Journal creation did not produce expected ZIP file")
+        return
+    _save_followup(
+        job,
+        f"Journal for {len(items)} transfers created, uploading to Oracle",
+        stage="upload",
+        group_id=group_id,
+        journal_file=journal_file,
+    )
+
+
+def _followup_upload(job):
+    from test_upload_fbdi.utility.creat_and_upload import upload_journal_zip
+
+    if not job.journal_file or not Path(job.journal_file).exists():
+        _save_followup(job, stage="build")
+        return
+
+    upload_result = upload_journal_zip(job.journal_file, job.group_id)
+    if not upload_result.get("success"):
+        _fail_followup(job, upload_result.get("error") or "FBDI upload failed")
+        return
+    _save_followup(
+        job,
+        "Journal uploaded to Oracle, waiting for journal import",
+        stage="poll",
+        upload_request_id=upload_result.get("request_id"),
+        poll_attempts=0,
+    )
+
+
+def _followup_poll_ess(job, request_id, label, next_stage, on_success=None):
+    """
+    Poll one ESS request of the job.
+
+    Returns:
+        bool: True when the job must be polled again later
+    """
+    from test_upload_fbdi.budget_import_flow import get_ess_status
+
+    ess_status = get_ess_status(request_id)
+    attempts = job.poll_attempts + 1
+    outcome = _ess_outcome(ess_status, attempts)
+
+    if outcome == "succeeded":
+        fields = {"stage": next_stage, "ess_status": ess_status, "poll_attempts": 0}
+        if on_success:
+            fields.update(on_success())
+        _save_followup(job, f"{label} finished ({ess_status})", **fields)
+        return False
+
+    job.ess_status = ess_status
+    job.poll_attempts = attempts
+    if outcome == "failed":
+        _fail_followup(job, f"{label} ended with status {ess_status}")
+        return False
+    if outcome == "timeout":
+        _fail_followup(job, f"{label} still {ess_status} after {attempts} checks")
+        return False
+
+    _save_followup(job, status="waiting")
+    return True
+
+
+def _followup_post(job):
+    from test_upload_fbdi.automatic_posting import submit_automatic_posting
+
+    posting_request_id = submit_automatic_posting(_posting_ledger_id())
+    _save_followup(
+        job,
+        "Journal submitted for posting",
+        stage="budget",
+        posting_request_id=posting_request_id,
+    )
+
+
+def _followup_budget(job):
+    from test_upload_fbdi.budget_import_flow import (
+        submit_interface_loader,
+        upload_to_ucm,
+    )
+    from test_upload_fbdi.utility.submit_budget_and_upload import build_budget_zip
+
+    items = _budget_items(job)
+    if not items:
+        _finish_followup(job)
+        return
+
+    lines = [
+        line
+        for transfers in _transfers_by_transaction(items).values()
+        for line in transfers
+    ]
+    budget_file = build_budget_zip(
+        lines,
+        _budget_entry_suffix(job),
+        open_workspace(name=f"approval_followup_{job.id}_budget"),
+    )
+    if not budget_file or not str(budget_file).endswith(".zip"):
+        _fail_followup(job, "Budget creation did not produce expected ZIP file")
+        return
+
+    loader_request_id = submit_interface_loader(upload_to_ucm(budget_file))
+    _save_followup(
+        job,
+        f"Budget for {len(items)} transfers uploaded, waiting for interface loader",
+        stage="load",
+        budget_file=budget_file,
+        loader_request_id=loader_request_id,
+        poll_attempts=0,
+    )
+
+
+def _budget_entry_suffix(job):
+    # Budget entry MIC_HQ_MONTHLY_B<job id> holds the lines of the whole batch
+    return f"B{job.id}"
+
+
+def _submit_budget_import(job):
+    from test_upload_fbdi.budget_import_flow import submit_budget_import
+
+    return {"budget_request_id": submit_budget_import(_budget_entry_suffix(job))}
+
+
+def _finish_followup(job):
+    _save_followup(
+        job,
+        f"Oracle updated for transfers {_followup_codes(job)}",
+        "success",
+        stage="done",
+        status="succeeded",
+    )
+
+
+FOLLOWUP_STAGE_HANDLERS = {
+    "build": _followup_build,
+    "upload": _followup_upload,
+    "post": _followup_post,
+    "budget": _followup_budget,
+}
+
+
+def _followup_poll(job):
+    """Poll the ESS request the job is waiting for; True when it must wait longer"""
+    if job.stage == "poll":
+        if not job.upload_request_id:
+            _save_followup(job, stage="post", ess_status="UNKNOWN")
+            return False
+        return _followup_poll_ess(job, job.upload_request_id, "Journal import", "post")
+    if job.stage == "load":
+        return _followup_poll_ess(
+            job,
+            job.loader_request_id,
+            "Budget interface loader",
+            "import",
+            on_success=lambda: _submit_budget_import(job),
+        )
+    # import
+    if _followup_poll_ess(job, job.budget_request_id, "Budget import", "done"):
+        return True
+    if job.stage == "done":
+        _finish_followup(job)
+    return False
+
+
+@shared_task
+def run_approval_followup_job(job_id, reschedule=True):
+    """
+    Run an approval follow-up job from its saved stage until it finishes,
+    fails, or has to wait for Oracle.
+
+    Args:
+        job_id (int): xx_ApprovalFollowUpJob id
+        reschedule (bool): Queue the next poll when waiting for Oracle
+    """
+    try:
+        job = xx_ApprovalFollowUpJob.objects.select_related("user").get(pk=job_id)
+    except xx_ApprovalFollowUpJob.DoesNotExist:
+        logger.error(f"Approval follow-up job {job_id} not found")
+        return
+
+    if job.status not in UNFINISHED_STATUSES:
+        return
+
+    owned = False
+    try:
+        while job.status in UNFINISHED_STATUSES and job.stage != "done":
+            if not _claim_stage(job, owned):
+                logger.info(
+                    f"Approval follow-up job {job.id} ({job.stage}) is run by another worker"
+                )
+                return
+            owned = True
+
+            if job.stage in ("poll", "load", "import"):
+                if _followup_poll(job):
+                    if reschedule:
+                        enqueue_followup_job(job.id, countdown=_poll_seconds())
+                    return
+                continue
+
+            FOLLOWUP_STAGE_HANDLERS[job.stage](job)
+    except SystemExit as e:
+        # The Oracle SOAP helpers report failures with SystemExit
+        _fail_followup(job, e)
+    except Exception as e:
+        _fail_followup(job, e)
+
+    if job.status in ("succeeded", "failed"):
+        release_workspace(job.journal_file)
+        release_workspace(job.budget_file)
+
+
+def unfinished_followup_job_ids(job_ids=None):
+    queryset = xx_ApprovalFollowUpJob.objects.filter(status__in=UNFINISHED_STATUSES)
+    if job_ids is not None:
+        queryset = queryset.filter(pk__in=job_ids)
+    return list(queryset.exclude(stage="done").values_list("id", flat=True))
+
+
+def resumable_followup_job_ids():
+    return list(_resumable(xx_ApprovalFollowUpJob.objects.all()))
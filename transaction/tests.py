@@ -0,0 +1,31 @@
+from django.test import SimpleTestCase
+
+from budget_transfer.global_function.cross_validation import (
+    get_rule_set,
+    transfer_combination,
+)
+
+
+class CrossValidationTests(SimpleTestCase):
+    def setUp(self):
+        self.rule_set = get_rule_set()
+        if self.rule_set is None:
+            self.skipTest("No cross-validation rule file")
+
+    def test_combination_carries_journal_fixed_segments(self):
+        combination = transfer_combination("10001", "2205403", "0000161")
+        self.assertEqual(combination["micHqGlRespCenter"], "B040009")
+        self.assertEqual(combination["micHqGlSubAccounts"], "M0000")
+        self.assertEqual(combination["micHqGlIntercompany"], "00000")
+
+    def test_invalid_resp_center_is_rejected(self):
+        # RC-Project-0000161-2 only allows RespCenter 0000000 or B030003 for project 0000161
+        rejected = self.rule_set.check(
+            transfer_combination("10001", "2205403", "0000161")
+        )
+        self.assertIn("RC-Project-0000161-2", [rule.name for rule in rejected])
+
+        combination = transfer_combination("10001", "2205403", "0000161")
+        combination["micHqGlRespCenter"] = "B030003"
+        rejected = self.rule_set.check(combination)
+        self.assertNotIn("RC-Project-0000161-2", [rule.name for rule in rejected])
@@ -0,0 +1,116 @@
+"""
+Row processing of the transaction transfer Excel upload
+
+import_transaction_transfers() is shared by TransactionTransferExcelUploadView
+and the "transaction_transfers" upload job (account_and_entitys.tasks). Rows
+are saved chunk by chunk: each chunk is one transaction with a savepoint per
+row, so a rejected row does not undo the others and a job can report its
+progress after every chunk.
+"""
+from django.db import transaction
+
+from account_and_entitys.bulk_upload import UploadFormatError
+from budget_transfer.global_function.oracle_limits import ORACLE_IN_BATCH_SIZE
+
+from .serializers import TransactionTransferSerializer
+
+REQUIRED_COLUMNS = [
+    "cost_center_code",
+    "account_code",
+    "project_code",
+    "from_center",
+    "to_center",
+]
+
+
+def _amount(value):
+    if value is None or (isinstance(value, str) and value.strip() == ""):
+        return 0
+    return float(value)
+
+
+def _code(value):
+    return str(value).strip() if value is not None else ""
+
+
+def import_transaction_transfers(
+    rows, transaction_id, on_flush=None, chunk_size=ORACLE_IN_BATCH_SIZE
+):
+    """
+    Create the transfers of a transaction from (row_number, values) pairs whose
+    first pair is the header row.
+
+    Raises:
+        UploadFormatError: A required column is missing
+
+    Returns:
+        dict: {'message', 'created', 'created_count', 'errors', 'error_count'}
+    """
+    created_transfers = []
+    errors = []
+    columns = None
+    chunk = []
+
+    def save_chunk():
+        with transaction.atomic():
+            for idx, record in chunk:
+                transfer_data = {
+                    "transaction": transaction_id,
+                    "cost_center_code": _code(record.get("cost_center_code")),
+                    "project_code": _code(record.get("project_code")),
+                    "account_code": _code(record.get("account_code")),
+                    # Set default values for other required fields
+                    "approved_budget": 0,
+                    "available_budget": 0,
+                    "encumbrance": 0,
+                    "actual": 0,
+                }
+                try:
+                    transfer_data["from_center"] = _amount(record.get("from_center"))
+                    transfer_data["to_center"] = _amount(record.get("to_center"))
+
+                    serializer = TransactionTransferSerializer(data=transfer_data)
+                    if not serializer.is_valid():
+                        errors.append(
+                            {"row": idx, "error": serializer.errors, "data": transfer_data}
+                        )
+                        continue
+                    with transaction.atomic():
+                        serializer.save()
+                    created_transfers.append(serializer.data)
+                except Exception as row_error:
+                    errors.append({"row": idx, "error": str(row_error), "data": record})
+        chunk.clear()
+        if on_flush:
+            on_flush()
+
+    for idx, row in rows:
+        # First row holds the column names
+        if columns is None:
+            columns = [str(c).strip() if c is not None else "" for c in row]
+            missing_columns = [col for col in REQUIRED_COLUMNS if col not in columns]
+            if missing_columns:
+                raise UploadFormatError(
+                    f'The following columns are missing: {", ".join(missing_columns)}',
+                    {"required_columns": REQUIRED_COLUMNS},
+                )
+            continue
+
+        chunk.append((idx, {column: value for column, value in zip(columns, row) if column}))
+        if len(chunk) >= chunk_size:
+            save_chunk()
+
+    if columns is None:
+        raise UploadFormatError(
+            "The Excel file is empty", {"required_columns": REQUIRED_COLUMNS}
+        )
+    if chunk:
+        save_chunk()
+
+    return {
+        "message": f"Processed {len(created_transfers) + len(errors)} rows from Excel file",
+        "created": created_transfers,
+        "created_count": len(created_transfers),
+        "errors": errors,
+        "error_count": len(errors),
+    }
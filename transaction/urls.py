@@ -9,6 +9,8 @@ from .views import (
     transcationtransfer_Reopen,
     TransactionTransferExcelUploadView,
     BudgetQuestionAnswerView,
+    JournalSubmissionJobStatusView,
+    ApprovalFollowUpJobStatusView,
 )
 
 urlpatterns = [
@@ -30,6 +32,16 @@ urlpatterns = [
     # Submit and reopen endpoints
     path("submit/", transcationtransferSubmit.as_view(), name="transfer-submit"),
     path("reopen/", transcationtransfer_Reopen.as_view(), name="transfer-reopen"),
+    path(
+        "journal-jobs/<int:pk>/",
+        JournalSubmissionJobStatusView.as_view(),
+        name="journal-job-status",
+    ),
+    path(
+        "approval-followup-jobs/<int:pk>/",
+        ApprovalFollowUpJobStatusView.as_view(),
+        name="approval-followup-job-status",
+    ),
     # Excel upload endpoint
     path(
         "excel-upload/",
@@ -18,7 +18,7 @@ from django.db.models import Sum
 from public_funtion.update_pivot_fund import update_pivot_fund
 from django.utils import timezone
 from user_management.models import xx_notification
-import pandas as pd
+from user_management.permissions import IsAdmin
 import io
 import os
 import base64
@@ -39,17 +39,37 @@ from test_upload_fbdi.upload_soap_fbdi import (
     build_soap_envelope,
     upload_fbdi_to_oracle,
 )
-from account_and_entitys.utils import get_oracle_report_data
-from test_upload_fbdi.utility.creat_and_upload import submint_journal_and_upload
-from test_upload_fbdi.utility.submit_budget_and_upload import submit_budget_and_upload
-from test_upload_fbdi.automatic_posting import submit_automatic_posting
+from account_and_entitys.utils import get_oracle_report_data_batch
+from .models import xx_ApprovalFollowUpJob, xx_JournalSubmissionJob
+from .tasks import start_journal_job, job_payload, followup_job_payload
+from .uploads import import_transaction_transfers
+from account_and_entitys.bulk_upload import UploadFormatError, iter_sheet_rows
+from budget_transfer.global_function.cross_validation import check_cross_validation
+from account_and_entitys.tasks import (
+    start_upload_job,
+    upload_async_requested,
+    upload_job_payload,
+)
 
 
-def validate_transaction(data, code=None):
-    """
-    Validate ADJD transaction transfer data against 10 business rules
-    Returns a list of validation errors or empty list if valid
-    """
+def _combination_key(cost_center_code, account_code, project_code):
+    """Comparable (cost center, account, project); the first two are integer columns"""
+
+    def integer_code(value):
+        try:
+            return str(int(value))
+        except (TypeError, ValueError):
+            return str(value).strip()
+
+    return (
+        integer_code(cost_center_code),
+        integer_code(account_code),
+        str(project_code),
+    )
+
+
+def _validate_amounts(data, code=None):
+    """Validations 1-4 of a line, which need no query; returns (errors, complete)"""
     errors = []
 
     # Validation 1: Check required fields
@@ -83,7 +103,7 @@ def validate_transaction(data, code=None):
 
     # If basic required fields are missing, stop further validation
     if errors:
-        return errors
+        return errors, False
 
     # Validation 2: from_center or to_center must be positive
     if code[0:3] != "AFR":
@@ -104,72 +124,146 @@ def validate_transaction(data, code=None):
         if Decimal(data["from_center"]) > Decimal(data["available_budget"]):
             errors.append(" from value must be less or equal available_budget value")
 
-    # Validation 5: Check for duplicate transfers (same transaction, from_account, to_account)
-    existing_transfers = xx_TransactionTransfer.objects.filter(
-        transaction=data["transaction_id"],
-        cost_center_code=data["cost_center_code"],
-        account_code=data["account_code"],
-        project_code=data["project_code"],
-    )
+    return errors, True
+
+
+def validate_transactions(lines, code=None, check_funds=False):
+    """
+    Validate all the lines of a transaction with a fixed number of queries.
 
-    # If we're validating an existing record, exclude it from the duplicate check
-    if "transfer_id" in data and data["transfer_id"]:
-        existing_transfers = existing_transfers.exclude(transfer_id=data["transfer_id"])
+    Duplicates are found with one query over the transfers of the involved
+    transactions; check_funds adds the code combination and transfer limit
+    checks of validate_transcation_transfer (one query each).
+
+    Args:
+        lines (list): Dicts shaped like validate_transaction's data
+        code (str): Transfer code (AFR transfers allow negative amounts)
+        check_funds (bool): Also run validate_transcation_transfer's checks
+
+    Returns:
+        list: One list of error messages per line, in the order of lines
+    """
+    results = []
+    complete = []
+    for position, data in enumerate(lines):
+        errors, is_complete = _validate_amounts(data, code)
+        results.append(errors)
+        if is_complete:
+            complete.append(position)
+
+    # Validation 5: Check for duplicate transfers (same transaction, cost center, account, project)
+    existing = {}
+    transaction_ids = {lines[position]["transaction_id"] for position in complete}
+    if transaction_ids:
+        for transaction_id, *combination, transfer_id in (
+            xx_TransactionTransfer.objects.filter(transaction__in=transaction_ids)
+            .order_by("transfer_id")
+            .values_list(
+                "transaction_id",
+                "cost_center_code",
+                "account_code",
+                "project_code",
+                "transfer_id",
+            )
+        ):
+            key = (str(transaction_id), *_combination_key(*combination))
+            existing.setdefault(key, []).append(transfer_id)
+
+    for position in complete:
+        data = lines[position]
+        errors = results[position]
+        key = (
+            str(data["transaction_id"]),
+            *_combination_key(
+                data["cost_center_code"], data["account_code"], data["project_code"]
+            ),
+        )
+        # If we're validating an existing record, exclude it from the duplicate check
+        duplicates = [
+            transfer_id
+            for transfer_id in existing.get(key, [])
+            if not data.get("transfer_id") or str(transfer_id) != str(data["transfer_id"])
+        ]
+        if duplicates:
+            found = [f"ID: {transfer_id}" for transfer_id in duplicates[:3]]
+            errors.append(
+                f"Duplicate transfer for account code {data['account_code']} and project code {data['project_code']} and cost center {data['cost_center_code']} (Found: {', '.join(found)})"
+            )
 
-    if existing_transfers.exists():
-        duplicates = [f"ID: {t.transfer_id}" for t in existing_transfers[:3]]
-        errors.append(
-            f"Duplicate transfer for account code {data['account_code']} and project code {data['project_code']} and cost center {data['cost_center_code']} (Found: {', '.join(duplicates)})"
+        # Validation 6: Oracle cross-validation rules, checked locally before any FBDI upload
+        errors.extend(
+            check_cross_validation(
+                data["cost_center_code"], data["account_code"], data["project_code"]
+            )
         )
 
-    return errors
+    if check_funds and complete:
+        _validate_funds([lines[position] for position in complete], [results[position] for position in complete])
 
+    return results
+
+
+def validate_transaction(data, code=None):
+    """
+    Validate ADJD transaction transfer data against 10 business rules
+    Returns a list of validation errors or empty list if valid
+    """
+    return validate_transactions([data], code=code)[0]
+
+
+def _validate_funds(lines, errors_per_line):
+    """Code combination and transfer limit checks of many lines: two queries"""
+    entities = {str(data["cost_center_code"]) for data in lines}
+    accounts = {str(data["account_code"]) for data in lines}
+    projects = {str(data["project_code"]) for data in lines}
 
-def validate_transcation_transfer(data, code=None, errors=None):
     # Validation 1: Check for fund is available if not then no combination code
-    existing_code_combintion = XX_PivotFund.objects.filter(
-        entity=data["cost_center_code"],
-        account=data["account_code"],
-        project=data["project_code"],
-    )
-    if not existing_code_combintion.exists():
-        errors.append(
-            f"Code combination not found for {data['cost_center_code']} and {data['project_code']} and {data['account_code']}"
-        )
-    print(
-        "existing_code_combintion",
-        type(data["cost_center_code"]),
-        ":",
-        type(data["project_code"]),
-        ":",
-        type(data["account_code"]),
+    funded = set(
+        XX_PivotFund.objects.filter(
+            entity__in=entities, account__in=accounts, project__in=projects
+        ).values_list("entity", "account", "project")
     )
+
     # Validation 2: Check if is allowed to make trasfer using this cost_center_code and account_code
-    allowed_to_make_transfer = XX_ACCOUNT_ENTITY_LIMIT.objects.filter(
-        entity_id=str(data["cost_center_code"]),
-        account_id=str(data["account_code"]),
-        project_id=str(data["project_code"]),
-    ).first()
-    print("allowed_to_make_transfer", allowed_to_make_transfer)
-
-    # Check if no matching record found
-    if allowed_to_make_transfer is not None:
-        # Check transfer permissions if record exists
-        if allowed_to_make_transfer.is_transer_allowed == "No":
+    limits = {}
+    for limit in XX_ACCOUNT_ENTITY_LIMIT.objects.filter(
+        entity_id__in=entities, account_id__in=accounts, project_id__in=projects
+    ).order_by("id"):
+        # Same record as .first() for the combination
+        limits.setdefault((limit.entity_id, limit.account_id, limit.project_id), limit)
+
+    for data, errors in zip(lines, errors_per_line):
+        key = (str(data["cost_center_code"]), str(data["account_code"]), str(data["project_code"]))
+        if key not in funded:
             errors.append(
-                f"Not allowed to make transfer for {data['cost_center_code']} and {data['project_code']} and {data['account_code']} according to the rules"
+                f"Code combination not found for {data['cost_center_code']} and {data['project_code']} and {data['account_code']}"
             )
-        elif allowed_to_make_transfer.is_transer_allowed == "Yes":
-            if data["from_center"] > 0:
-                if allowed_to_make_transfer.is_transer_allowed_for_source != "Yes":
-                    errors.append(
-                        f"Not allowed to make transfer for {data['cost_center_code']} and {data['project_code']} and {data['account_code']} according to the rules (can't transfer from this account)"
-                    )
-            if data["to_center"] > 0:
-                if allowed_to_make_transfer.is_transer_allowed_for_target != "Yes":
-                    errors.append(
-                        f"Not allowed to make transfer for {data['cost_center_code']} and {data['project_code']} and {data['account_code']} according to the rules (can't transfer to this account)"
-                    )
+
+        allowed_to_make_transfer = limits.get(key)
+        # Check if no matching record found
+        if allowed_to_make_transfer is not None:
+            # Check transfer permissions if record exists
+            if allowed_to_make_transfer.is_transer_allowed == "No":
+                errors.append(
+                    f"Not allowed to make transfer for {data['cost_center_code']} and {data['project_code']} and {data['account_code']} according to the rules"
+                )
+            elif allowed_to_make_transfer.is_transer_allowed == "Yes":
+                if data["from_center"] > 0:
+                    if allowed_to_make_transfer.is_transer_allowed_for_source != "Yes":
+                        errors.append(
+                            f"Not allowed to make transfer for {data['cost_center_code']} and {data['project_code']} and {data['account_code']} according to the rules (can't transfer from this account)"
+                        )
+                if data["to_center"] > 0:
+                    if allowed_to_make_transfer.is_transer_allowed_for_target != "Yes":
+                        errors.append(
+                            f"Not allowed to make transfer for {data['cost_center_code']} and {data['project_code']} and {data['account_code']} according to the rules (can't transfer to this account)"
+                        )
+    return errors_per_line
+
+
+def validate_transcation_transfer(data, code=None, errors=None):
+    errors = [] if errors is None else errors
+    _validate_funds([data], [errors])
     return errors
 
 
@@ -358,16 +452,21 @@ class TransactionTransferListView(APIView):
         transfers = xx_TransactionTransfer.objects.filter(transaction=transaction_id)
         serializer = TransactionTransferSerializer(transfers, many=True)
 
+        funds_by_combination = get_oracle_report_data_batch(
+            (
+                transfer.cost_center_code,
+                transfer.account_code,
+                transfer.project_code,
+            )
+            for transfer in transfers
+        )
+
         for transfer in transfers:
-            result = get_oracle_report_data(
-                segment1=transfer.cost_center_code,
-                segment2=transfer.account_code,
-                segment3=transfer.project_code,
+            record = funds_by_combination.get(
+                (transfer.cost_center_code, transfer.account_code, transfer.project_code)
             )
-            data = result["data"]
 
-            if data and len(data) > 0:
-                record = data[0]
+            if record:
                 transfer.available_budget = record["funds_available_asof"]
                 transfer.approved_budget = record["budget_ytd"]
                 transfer.encumbrance = record["encumbrance_ytd"]
@@ -391,7 +490,21 @@ class TransactionTransferListView(APIView):
                 transfer.obligations = 0.0
                 transfer.other_consumption = 0.0
 
-            transfer.save()
+        xx_TransactionTransfer.objects.bulk_update(
+            transfers,
+            [
+                "available_budget",
+                "approved_budget",
+                "encumbrance",
+                "actual",
+                "budget_adjustments",
+                "commitments",
+                "expenditures",
+                "initial_budget",
+                "obligations",
+                "other_consumption",
+            ],
+        )
 
         # Build alias maps for names to avoid N+1 queries
         try:
@@ -422,45 +535,42 @@ class TransactionTransferListView(APIView):
             account_alias_map = {}
             project_alias_map = {}
 
-        # Create response with validation for each transfer
-        response_data = []
+        # Validate every transfer at once (see validate_transactions)
+        validation_lines = []
         for transfer_data in serializer.data:
             from_center_val = transfer_data.get("from_center", 0)
             from_center = (
                 float(from_center_val) if from_center_val not in [None, ""] else 0.0
             )
             to_center = float(transfer_data.get("to_center", 0))
+
+            # Prepare data for validation function
+            validation_lines.append(
+                {
+                    "transaction_id": transaction_id,
+                    "from_center": from_center,
+                    "to_center": to_center,
+                    "approved_budget": float(transfer_data.get("approved_budget", 0)),
+                    "available_budget": float(transfer_data.get("available_budget", 0)),
+                    "encumbrance": float(transfer_data.get("encumbrance", 0)),
+                    "actual": float(transfer_data.get("actual", 0)),
+                    "cost_center_code": transfer_data.get("cost_center_code"),
+                    "account_code": transfer_data.get("account_code"),
+                    "project_code": transfer_data.get("project_code"),
+                    "transfer_id": transfer_data.get("transfer_id"),
+                }
+            )
+        validation_results = validate_transactions(
+            validation_lines, code=transaction_object.code
+        )
+
+        # Create response with validation for each transfer
+        response_data = []
+        for transfer_data, validation_errors in zip(serializer.data, validation_results):
             cost_center_code = transfer_data.get("cost_center_code")
             account_code = transfer_data.get("account_code")
             project_code = transfer_data.get("project_code")
-            transfer_id = transfer_data.get("transfer_id")
-            approved_budget = float(transfer_data.get("approved_budget", 0))
-            available_budget = float(transfer_data.get("available_budget", 0))
-            encumbrance = float(transfer_data.get("encumbrance", 0))
-            actual = float(transfer_data.get("actual", 0))
-            
-            # Prepare data for validation function
-            validation_data = {
-                "transaction_id": transaction_id,
-                "from_center": from_center,
-                "to_center": to_center,
-                "approved_budget": approved_budget,
-                "available_budget": available_budget,
-                "encumbrance": encumbrance,
-                "actual": actual,
-                "cost_center_code": cost_center_code,
-                "account_code": account_code,
-                "project_code": project_code,
-                "transfer_id": transfer_id,  # Fixed: was using 'transfer_id' instead of 'id'
-            }
 
-            # Validate the transfer
-            validation_errors = validate_transaction(
-                validation_data, code=transaction_object.code
-            )
-            # validation_errors = validate_transcation_transfer(
-            #     validation_data, code=transaction_object.code, errors=validation_errors
-            # )
             # Add validation results to the transfer data
             transfer_result = transfer_data.copy()
             if validation_errors:
@@ -692,21 +802,20 @@ class transcationtransferSubmit(APIView):
                     )
 
                 if code[0:3] != "AFR":
-                    csv_upload_result, result = submint_journal_and_upload(
-                        transfers=transfers,
-                        transaction_id=transaction_id,
-                        type="submit",
+                    # Journal build, FBDI upload, import polling and posting run in
+                    # the background; progress is pushed over the notifications socket
+                    journal_job = start_journal_job(
+                        xx_BudgetTransfer.objects.get(pk=transaction_id),
+                        user=request.user,
+                        entry_type="submit",
                     )
-                    time.sleep(90)
-                    submit_automatic_posting("300000312635883")
                     response_data = {
                         "message": "Transfers submitted for approval successfully",
                         "transaction_id": transaction_id,
                         "pivot_updates": pivot_updates,
-                        "journal_file": result if result else None,
+                        "journal_file": None,
+                        "journal_job": job_payload(journal_job),
                     }
-                    if csv_upload_result:
-                        response_data["fbdi_upload"] = csv_upload_result
 
                 else:
                     response_data = {
@@ -757,6 +866,52 @@ class transcationtransferSubmit(APIView):
                 )
 
 
+def _get_job(request, model, pk):
+    """The job if it belongs to the user (admins see every job)"""
+    job = model.objects.filter(pk=pk).first()
+    if job is None:
+        return None
+    if job.user_id != request.user.id and not IsAdmin().has_permission(request, None):
+        return None
+    return job
+
+
+class JournalSubmissionJobStatusView(APIView):
+    """Current stage and status of a background journal submission job"""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = _get_job(request, xx_JournalSubmissionJob, pk)
+        if job is None:
+            return Response(
+                {
+                    "error": "Journal job not found",
+                    "message": f"No journal job found for ID: {pk}",
+                },
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(job_payload(job), status=status.HTTP_200_OK)
+
+
+class ApprovalFollowUpJobStatusView(APIView):
+    """Current stage and status of the Oracle follow-up of an approval request"""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        job = _get_job(request, xx_ApprovalFollowUpJob, pk)
+        if job is None:
+            return Response(
+                {
+                    "error": "Approval follow-up job not found",
+                    "message": f"No approval follow-up job found for ID: {pk}",
+                },
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(followup_job_payload(job), status=status.HTTP_200_OK)
+
+
 class transcationtransfer_Reopen(APIView):
     """Submit transaction transfers for approval"""
 
@@ -880,113 +1035,47 @@ class TransactionTransferExcelUploadView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            # Read Excel file
-            df = pd.read_excel(excel_file)
-
-            # Validate required columns
-            required_columns = [
-                "cost_center_code",
-                "account_code",
-                "project_code",
-                "from_center",
-                "to_center",
-            ]
-            missing_columns = [col for col in required_columns if col not in df.columns]
-
-            if missing_columns:
-                return Response(
-                    {
-                        "error": "Missing columns in Excel file",
-                        "message": f'The following columns are missing: {", ".join(missing_columns)}',
-                        "required_columns": required_columns,
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            # Delete existing transfers for this transaction
-            # xx_TransactionTransfer.objects.filter(transaction=transaction_id).delete()
-
-            # Process Excel data
-            created_transfers = []
-            errors = []
-            print(df["cost_center_code"])
-            print(df["account_code"])
-            print(df["project_code"])
-
-            for index, row in df.iterrows():
-                try:
-                    # Create transfer data dictionary
-                    transfer_data = {
-                        "transaction": transaction_id,
-                        "cost_center_code": str(row["cost_center_code"]),
-                        "project_code": str(row["project_code"]),
-                        "account_code": str(row["account_code"]),
-                        "from_center": (
-                            float(row["from_center"])
-                            if not pd.isna(row["from_center"])
-                            else 0
-                        ),
-                        "to_center": (
-                            float(row["to_center"])
-                            if not pd.isna(row["to_center"])
-                            else 0
-                        ),
-                        # Set default values for other required fields
-                        "approved_budget": 0,
-                        "available_budget": 0,
-                        "encumbrance": 0,
-                        "actual": 0,
-                    }
-
-                    # Validate and save
-                    serializer = TransactionTransferSerializer(data=transfer_data)
-                    if serializer.is_valid():
-                        transfer = serializer.save()
-                        created_transfers.append(serializer.data)
-                    else:
-                        errors.append(
-                            {
-                                "row": index
-                                + 2,  # +2 because Excel is 1-indexed and there's a header row
-                                "error": serializer.errors,
-                                "data": transfer_data,
-                            }
-                        )
-                except Exception as row_error:
-                    errors.append(
-                        {
-                            "row": index + 2,
-                            "error": str(row_error),
-                            "data": row.to_dict(),
-                        }
-                    )
-
-            # Return results
-            response_data = {
-                "message": f"Processed {len(created_transfers) + len(errors)} rows from Excel file",
-                "created": created_transfers,
-                "created_count": len(created_transfers),
-                "errors": errors,
-                "error_count": len(errors),
-            }
-
-            if len(errors) > 0 and len(created_transfers) == 0:
-                # All items failed
-                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-            elif len(errors) > 0:
-                # Partial success
-                return Response(response_data, status=status.HTTP_207_MULTI_STATUS)
-            else:
-                # Complete success
-                return Response(response_data, status=status.HTTP_201_CREATED)
+        if upload_async_requested(request):
+            job = start_upload_job(
+                "transaction_transfers",
+                excel_file,
+                request.user,
+                params={"transaction_id": transfer.transaction_id},
+            )
+            return Response(
+                {"status": "queued", "job": upload_job_payload(job)},
+                status=status.HTTP_202_ACCEPTED,
+            )
 
+        try:
+            response_data = import_transaction_transfers(
+                iter_sheet_rows(excel_file), transaction_id
+            )
+        except UploadFormatError as e:
+            return Response(
+                {
+                    "error": "Missing columns in Excel file",
+                    "message": str(e),
+                    **e.details,
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         except Exception as e:
             return Response(
                 {"error": "Error processing Excel file", "message": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+        if response_data["errors"] and not response_data["created"]:
+            # All items failed
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        elif response_data["errors"]:
+            # Partial success
+            return Response(response_data, status=status.HTTP_207_MULTI_STATUS)
+        else:
+            # Complete success
+            return Response(response_data, status=status.HTTP_201_CREATED)
+
 
 class BudgetQuestionAnswerView(APIView):
     """
@@ -4,3 +4,6 @@ class UserManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user_management'
     verbose_name = 'User Management'
+
+    def ready(self):
+        import user_management.signals
@@ -0,0 +1,102 @@
+"""
+Materialized entity permission scope
+
+XX_UserEntityScope holds, per user and ability type, every numeric cost
+center code the user's abilities reach (the ability entities and their
+descendants). Transfer lists join against it instead of expanding the
+entity tree and sending the codes as an IN list on every request.
+
+The rows of a user are rebuilt when the user's abilities change (see
+user_management.signals) and lazily after the entity tree changes:
+XX_UserEntityScopeState records the XX_Entity tree version (a database
+counter, see account_and_entitys.hierarchy) each user's rows were built from,
+and ensure_user_entity_scope() rebuilds them when it moved on, whichever
+worker changed the tree.
+"""
+from django.db import transaction
+
+from account_and_entitys.hierarchy import get_hierarchy_index, hierarchy_version
+from account_and_entitys.models import XX_Entity
+
+from .models import XX_UserEntityScope, XX_UserEntityScopeState, xx_User, xx_UserAbility
+
+
+def entity_codes_for(entity_ids, version=None):
+    """Numeric codes of entity_ids and all their descendants, from the hierarchy index"""
+    index = get_hierarchy_index(XX_Entity, version)
+    codes = set()
+    for code in set(index.codes_for_ids(entity_ids)):
+        codes.add(code)
+        codes.update(index.descendants(code))
+
+    numeric_codes = set()
+    for code in codes:
+        try:
+            # Many entities are stored as strings but represent integers; convert safely
+            numeric_codes.add(int(str(code).strip()))
+        except (TypeError, ValueError):
+            # Skip non-numeric codes to avoid Oracle ORA-01722 when comparing to NUMBER columns
+            continue
+    return numeric_codes
+
+
+def _lock_user(user_id):
+    """
+    Serialize scope rebuilds of one user until the transaction ends. The user
+    row is locked rather than the state row, which does not exist before the
+    first build or after invalidate_user_entity_scope().
+    """
+    list(xx_User.objects.select_for_update().filter(pk=user_id).values_list("pk"))
+
+
+def _rebuild_user_entity_scope(user_id, version):
+    entity_ids_by_type = {}
+    for ability_type, entity_id in xx_UserAbility.objects.filter(
+        user_id=user_id, Entity__isnull=False, Type__isnull=False
+    ).values_list("Type", "Entity_id"):
+        entity_ids_by_type.setdefault(ability_type, []).append(entity_id)
+
+    rows = [
+        XX_UserEntityScope(user_id=user_id, Type=ability_type, entity_code=code)
+        for ability_type, entity_ids in entity_ids_by_type.items()
+        for code in entity_codes_for(entity_ids, version)
+    ]
+    XX_UserEntityScope.objects.filter(user_id=user_id).delete()
+    XX_UserEntityScope.objects.bulk_create(rows, batch_size=500)
+    XX_UserEntityScopeState.objects.update_or_create(
+        user_id=user_id, defaults={"entity_version": version}
+    )
+    return len(rows)
+
+
+def refresh_user_entity_scope(user_id, version=None):
+    """Rebuild the scope rows of one user (all ability types)."""
+    if version is None:
+        version = hierarchy_version(XX_Entity)
+    with transaction.atomic():
+        _lock_user(user_id)
+        return _rebuild_user_entity_scope(user_id, version)
+
+
+def _scope_is_current(user_id, version):
+    return XX_UserEntityScopeState.objects.filter(
+        user_id=user_id, entity_version=version
+    ).exists()
+
+
+def ensure_user_entity_scope(user_id):
+    """Make sure the scope rows of a user match the current entity tree."""
+    version = hierarchy_version(XX_Entity)
+    if _scope_is_current(user_id, version):
+        return
+    with transaction.atomic():
+        _lock_user(user_id)
+        # Another request may have rebuilt the scope while this one waited
+        if not _scope_is_current(user_id, version):
+            _rebuild_user_entity_scope(user_id, version)
+
+
+def invalidate_user_entity_scope(user_id):
+    """Rebuild a user's scope once the current transaction commits."""
+    XX_UserEntityScopeState.objects.filter(user_id=user_id).delete()
+    transaction.on_commit(lambda: refresh_user_entity_scope(user_id))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management', '0002_userprojects'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XX_UserEntityScope',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Type', models.CharField(max_length=50)),
+                ('entity_code', models.BigIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entity_scope', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'XX_USER_ENTITY_SCOPE_XX',
+                'constraints': [models.UniqueConstraint(fields=('user', 'Type', 'entity_code'), name='user_entity_scope_uniq')],
+            },
+        ),
+    ]
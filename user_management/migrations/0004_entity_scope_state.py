@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management', '0003_entity_scope'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XX_UserEntityScopeState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_version', models.BigIntegerField()),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='entity_scope_state', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'XX_USER_ENTITY_SCOPE_STATE_XX',
+            },
+        ),
+    ]
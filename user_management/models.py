@@ -101,6 +101,39 @@ class xx_UserAbility(models.Model):
         db_table = 'XX_USER_ABILITY_XX'
         unique_together = ('user', 'Entity', 'Type')
 
+class XX_UserEntityScope(models.Model):
+    """
+    Materialized cost centers a user may see per ability type: the entities of
+    the user's abilities and all their descendants (numeric codes only, as
+    stored in xx_TransactionTransfer.cost_center_code).
+
+    Maintained by user_management.entity_scope; rebuilt when the user's
+    abilities or the entity tree change.
+    """
+    user = models.ForeignKey(xx_User, on_delete=models.CASCADE, related_name='entity_scope')
+    Type = models.CharField(max_length=50)
+    entity_code = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'XX_USER_ENTITY_SCOPE_XX'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'Type', 'entity_code'], name='user_entity_scope_uniq'
+            )
+        ]
+
+
+class XX_UserEntityScopeState(models.Model):
+    """XX_Entity tree version a user's XX_UserEntityScope rows were built from"""
+    user = models.OneToOneField(
+        xx_User, on_delete=models.CASCADE, related_name='entity_scope_state'
+    )
+    entity_version = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'XX_USER_ENTITY_SCOPE_STATE_XX'
+
+
 class UserProjects(models.Model):
     """Model to represent projects assigned to users."""
     user = models.ForeignKey(xx_User, on_delete=models.CASCADE, related_name='projects')
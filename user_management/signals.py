@@ -0,0 +1,17 @@
+"""
+Django signals for user permissions
+Keeps the materialized entity scope (XX_UserEntityScope) in sync with abilities
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .entity_scope import invalidate_user_entity_scope
+from .models import xx_UserAbility
+
+
+@receiver(post_save, sender=xx_UserAbility)
+@receiver(post_delete, sender=xx_UserAbility)
+def refresh_entity_scope_on_ability_change(sender, instance, **kwargs):
+    """Rebuild the scope of the user whose abilities changed"""
+    invalidate_user_entity_scope(instance.user_id)